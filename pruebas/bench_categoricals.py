@@ -0,0 +1,53 @@
+"""
+Memoria y tiempo de filtrado: columnas de identificadores/eventos como strings vs categóricas.
+
+Uso:
+    python -m pruebas.bench_categoricals            # 1M documentos
+    python -m pruebas.bench_categoricals 200000
+"""
+import sys
+import time
+
+from pruebas.bench_log_parser import make_logs
+from python_analysis.log_parser import LogParser, CATEGORICAL_COLUMNS
+from python_analysis.metrics import MetricsCalculator
+
+
+def timed(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def bench(n):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    df = parser.parse_logs(make_logs(n), expand_context=True)
+    categorical = MetricsCalculator(df).df
+    as_strings = categorical.astype({col: str for col in CATEGORICAL_COLUMNS + ["event_role"]})
+
+    columns = CATEGORICAL_COLUMNS + ["event_role"]
+    mem_str = as_strings[columns].memory_usage(deep=True).sum() / 2 ** 20
+    mem_cat = categorical[columns].memory_usage(deep=True).sum() / 2 ** 20
+    print(f"{n:,} filas | memoria ids/eventos: {mem_str:8.1f} MB (str) → {mem_cat:6.1f} MB (categorical)"
+          f" | x{mem_str / mem_cat:.1f}")
+
+    checks = {
+        'event_role == "action_success"': lambda d: d[d["event_role"] == "action_success"],
+        'event_role.isin(success, fail)': lambda d: d[d["event_role"].isin(["action_success", "action_fail"])],
+        'event_name == "movement_frame"': lambda d: d[d["event_name"] == "movement_frame"],
+        "groupby(user, group, session)": lambda d: d.groupby(["user_id", "group_id", "session_id"],
+                                                             observed=True).size(),
+    }
+    for label, func in checks.items():
+        t_str = timed(lambda: func(as_strings))
+        t_cat = timed(lambda: func(categorical))
+        print(f"  {label:<34} str: {t_str * 1000:8.1f} ms | categorical: {t_cat * 1000:7.1f} ms"
+              f" | x{t_str / t_cat:.1f}")
+
+
+if __name__ == "__main__":
+    for size in [int(a) for a in sys.argv[1:]] or [1_000_000]:
+        bench(size)
@@ -0,0 +1,78 @@
+"""
+Memoria y tiempo de construir MetricsCalculator sobre un df ya parseado (dtypes de LogParser:
+timestamp datetime64, claves y event_name categóricos). Compara la construcción anterior
+(copia profunda + pd.to_datetime) con la actual (copia superficial con copy-on-write y
+conversiones solo cuando el dtype no es ya el correcto).
+
+Uso:
+    python -m pruebas.bench_construction              # 5M filas
+    python -m pruebas.bench_construction 1000000
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from python_analysis.metrics import MetricsCalculator
+
+CONFIG = {"event_roles": {"target_hit": "action_success", "target_miss": "action_fail"}}
+NAMES = ["target_hit", "target_miss", "task_start", "task_end", "movement_frame", "gaze_frame", "eye_frame"]
+
+
+def make_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-09-26T14:00:00", "us")
+    return pd.DataFrame({
+        "timestamp": pd.Series(start + np.sort(rng.integers(0, 3_600_000_000, n_rows)).astype("timedelta64[us]"))
+        .dt.tz_localize("UTC"),
+        "user_id": pd.Categorical.from_codes(rng.integers(0, 200, n_rows), [f"U{i:03d}" for i in range(200)]),
+        "group_id": pd.Categorical.from_codes(rng.integers(0, 3, n_rows), ["G0", "G1", "G2"]),
+        "session_id": pd.Categorical.from_codes(rng.integers(0, 200, n_rows), [f"S{i:03d}" for i in range(200)]),
+        "event_type": pd.Categorical.from_codes(rng.integers(0, 4, n_rows), ["flow", "gaze", "navigation", "task"]),
+        "event_name": pd.Categorical.from_codes(rng.integers(0, len(NAMES), n_rows), NAMES),
+        "event_value": pd.Series(rng.random(n_rows), dtype=object),
+        "position_x": rng.random(n_rows).astype("float32"),
+        "position_z": rng.random(n_rows).astype("float32"),
+        "hit_position_x": rng.random(n_rows).astype("float32"),
+        "hit_position_z": rng.random(n_rows).astype("float32"),
+    })
+
+
+def legacy_construct(df):
+    # Construcción anterior: copia profunda y reconversión de timestamp (el relleno de claves y el
+    # mapeo de roles por códigos de categoría son los mismos en las dos)
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    return MetricsCalculator(df, experiment_config=CONFIG)
+
+
+def measure(build, df):
+    tracemalloc.start()
+    t = time.perf_counter()
+    calc = build(df)
+    elapsed = time.perf_counter() - t
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del calc
+    return elapsed, retained / 1e6, peak / 1e6
+
+
+def bench(n_rows):
+    df = make_frame(n_rows)
+    print(f"{n_rows:,} filas | df de entrada: {df.memory_usage(deep=True).sum() / 1e6:,.0f} MB")
+    results = {}
+    for label, build in (("copia profunda", legacy_construct),
+                         ("copy-on-write", lambda d: MetricsCalculator(d, experiment_config=CONFIG))):
+        results[label] = measure(build, df)
+        elapsed, retained, peak = results[label]
+        print(f"  {label:<15}: {elapsed * 1000:7.0f} ms | memoria retenida {retained:7.0f} MB | pico {peak:7.0f} MB")
+
+    saved = results["copia profunda"][1] - results["copy-on-write"][1]
+    print(f"💾 Memoria ahorrada: {saved:,.0f} MB retenidos "
+          f"({results['copia profunda'][2] - results['copy-on-write'][2]:,.0f} MB de pico)")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,56 @@
+"""
+Benchmark de las métricas genéricas de config (target_event + aggregation): cálculo original
+grupo a grupo (_calculate_generic_metric filtra cada sub-DataFrame y llama a pd.to_numeric por
+métrica) vs el plan compilado que las resuelve todas en una pasada (GroupedMetricsEngine.generic_metrics).
+
+Uso:
+    python -m pruebas.bench_generic_metrics              # 200k filas, 2000 sesiones
+    python -m pruebas.bench_generic_metrics 500000 5000
+"""
+import sys
+import time
+
+from pruebas.bench_grouped_metrics import CATEGORIES, make_logs
+from python_analysis.grouped_metrics import GroupedMetricsEngine
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+
+AGGREGATIONS = ["count", "average", "sum", "max", "min"]
+TARGETS = ["target_hit", "target_miss", "task_end", "ui_error"]
+
+
+def make_config():
+    metrics = {cat: {} for cat in CATEGORIES}
+    for i, (target, agg) in enumerate((t, a) for t in TARGETS for a in AGGREGATIONS):
+        metrics[CATEGORIES[i % 4]][f"{target}_{agg}"] = {"target_event": target, "aggregation": agg,
+                                                         "weight": 1.0, "min": 0, "max": 100}
+    return {"metrics": metrics, "event_roles": {"target_hit": "action_success", "target_miss": "action_fail"}}
+
+
+def bench(n_rows, n_sessions):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    logs = make_logs(n_rows, n_sessions)
+    for i, log in enumerate(logs):
+        if log["event_name"] in ("target_hit", "target_miss"):
+            log["event_value"] = (i % 7) * 0.5
+    calc = MetricsCalculator(parser.parse_logs(logs, expand_context=True), experiment_config=make_config())
+    params = [p for cat in calc.metrics_cfg.values() for p in cat.values()]
+
+    engine = GroupedMetricsEngine(calc)
+    t = time.perf_counter()
+    legacy = [[calc._calculate_generic_metric(engine.subframe(i), p["target_event"], p["aggregation"])
+               for i in range(engine.n_groups)] for p in params]
+    t_legacy = time.perf_counter() - t
+
+    engine = GroupedMetricsEngine(calc)
+    t = time.perf_counter()
+    planned = [engine.generic_metric(p) for p in params]
+    t_plan = time.perf_counter() - t
+
+    assert legacy == planned
+    print(f"{n_rows:>8,} filas | {n_sessions:>5} sesiones | {len(params)} métricas genéricas | "
+          f"por grupo: {t_legacy:6.2f}s | plan compilado: {t_plan * 1000:7.1f} ms | x{t_legacy / t_plan:,.0f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,79 @@
+"""
+Benchmark de compute_grouped_metrics: bucle por grupo (compute_category sobre cada sub-DataFrame)
+vs GroupedMetricsEngine. Usa las métricas vectorizadas del motor (conteos por rol, rangos
+temporales, inactividad...), con el mismo número total de filas repartido en más o menos sesiones.
+
+Uso:
+    python -m pruebas.bench_grouped_metrics              # 200k filas, 20/200/2000 sesiones
+    python -m pruebas.bench_grouped_metrics 500000
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from python_analysis.grouped_metrics import GroupedMetricsEngine
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+
+CATEGORIES = ["efectividad", "eficiencia", "satisfaccion", "presencia"]
+
+
+def make_config():
+    names = list(GroupedMetricsEngine.VECTORIZED)
+    metrics = {cat: {} for cat in CATEGORIES}
+    for i, name in enumerate(names):
+        metrics[CATEGORIES[i % 4]][name] = {"weight": 1.0, "min": 0, "max": 100}
+    return {"metrics": metrics, "event_roles": {"target_hit": "action_success", "target_miss": "action_fail"}}
+
+
+def make_logs(n_rows, n_sessions, seed=0):
+    rnd = random.Random(seed)
+    t0 = datetime(2025, 9, 26, 14, 0, 0)
+    per_session = n_rows // n_sessions
+    names = ["target_hit", "target_miss", "task_start", "task_end", "task_restart", "ui_error", "walk_step"]
+    logs = []
+    for s in range(n_sessions):
+        for i in range(per_session):
+            name = rnd.choices(names, weights=[20, 10, 3, 3, 1, 1, 62])[0]
+            logs.append({"timestamp": t0 + timedelta(hours=s, milliseconds=250 * i + rnd.randint(0, 9000)),
+                         "user_id": f"U{s:04d}", "session_id": f"S{s:04d}", "group_id": f"G{s % 3}",
+                         "event_type": "task", "event_name": name,
+                         "event_value": rnd.choice(["success", "fail"]) if name == "task_end" else None})
+    return logs
+
+
+def legacy_grouped(calc):
+    # Recorrido original: 4 compute_category por grupo, cada métrica filtra su sub-DataFrame
+    rows = []
+    for keys, subdf in calc.df.groupby(["user_id", "group_id", "session_id"], observed=True):
+        rows.append({cat: calc.compute_category(cat, subdf)["score"] for cat in CATEGORIES})
+    return rows
+
+
+def bench(n_rows, sessions_list):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    config = make_config()
+    for n_sessions in sessions_list:
+        df = parser.parse_logs(make_logs(n_rows, n_sessions), expand_context=True)
+        calc = MetricsCalculator(df, experiment_config=config)
+
+        t = time.perf_counter()
+        legacy = legacy_grouped(calc)
+        t_legacy = time.perf_counter() - t
+
+        t = time.perf_counter()
+        grouped = calc.compute_grouped_metrics()
+        t_engine = time.perf_counter() - t
+
+        scores = pd.DataFrame(legacy)
+        assert ((grouped[[f"{c}_score" for c in CATEGORIES]].to_numpy() - scores.to_numpy()) == 0).all()
+        print(f"{len(df):>8,} filas | {n_sessions:>5} sesiones | por grupo: {t_legacy:7.2f}s"
+              f" | motor: {t_engine:6.2f}s | x{t_legacy / t_engine:.1f}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    bench(rows, [20, 200, 2000])
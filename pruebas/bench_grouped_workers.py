@@ -0,0 +1,70 @@
+"""
+Escalado de compute_grouped_metrics(workers=N) con un dataset sintético de 200 participantes.
+Mide 1..N procesos, comprueba que el resultado es idéntico al secuencial y guarda la curva
+de speedup en pruebas/grouped_workers_scaling.png.
+
+Uso:
+    python -m pruebas.bench_grouped_workers            # 1..nº de núcleos
+    python -m pruebas.bench_grouped_workers 8          # 1..8 procesos
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from pruebas.bench_grouped_metrics import CATEGORIES, make_logs
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+
+PARTICIPANTS = 200
+ROWS_PER_PARTICIPANT = 1000
+CHART = Path(__file__).resolve().parent / "grouped_workers_scaling.png"
+
+
+def make_config(calc):
+    # Todas las métricas integradas (también las que se calculan grupo a grupo, como learning_curve_mean)
+    metrics = {cat: {} for cat in CATEGORIES}
+    for i, name in enumerate(calc._available_metric_functions()):
+        metrics[CATEGORIES[i % 4]][name] = {"weight": 1.0, "min": 0, "max": 100}
+    return {"metrics": metrics, "event_roles": {"target_hit": "action_success", "target_miss": "action_fail"}}
+
+
+def bench(max_workers):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    df = parser.parse_logs(make_logs(PARTICIPANTS * ROWS_PER_PARTICIPANT, PARTICIPANTS), expand_context=True)
+    calc = MetricsCalculator(df, experiment_config=make_config(MetricsCalculator(df.head(1))))
+
+    timings, reference = {}, None
+    for workers in range(1, max_workers + 1):
+        t = time.perf_counter()
+        result = calc.compute_grouped_metrics(workers=workers)
+        timings[workers] = time.perf_counter() - t
+        if reference is None:
+            reference = result
+        pd.testing.assert_frame_equal(reference, result)
+        print(f"{len(df):>8,} filas | {PARTICIPANTS} participantes | {workers:>2} procesos: {timings[workers]:6.2f}s"
+              f" | x{timings[1] / timings[workers]:.2f}")
+
+    workers = list(timings)
+    plt.figure(figsize=(6, 4))
+    plt.plot(workers, [timings[1] / timings[w] for w in workers], marker="o", label="compute_grouped_metrics")
+    plt.plot(workers, workers, linestyle="--", color="gray", label="Ideal")
+    plt.xlabel("Procesos (workers)")
+    plt.ylabel("Speedup vs 1 proceso")
+    plt.title(f"Escalado de métricas agrupadas ({PARTICIPANTS} participantes, {os.cpu_count()} núcleos)")
+    plt.xticks(workers)
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.savefig(CHART, bbox_inches="tight")
+    plt.close()
+    print(f"📈 Curva de escalado guardada en {CHART}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1)
@@ -0,0 +1,59 @@
+"""
+Benchmark de la curva de aprendizaje con sesiones de entrenamiento largas: bucle original por
+bloque (actions.iloc[i:i + block_size] y filtrado de cada bloque, sesión a sesión) vs sumas
+acumuladas de aciertos para todas las sesiones y varios tamaños de bloque en una pasada
+(GroupedMetricsEngine.learning_curves).
+
+Uso:
+    python -m pruebas.bench_learning_curve              # 400k filas, 20 sesiones
+    python -m pruebas.bench_learning_curve 1000000 50
+"""
+import sys
+import time
+
+import numpy as np
+
+from pruebas.bench_grouped_metrics import make_config, make_logs
+from python_analysis.grouped_metrics import GroupedMetricsEngine
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+
+BLOCK_SIZES = (5, 10, 20)
+
+
+def legacy_learning_curve(df, block_size):
+    # Implementación anterior de MetricsCalculator._learning_curve
+    actions = df[df["event_role"].isin(["action_success", "action_fail"])]
+    res = []
+    for i in range(0, len(actions), block_size):
+        block = actions.iloc[i:i + block_size]
+        hits = len(block[block["event_role"] == "action_success"])
+        res.append(hits / len(block) if len(block) > 0 else np.nan)
+    return res
+
+
+def bench(n_rows, n_sessions):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    calc = MetricsCalculator(parser.parse_logs(make_logs(n_rows, n_sessions), expand_context=True),
+                             experiment_config=make_config())
+    engine = GroupedMetricsEngine(calc)
+    n_actions = int(calc.df["event_role"].isin(["action_success", "action_fail"]).sum())
+
+    t = time.perf_counter()
+    legacy = {b: [legacy_learning_curve(engine.subframe(i), b) for i in range(engine.n_groups)]
+              for b in BLOCK_SIZES}
+    t_legacy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    curves = GroupedMetricsEngine(calc).learning_curves(BLOCK_SIZES)
+    t_vector = time.perf_counter() - t
+
+    for b in BLOCK_SIZES:
+        assert [c.tolist() for c in curves[b]] == legacy[b], b
+    print(f"{n_rows:>9,} filas | {n_sessions:>4} sesiones | {n_actions / n_sessions:>7,.0f} acciones/sesión | "
+          f"bloques {BLOCK_SIZES} | por bloque: {t_legacy:6.2f}s | sumas acumuladas: {t_vector * 1000:6.1f} ms "
+          f"| x{t_legacy / t_vector:,.0f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 400_000, int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,114 @@
+"""
+Benchmark del parseo de logs: implementación fila a fila original vs constructor columnar.
+
+Uso:
+    python -m pruebas.bench_log_parser            # 100k y 1M documentos
+    python -m pruebas.bench_log_parser 50000      # tamaños personalizados
+"""
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from python_analysis.log_parser import LogParser
+
+
+# ============================================================
+# Implementación original (fila a fila), como referencia
+# ============================================================
+def legacy_parse_logs(logs, expand_context=True):
+    parsed = []
+    for log in logs:
+        session_id = log.get("session_id") or log.get("event_context", {}).get("session_id")
+        group_id = log.get("group_id") or log.get("event_context", {}).get("group_id")
+
+        base = {
+            "timestamp": pd.to_datetime(log.get("timestamp")),
+            "user_id": log.get("user_id", "UNKNOWN"),
+            "group_id": group_id,
+            "session_id": session_id,
+            "event_type": log.get("event_type", "undefined"),
+            "event_name": log.get("event_name", "undefined"),
+            "event_value": log.get("event_value", None),
+        }
+        try:
+            base["event_value"] = float(base["event_value"])
+        except (ValueError, TypeError):
+            pass
+
+        context = {}
+        if "event_context" in log and isinstance(log["event_context"], dict):
+            for k, v in log["event_context"].items():
+                if k in ["session_id", "group_id"]:
+                    continue
+                if isinstance(v, dict) and all(key in v for key in ["x", "y", "z"]):
+                    context[f"{k}_x"] = v["x"]
+                    context[f"{k}_y"] = v["y"]
+                    context[f"{k}_z"] = v["z"]
+                else:
+                    context[k] = v
+
+        row = {**base, **context} if expand_context else {**base, "context": json.dumps(context)}
+        parsed.append(row)
+
+    return pd.DataFrame(parsed)
+
+
+# ============================================================
+# Datos sintéticos (mezcla típica: telemetría a 25 Hz + eventos discretos)
+# ============================================================
+def make_logs(n, seed=0):
+    rnd = random.Random(seed)
+    t0 = datetime(2025, 9, 26, 14, 0, 0)
+    logs = []
+    for i in range(n):
+        ts = t0 + timedelta(milliseconds=40 * i)
+        sid = f"S{i // 20000}"
+        kind = i % 3
+        if kind == 0:
+            name, etype = "movement_frame", "navigation"
+            ctx = {"position": {"x": rnd.uniform(0, 20), "y": 1.7, "z": rnd.uniform(0, 12)},
+                   "velocity": rnd.random(), "dir_forward": {"x": 0.0, "y": 0.0, "z": 1.0}}
+        elif kind == 1:
+            name, etype = "gaze_frame", "gaze"
+            ctx = {"target": rnd.choice(["Wall", "Door", "Floor"]),
+                   "hit_position": {"x": rnd.uniform(0, 20), "y": 0.0, "z": rnd.uniform(0, 12)}}
+        else:
+            name, etype = "eye_frame", "eye_tracking"
+            ctx = {"target": "Door", "pupil_diameter_left": rnd.uniform(2, 5),
+                   "pupil_diameter_right": rnd.uniform(2, 5), "valid_combined": True}
+        value = None
+        if rnd.random() < 0.02:
+            name, etype, value, ctx = "target_hit", "task", 1, {"target_id": "T1"}
+        logs.append({"timestamp": ts, "user_id": f"U{i // 20000:03d}", "session_id": sid, "group_id": "control",
+                     "event_type": etype, "event_name": name, "event_value": value, "event_context": ctx})
+    return logs
+
+
+def bench(n):
+    logs = make_logs(n)
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+
+    t = time.perf_counter()
+    legacy = legacy_parse_logs(logs)
+    t_legacy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    columnar = parser.parse_logs(logs, expand_context=True)
+    t_columnar = time.perf_counter() - t
+
+    assert len(legacy) == len(columnar)
+    assert set(legacy.columns) == set(columnar.columns)
+
+    print(f"{n:>9,} docs | fila a fila: {t_legacy:7.2f}s ({n / t_legacy:>10,.0f} docs/s)"
+          f" | columnar: {t_columnar:7.2f}s ({n / t_columnar:>10,.0f} docs/s)"
+          f" | x{t_legacy / t_columnar:.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,36 @@
+"""
+Barrido de hilos para la lectura particionada de Mongo (LogParser.parallel_log_tables).
+Usa la conexión del .env (MONGO_URI / DB_NAME / COLLECTION_NAME) y no modifica datos.
+
+Uso:
+    python -m pruebas.bench_parallel_fetch            # 1, 2, 4 y 8 hilos
+    python -m pruebas.bench_parallel_fetch 1 4 16     # hilos personalizados
+"""
+import sys
+import time
+
+from python_analysis.log_parser import LogParser
+
+
+def bench(workers_list, batch_size=5000):
+    parser = LogParser()
+    print(f"Colección: {parser.db_name}.{parser.collection_name}")
+
+    # Referencia: un solo cursor
+    start = time.perf_counter()
+    tables = parser.parse_log_table_batches(parser.iter_logs(batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+    n_docs = sum(len(t) for t in tables.values())
+    print(f"{'1 cursor':>10} | {n_docs:>10,} docs | {elapsed:7.2f}s | {n_docs / elapsed:>10,.0f} docs/s")
+
+    for workers in workers_list:
+        parser.parallel_log_tables(workers=workers, batch_size=batch_size)
+        stats = parser.last_fetch_stats
+        print(f"{workers:>7} h. | {stats['docs']:>10,} docs | {stats['seconds']:7.2f}s | "
+              f"{stats['docs_per_sec']:>10,.0f} docs/s | x{elapsed / stats['seconds']:.2f}")
+
+    parser.close()
+
+
+if __name__ == "__main__":
+    bench([int(a) for a in sys.argv[1:]] or [1, 2, 4, 8])
@@ -0,0 +1,103 @@
+"""
+Benchmark de la re-puntuación desde valores brutos cacheados (RawMetricsCache): cambiar solo
+pesos, rangos, invert y perfiles vs volver a calcular compute_all + compute_grouped_metrics.
+Comprueba que grouped_metrics.csv, results.json y group_results re-puntuados son idénticos
+a los del cálculo completo con la config nueva.
+
+Uso:
+    python -m pruebas.bench_rescore              # 200k filas, 200 sesiones
+    python -m pruebas.bench_rescore 500000 1000
+"""
+import copy
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from pruebas.bench_grouped_metrics import CATEGORIES, make_logs
+from python_analysis.exporter import MetricsExporter
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.raw_metrics_cache import RawMetricsCache, config_fingerprint
+
+
+def make_config():
+    calc = MetricsCalculator.from_prepared(None, {}, {})
+    metrics = {cat: {} for cat in CATEGORIES}
+    for i, name in enumerate(calc._available_metric_functions()):
+        metrics[CATEGORIES[i % 4]][name] = {"weight": 1.0, "min": 0, "max": 100}
+    metrics["efectividad"]["ui_errors"] = {"target_event": "ui_error", "aggregation": "count",
+                                           "weight": 1.0, "min": 0, "max": 10, "invert": True}
+    return {"metrics": metrics, "event_roles": {"target_hit": "action_success", "target_miss": "action_fail"},
+            "profiles": {"novice": {"efectividad_weight": 1, "presencia_weight": 1}}}
+
+
+def tuned(config):
+    # Solo parámetros de puntuación: la huella de los valores brutos no cambia
+    config = copy.deepcopy(config)
+    for i, params in enumerate(p for cat in config["metrics"].values() for p in cat.values()):
+        params.update({"weight": 1 + i % 4, "min": i % 3, "max": 10 * (i + 1), "invert": i % 2 == 1})
+    config["profiles"]["novice"] = {"efectividad_weight": 3, "eficiencia_weight": 0.5, "presencia_weight": 2}
+    return config
+
+
+def export(results_dir, raw_results, grouped):
+    summary = MetricsExporter.summarize(raw_results)
+    exporter = MetricsExporter(summary, output_dir=results_dir)
+    exporter.to_json("results.json")
+    exporter.to_csv("results.csv")
+    MetricsExporter.export_multiple([summary], ["Global"], mode="json", output_dir=results_dir,
+                                    filename="group_results")
+    grouped.to_csv(results_dir / "grouped_metrics.csv", index=False)
+
+
+def read_outputs(results_dir):
+    return {name: (results_dir / name).read_text(encoding="utf-8")
+            for name in ("results.json", "results.csv", "group_results", "grouped_metrics.csv")}
+
+
+def bench(n_rows, n_sessions):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    df = parser.parse_logs(make_logs(n_rows, n_sessions), expand_context=True)
+    config = make_config()
+    new_config = tuned(config)
+    assert config_fingerprint(config) == config_fingerprint(new_config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = RawMetricsCache(tmp / "cache")
+
+        # Ejecución inicial: cálculo completo y valores brutos a la caché
+        calc = MetricsCalculator(df, experiment_config=config)
+        raw_results, grouped = calc.compute_all(), calc.compute_grouped_metrics()
+        fingerprint = cache.fingerprint(calc)
+        cache.save(fingerprint, calc, grouped, raw_results)
+        results_dir = tmp / "results"
+        results_dir.mkdir()
+        export(results_dir, raw_results, grouped)
+        RawMetricsCache.write_manifest(results_dir, fingerprint, config)
+
+        # Config nueva: cálculo completo
+        t = time.perf_counter()
+        calc = MetricsCalculator(df, experiment_config=new_config)
+        raw_results, grouped = calc.compute_all(), calc.compute_grouped_metrics()
+        t_full = time.perf_counter() - t
+        expected_dir = tmp / "expected"
+        expected_dir.mkdir()
+        export(expected_dir, raw_results, grouped)
+
+        # Config nueva: re-puntuación desde la caché
+        t = time.perf_counter()
+        cache.rescore_results(results_dir, new_config)
+        t_rescore = time.perf_counter() - t
+
+        assert read_outputs(results_dir) == read_outputs(expected_dir)
+    print(f"{n_rows:>8,} filas | {n_sessions:>5} sesiones | cálculo completo: {t_full:6.2f}s | "
+          f"re-puntuación: {t_rescore * 1000:6.1f} ms | x{t_full / t_rescore:,.0f}")
+    print("✅ grouped_metrics.csv, results.json/csv y group_results idénticos")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
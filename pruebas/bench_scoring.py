@@ -0,0 +1,73 @@
+"""
+Benchmark de la puntuación: _score_category + compute_global_score sesión a sesión (normalize
+escalar por métrica) vs score_matrix sobre la matriz sesiones × métricas. Es el paso que se
+repite al cambiar solo pesos o rangos con los valores brutos ya calculados.
+
+Uso:
+    python -m pruebas.bench_scoring              # 20k sesiones
+    python -m pruebas.bench_scoring 100000
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from python_analysis.metrics import CATEGORIES, MetricsCalculator
+
+
+def make_calculator():
+    calc = MetricsCalculator.from_prepared(None, {}, {})
+    metrics = {cat: {} for cat in CATEGORIES}
+    for i, name in enumerate(calc._available_metric_functions()):
+        metrics[CATEGORIES[i % 4]][name] = {"weight": 1 + i % 3, "min": 0, "max": 10 * (i + 1), "invert": i % 2 == 0}
+    metrics["presencia"]["hits_count"] = {"weight": 1, "target_event": "target_hit", "aggregation": "count"}
+    config = {"metrics": metrics, "profiles": {"novice": {"efectividad_weight": 2, "presencia_weight": 0.5}}}
+    return MetricsCalculator.from_prepared(None, {}, config)
+
+
+def make_raw(calc, n_sessions, seed=0):
+    rng = np.random.default_rng(seed)
+    funcs = calc._available_metric_functions()
+    columns = [calc.metric_column(cat, name, funcs) for cat in CATEGORIES for name in calc.metrics_cfg[cat]]
+    raw = pd.DataFrame(rng.random((n_sessions, len(columns))) * 200, columns=columns)
+    # Métricas opcionales omitidas en algunas sesiones
+    return raw.mask(rng.random(raw.shape) < 0.1)
+
+
+def legacy_scores(calc, raw):
+    funcs = calc._available_metric_functions()
+    rows = []
+    for record in raw.to_dict("records"):
+        cat_scores, valid_cats = {}, {}
+        for cat in CATEGORIES:
+            def raw_value_of(metric_name, params):
+                value = record.get(calc.metric_column(cat, metric_name, funcs))
+                return None if pd.isna(value) else value
+            cat_scores[cat] = calc._score_category(cat, raw_value_of)
+            valid_cats[cat] = len(cat_scores[cat]) > 1
+        row = {f"{cat}_score": cat_scores[cat]["score"] for cat in CATEGORIES}
+        row["global_score"] = calc.compute_global_score(cat_scores, valid_cats)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def bench(n_sessions):
+    calc = make_calculator()
+    raw = make_raw(calc, n_sessions)
+
+    t = time.perf_counter()
+    legacy = legacy_scores(calc, raw)
+    t_legacy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    scores = calc.score_matrix(raw)
+    t_matrix = time.perf_counter() - t
+
+    pd.testing.assert_frame_equal(legacy, scores, check_exact=True)
+    print(f"{n_sessions:>8,} sesiones × {raw.shape[1]} métricas | por sesión: {t_legacy:6.2f}s"
+          f" | score_matrix: {t_matrix * 1000:6.1f} ms | x{t_legacy / t_matrix:,.0f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
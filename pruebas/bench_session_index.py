@@ -0,0 +1,67 @@
+"""
+Benchmark de independent_variable por sesión: búsqueda original en cada grupo (columna plana,
+objeto 'session' y json.loads de los session_start) vs el índice de metadatos de sesión
+(SessionIndex) construido una vez con los eventos config / session_start.
+
+Uso:
+    python -m pruebas.bench_session_index              # 200k filas, 2000 sesiones
+    python -m pruebas.bench_session_index 500000 5000
+"""
+import sys
+import time
+
+from pruebas.bench_grouped_metrics import make_config, make_logs
+from python_analysis.grouped_metrics import GroupedMetricsEngine
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.session_index import SessionIndex
+
+CONDITIONS = ["visual", "audio", "mixed"]
+
+
+def with_session_events(logs, n_sessions):
+    # experiment_config + session_start al principio de cada sesión, como los envía Unity
+    per_session = len(logs) // n_sessions
+    out = []
+    for s in range(n_sessions):
+        first = logs[s * per_session]
+        base = {k: first[k] for k in ("timestamp", "user_id", "session_id", "group_id")}
+        iv = CONDITIONS[s % len(CONDITIONS)]
+        out.append(dict(base, event_type="config", event_name="experiment_config", event_value=None,
+                        event_context={"session": {"independent_variable": iv, "map_name": f"Maze{s % 3 + 1}",
+                                                   "play_area_width": 4.0, "play_area_depth": 3.0}}))
+        out.append(dict(base, event_type="system", event_name="session_start", event_value=None,
+                        event_context={"independent_variable": iv}))
+        out.extend(logs[s * per_session:(s + 1) * per_session])
+    return out
+
+
+def bench(n_rows, n_sessions):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    logs = with_session_events(make_logs(n_rows, n_sessions), n_sessions)
+    for expand_context in (True, False):
+        df = parser.parse_logs(logs, expand_context=expand_context)
+        calc = MetricsCalculator(df, experiment_config=make_config())
+
+        t = time.perf_counter()
+        legacy = GroupedMetricsEngine(calc).independent_variables()
+        t_legacy = time.perf_counter() - t
+
+        t = time.perf_counter()
+        calc.session_index = SessionIndex.from_events(calc.df)
+        indexed = GroupedMetricsEngine(calc).independent_variables()
+        t_index = time.perf_counter() - t
+
+        expected = [CONDITIONS[s % len(CONDITIONS)] for s in range(n_sessions)]
+        assert indexed == expected
+        if expand_context:
+            assert legacy == indexed
+        # Sin expandir el contexto, la búsqueda original no encuentra la variable (contexto como JSON)
+        found = sum(v is not None for v in legacy)
+        print(f"{'expandido' if expand_context else 'JSON':>9} | {n_sessions:>5} sesiones | "
+              f"por grupo: {t_legacy * 1000:7.1f} ms ({found} encontradas) | "
+              f"índice: {t_index * 1000:6.1f} ms ({n_sessions} encontradas)")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
@@ -0,0 +1,58 @@
+"""
+Benchmark de StreamingMetricsCalculator: coste de cada lote con acumuladores por sesión vs
+recalcular MetricsCalculator.compute_grouped_metrics sobre todo lo recibido hasta ese momento.
+Los logs llegan ordenados por timestamp en lotes de 1000 (ya parseados: solo se mide el cálculo).
+Al final comprueba que las métricas en vivo coinciden con el cálculo completo.
+
+Uso:
+    python -m pruebas.bench_streaming_metrics            # 200k filas, 50 sesiones
+    python -m pruebas.bench_streaming_metrics 500000
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from pruebas.bench_grouped_metrics import make_config, make_logs
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.streaming_metrics import StreamingMetricsCalculator
+
+BATCH_SIZE = 1000
+CHECKPOINTS = 5
+
+
+def bench(n_rows, n_sessions=50):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    config = make_config()
+    logs = sorted(make_logs(n_rows, n_sessions), key=lambda log: log["timestamp"])
+    batches = [parser.parse_logs(logs[i:i + BATCH_SIZE], expand_context=True)
+               for i in range(0, len(logs), BATCH_SIZE)]
+
+    stream = StreamingMetricsCalculator(config)
+    checkpoints = set(np.linspace(0, len(batches) - 1, CHECKPOINTS).astype(int))
+    for i, batch in enumerate(batches):
+        t = time.perf_counter()
+        stream.update(batch)
+        t_update = time.perf_counter() - t
+        if i not in checkpoints:
+            continue
+
+        t = time.perf_counter()
+        full = MetricsCalculator(pd.concat(batches[:i + 1], ignore_index=True), experiment_config=config)
+        reference = full.compute_grouped_metrics()
+        t_full = time.perf_counter() - t
+        print(f"lote {i + 1:>4}/{len(batches)} | {(i + 1) * BATCH_SIZE:>8,} filas | "
+              f"update: {t_update * 1000:6.1f} ms | recálculo completo: {t_full * 1000:8.1f} ms")
+
+    live = stream.snapshot().set_index(["user_id", "group_id", "session_id"]).sort_index()
+    reference = reference.set_index(["user_id", "group_id", "session_id"]).sort_index()
+    for col in reference.columns.drop("independent_variable"):
+        assert np.allclose(live[col].astype(float), reference[col].astype(float), rtol=1e-9, equal_nan=True), col
+    assert live["independent_variable"].equals(reference["independent_variable"])
+    print(f"✅ {len(live)} sesiones: métricas en vivo = cálculo completo")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,70 @@
+"""
+Benchmark de success_after_restart: bucle original (iterrows + filtro del df completo por
+reinicio) vs último éxito por sesión con un único groupby.
+
+Uso:
+    python -m pruebas.bench_success_after_restart            # 10k reinicios
+    python -m pruebas.bench_success_after_restart 2000
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+
+
+def make_logs(n_restarts, n_sessions=50, seed=0):
+    rnd = random.Random(seed)
+    t0 = datetime(2025, 9, 26, 14, 0, 0)
+    names = ["task_restart", "task_end", "target_hit", "walk_step"]
+    logs, restarts = [], 0
+    while restarts < n_restarts:
+        s = rnd.randrange(n_sessions)
+        name = rnd.choices(names, weights=[25, 10, 25, 40])[0]
+        restarts += name == "task_restart"
+        logs.append({"timestamp": t0 + timedelta(milliseconds=250 * len(logs)), "user_id": f"U{s:03d}",
+                     "session_id": f"S{s:03d}", "group_id": f"G{s % 3}", "event_type": "task", "event_name": name,
+                     "event_value": rnd.choice(["success", "fail"]) if name == "task_end" else None})
+    return logs
+
+
+def legacy_success_after_restart(df):
+    # Versión original: O(reinicios × filas)
+    restarts = df[df["event_role"] == "task_restart"]
+    if restarts.empty:
+        return 0.0
+    success_count = 0
+    for idx, restart_row in restarts.iterrows():
+        future_successes = df[
+            (df["session_id"] == restart_row["session_id"]) &
+            (df["timestamp"] > restart_row["timestamp"]) &
+            (df["event_role"] == "task_end") &
+            (df["event_value"].astype(str).str.lower() == "success")
+            ]
+        if not future_successes.empty:
+            success_count += 1
+    return success_count / len(restarts)
+
+
+def bench(n_restarts):
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    df = parser.parse_logs(make_logs(n_restarts), expand_context=True)
+    calc = MetricsCalculator(df, experiment_config={"event_roles": {"target_hit": "action_success"}})
+
+    t = time.perf_counter()
+    legacy = legacy_success_after_restart(calc.df)
+    t_legacy = time.perf_counter() - t
+
+    t = time.perf_counter()
+    value = calc.success_after_restart()
+    t_new = time.perf_counter() - t
+
+    assert legacy == value, (legacy, value)
+    print(f"{len(df):>8,} filas | {n_restarts:>6,} reinicios | iterrows: {t_legacy:7.2f}s"
+          f" | último éxito por sesión: {t_new * 1000:6.1f} ms | x{t_legacy / t_new:,.0f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
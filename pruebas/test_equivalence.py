@@ -0,0 +1,601 @@
+"""
+Equivalencia de las versiones optimizadas con la implementación original, en un solo sitio.
+
+El módulo lleva su propia copia reducida de la implementación original (parseo fila a fila y
+MetricsCalculator por sesión, sin los caminos ideales) y un fixture hecho a mano con dos
+sesiones. Los valores brutos de todas las métricas están calculados a mano en EXPECTED: se
+comprueba que la copia original los reproduce y que las versiones optimizadas (agrupada, con
+procesos, con tablas de telemetría, en streaming, re-puntuación) dan lo mismo. Los
+pruebas/bench_*.py solo miden tiempos con datos grandes.
+
+Uso:
+    python -m pruebas.test_equivalence
+    python -m pytest pruebas/test_equivalence.py
+"""
+import copy
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from python_analysis import iv_statistics
+from python_analysis.exporter import MetricsExporter
+from python_analysis.grouped_metrics import GroupedMetricsEngine
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import CATEGORIES, MetricsCalculator
+from python_analysis.raw_metrics_cache import RawMetricsCache, config_fingerprint
+from python_analysis.session_index import SessionIndex
+from python_analysis.streaming_metrics import StreamingMetricsCalculator
+
+PARSER = LogParser.__new__(LogParser)  # sin conexión a Mongo
+KEYS = ["user_id", "group_id", "session_id"]
+T0 = pd.Timestamp("2025-01-01T10:00:00Z")
+
+
+# ============================================================
+# Fixture: dos sesiones hechas a mano
+# ============================================================
+def event(second, session, name, value=None, **context):
+    user = {"S1": "U1", "S2": "U2"}[session]
+    return {"timestamp": (T0 + pd.Timedelta(seconds=second)).isoformat(), "user_id": user, "group_id": "G1",
+            "session_id": session, "event_type": "task", "event_name": name, "event_value": value,
+            "event_context": context}
+
+
+# S1: tres tareas (éxito, fallo, éxito) con dos reinicios intermedios y uno al final, audio,
+# ayuda y error de interfaz. S2: una tarea fallida con seis acciones.
+DOCS = sorted([
+    event(0, "S1", "session_start", independent_variable="audio"),
+    event(1, "S1", "task_start"),
+    event(2, "S1", "audio_triggered"),
+    event(2.5, "S1", "head_turn"),
+    event(3, "S1", "target_hit", 2),
+    event(4, "S1", "target_miss"),
+    event(5, "S1", "target_hit", 4),
+    event(6, "S1", "task_end", "success", audio_enabled=True),
+    event(7, "S1", "task_restart"),
+    event(8, "S1", "task_start"),
+    event(9, "S1", "target_miss"),
+    event(11, "S1", "hint_shown"),
+    event(12, "S1", "ui_error"),
+    event(13, "S1", "target_hit", 3),
+    event(20, "S1", "task_end", "fail", audio_enabled=False),
+    event(21, "S1", "task_restart"),
+    event(22, "S1", "task_start"),
+    event(24, "S1", "target_hit", 1),
+    event(26, "S1", "task_end", "success", audio_enabled=False),
+    event(28, "S1", "task_restart"),
+    event(30, "S1", "session_end"),
+
+    event(0, "S2", "session_start", independent_variable="visual"),
+    event(2, "S2", "task_start"),
+    event(5, "S2", "target_miss"),
+    event(9, "S2", "target_miss"),
+    event(10, "S2", "target_hit", 6),
+    event(11, "S2", "target_miss"),
+    event(12, "S2", "target_hit", 5),
+    event(14, "S2", "target_hit", 1),
+    event(15, "S2", "task_end", "fail", audio_enabled=True),
+    event(22, "S2", "session_end"),
+], key=lambda doc: doc["timestamp"])
+
+# Todas las métricas integradas salvo los caminos ideales, más dos genéricas
+METRICS = ["hit_ratio", "precision", "success_rate", "learning_curve_mean", "avg_reaction_time_ms",
+           "avg_task_duration_ms", "time_per_success_s", "retries_after_end", "voluntary_play_time_s",
+           "aid_usage", "inactivity_time_s", "first_success_time_s", "sound_localization_time_s",
+           "activity_level_per_min", "progression", "success_after_restart", "navigation_errors", "aim_errors",
+           "task_duration_success", "task_duration_fail", "interface_errors", "learning_stability",
+           "error_reduction_rate", "audio_performance_gain"]
+CONFIG = {
+    "metrics": {cat: {} for cat in CATEGORIES},
+    "event_roles": {"target_hit": "action_success", "target_miss": "action_fail", "hint_shown": "help_event"},
+    "profiles": {"novice": {"efectividad_weight": 2, "presencia_weight": 0.5}},
+}
+for _i, _name in enumerate(METRICS):
+    CONFIG["metrics"][CATEGORIES[_i % 4]][_name] = {"weight": 1 + _i % 3, "min": 0, "max": 10 * (_i + 1),
+                                                    "invert": _i % 2 == 1}
+CONFIG["metrics"]["presencia"]["hits_count"] = {"target_event": "target_hit", "aggregation": "count",
+                                                "weight": 1.0, "min": 0, "max": 10}
+CONFIG["metrics"]["presencia"]["hits_avg"] = {"target_event": "target_hit", "aggregation": "average",
+                                              "weight": 1.0, "min": 0, "max": 10}
+
+# Valores brutos por sesión (S1, S2), calculados a mano sobre DOCS
+EXPECTED = {
+    "hit_ratio": (4 / 6, 3 / 6),
+    "precision": (4 / 6, 3 / 6),
+    "success_rate": (2 / 3, 0.0),
+    "learning_curve_mean": ((3 / 5 + 1) / 2, (2 / 5 + 1) / 2),  # bloques de 5 acciones
+    "avg_reaction_time_ms": ((2000 + 1000 + 2000) / 3, 3000.0),
+    "avg_task_duration_ms": ((5000 + 12000 + 4000) / 3, 13000.0),
+    "time_per_success_s": (30 / 4, 22 / 3),
+    "retries_after_end": (3, 0),
+    "voluntary_play_time_s": (4.0, 0.0),  # S1: último task_end con éxito a los 26 s, fin a los 30 s
+    "aid_usage": (1, 0),
+    "inactivity_time_s": (7.0, 7.0),  # huecos de más de 5 s: 13 -> 20 y 15 -> 22
+    "first_success_time_s": (3.0, 10.0),
+    "sound_localization_time_s": (0.5, np.nan),  # S2 sin audio_triggered / head_turn: no se evalúa
+    "activity_level_per_min": (21 / 0.5, 10 / (22 / 60)),  # filas por minuto
+    "progression": (2, 0),
+    "success_after_restart": (2 / 3, 0.0),  # el reinicio de los 28 s no va seguido de un éxito
+    "navigation_errors": (2, 3),
+    "aim_errors": (2, 3),
+    "task_duration_success": ((5000 + 12000 + 4000) / 3, 13000.0),
+    "task_duration_fail": ((5000 + 12000 + 4000) / 3, 13000.0),
+    "interface_errors": (1, 0),
+    "learning_stability": (1 / 1.2, 1 / 1.3),  # 1 / (1 + std de los bloques)
+    "error_reduction_rate": (0.4, 0.6),
+    "audio_performance_gain": (1.0, 0.0),  # S1: éxito 1.0 con audio frente a 0.5 sin él
+    "presencia_hits_count": (4.0, 3.0),
+    "presencia_hits_avg": (2.5, 4.0),
+}
+CURVES = {2: [[0.5, 0.5, 1.0], [0.0, 0.5, 1.0]], 5: [[0.6, 1.0], [0.4, 1.0]], 20: [[4 / 6], [0.5]]}
+
+
+# ============================================================
+# Implementación original (reducida a lo que usa el fixture)
+# ============================================================
+def legacy_parse_logs(logs, expand_context=True):
+    parsed = []
+    for log in logs:
+        session_id = log.get("session_id") or log.get("event_context", {}).get("session_id")
+        group_id = log.get("group_id") or log.get("event_context", {}).get("group_id")
+
+        base = {
+            "timestamp": pd.to_datetime(log.get("timestamp")),
+            "user_id": log.get("user_id", "UNKNOWN"),
+            "group_id": group_id,
+            "session_id": session_id,
+            "event_type": log.get("event_type", "undefined"),
+            "event_name": log.get("event_name", "undefined"),
+            "event_value": log.get("event_value", None),
+        }
+        try:
+            base["event_value"] = float(base["event_value"])
+        except (ValueError, TypeError):
+            pass
+
+        context = {}
+        if "event_context" in log and isinstance(log["event_context"], dict):
+            for k, v in log["event_context"].items():
+                if k in ["session_id", "group_id"]:
+                    continue
+                if isinstance(v, dict) and all(key in v for key in ["x", "y", "z"]):
+                    context[f"{k}_x"] = v["x"]
+                    context[f"{k}_y"] = v["y"]
+                    context[f"{k}_z"] = v["z"]
+                else:
+                    context[k] = v
+
+        row = {**base, **context} if expand_context else {**base, "context": json.dumps(context)}
+        parsed.append(row)
+
+    return pd.DataFrame(parsed)
+
+
+class LegacyCalculator:
+    """MetricsCalculator original: cada métrica filtra el DataFrame de la sesión."""
+
+    CORE_ROLES = ["action_success", "action_fail", "task_start", "task_end", "task_restart", "navigation_error",
+                  "session_start", "session_end"]
+
+    def __init__(self, df, experiment_config):
+        self.df = df.copy()
+        self.config = experiment_config
+        self.df["timestamp"] = pd.to_datetime(self.df["timestamp"], utc=True, errors="coerce")
+        roles_cfg = self.config.get("event_roles", {})
+        self.df["event_role"] = self.df["event_name"].apply(
+            lambda ev: ev if ev in self.CORE_ROLES else roles_cfg.get(ev, "custom_event"))
+
+    @staticmethod
+    def normalize(value, min_val, max_val, invert=False):
+        if pd.isna(value):
+            return 0.0
+        if min_val is None or max_val is None:
+            return value
+        if abs(max_val - min_val) < 1e-9:
+            return 0.0
+        v = np.clip((value - min_val) / (max_val - min_val), 0, 1)
+        return 1 - v if invert else v
+
+    def hit_ratio(self, df):
+        hits = len(df[df["event_role"] == "action_success"])
+        fails = len(df[df["event_role"] == "action_fail"])
+        return hits / (hits + fails) if hits + fails > 0 else 0.0
+
+    def precision(self, df):
+        actions = df[df["event_role"].isin(["action_success", "action_fail"])]
+        if len(actions) == 0: return np.nan
+        return len(actions[actions["event_role"] == "action_success"]) / len(actions)
+
+    def success_rate(self, df):
+        tasks = df[df["event_role"] == "task_end"]
+        if len(tasks) == 0: return np.nan
+        return len(tasks[tasks["event_value"].astype(str).str.lower() == "success"]) / len(tasks)
+
+    def learning_curve(self, df, block_size=5):
+        actions = df[df["event_role"].isin(["action_success", "action_fail"])]
+        res = []
+        for i in range(0, len(actions), block_size):
+            block = actions.iloc[i:i + block_size]
+            res.append(len(block[block["event_role"] == "action_success"]) / len(block))
+        return res
+
+    def _derive_task_stats(self, df):
+        tmp = df.sort_values("timestamp")
+        starts = tmp[tmp["event_role"] == "task_start"].reset_index(drop=True)
+        ends = tmp[tmp["event_role"] == "task_end"].reset_index(drop=True)
+        durations, reactions = [], []
+        for i in range(min(len(starts), len(ends))):
+            t0, t1 = starts.loc[i, "timestamp"], ends.loc[i, "timestamp"]
+            if t0 > t1:
+                continue
+            durations.append((t1 - t0).total_seconds() * 1000.0)
+            actions = tmp[(tmp["event_role"].isin(["action_success", "action_fail"])) &
+                          (tmp["timestamp"] >= t0) & (tmp["timestamp"] <= t1)]
+            reactions.append((actions.iloc[0]["timestamp"] - t0).total_seconds() * 1000.0
+                             if not actions.empty else np.nan)
+        return pd.DataFrame({"task_duration_ms": durations, "reaction_time_ms": reactions})
+
+    def avg_reaction_time(self, df):
+        vals = self._derive_task_stats(df)["reaction_time_ms"].dropna()
+        return float(vals.mean()) if len(vals) > 0 else np.nan
+
+    def avg_task_duration(self, df):
+        vals = self._derive_task_stats(df)["task_duration_ms"].dropna()
+        return float(vals.mean()) if len(vals) > 0 else np.nan
+
+    def time_per_success(self, df):
+        hits = df[df["event_role"] == "action_success"]
+        if len(hits) == 0: return np.nan
+        return (df["timestamp"].max() - df["timestamp"].min()).total_seconds() / len(hits)
+
+    def retries_after_end(self, df):
+        return len(df[df["event_role"] == "task_restart"])
+
+    def voluntary_play_time(self, df):
+        task_end_events = df[(df["event_role"] == "task_end") & (df["event_value"] == "success")]
+        if task_end_events.empty:
+            return 0.0
+        diff = (df["timestamp"].max() - task_end_events["timestamp"].max()).total_seconds()
+        return diff if diff > 2.0 else 0.0
+
+    def aid_usage(self, df):
+        return len(df[df["event_role"] == "help_event"])
+
+    def inactivity_time(self, df, threshold=5):
+        diffs = df["timestamp"].sort_values().diff().dt.total_seconds()
+        return diffs[diffs > threshold].sum()
+
+    def first_success_time(self, df):
+        start = df[df["event_role"].isin(["session_start", "task_start"])]["timestamp"].min()
+        succ = df[df["event_role"] == "action_success"]["timestamp"].min()
+        if pd.notna(start) and pd.notna(succ):
+            return (succ - start).total_seconds()
+        end = df[df["event_role"] == "task_end"]["timestamp"].min()
+        if pd.notna(start) and pd.notna(end):
+            return (end - start).total_seconds()
+        return np.nan
+
+    def sound_localization_time(self, df):
+        audio = df[df["event_name"] == "audio_triggered"]["timestamp"].min()
+        head = df[df["event_name"] == "head_turn"]["timestamp"].min()
+        if pd.notna(audio) and pd.notna(head) and head > audio:
+            return (head - audio).total_seconds()
+        return None
+
+    def activity_level(self, df):
+        dur = (df["timestamp"].max() - df["timestamp"].min()).total_seconds() / 60
+        return len(df) / dur if dur > 0 else np.nan
+
+    def learning_curve_mean(self, df):
+        return float(np.nanmean(self.learning_curve(df)))
+
+    def progression(self, df):
+        succ = df[df["event_role"] == "task_end"]
+        return len(succ[succ["event_value"].astype(str).str.lower() == "success"])
+
+    def success_after_restart(self, df):
+        restarts = df[df["event_role"] == "task_restart"]
+        if restarts.empty:
+            return 0.0
+        success_count = 0
+        for _, restart_row in restarts.iterrows():
+            future_successes = df[
+                (df["session_id"] == restart_row["session_id"]) &
+                (df["timestamp"] > restart_row["timestamp"]) &
+                (df["event_role"] == "task_end") &
+                (df["event_value"].astype(str).str.lower() == "success")]
+            if not future_successes.empty:
+                success_count += 1
+        return success_count / len(restarts)
+
+    def navigation_errors(self, df):
+        return len(df[df["event_role"].isin(["navigation_error", "action_fail"])])
+
+    def aim_errors(self, df):
+        return len(df[df["event_role"] == "action_fail"])
+
+    def interface_errors(self, df):
+        return len(df[df["event_name"] == "ui_error"])
+
+    def learning_stability(self, df):
+        return 1.0 / (1.0 + np.std(self.learning_curve(df)))
+
+    def error_reduction_rate(self, df):
+        vals = self.learning_curve(df)
+        return vals[-1] - vals[0]
+
+    def audio_performance_gain(self, df):
+        score_with = self.success_rate(df[df["audio_enabled"] == True])
+        score_without = self.success_rate(df[df["audio_enabled"] == False])
+        if pd.notna(score_with) and pd.notna(score_without) and score_without > 0:
+            return (score_with - score_without) / score_without
+        return 0.0
+
+    def _available_metric_functions(self):
+        funcs = {name: getattr(self, name) for name in (
+            "hit_ratio", "precision", "success_rate", "learning_curve_mean", "retries_after_end", "aid_usage",
+            "progression", "success_after_restart", "navigation_errors", "aim_errors", "interface_errors",
+            "learning_stability", "error_reduction_rate", "audio_performance_gain")}
+        funcs.update({
+            "avg_reaction_time_ms": self.avg_reaction_time, "avg_task_duration_ms": self.avg_task_duration,
+            "time_per_success_s": self.time_per_success, "voluntary_play_time_s": self.voluntary_play_time,
+            "inactivity_time_s": self.inactivity_time, "first_success_time_s": self.first_success_time,
+            "sound_localization_time_s": self.sound_localization_time,
+            "activity_level_per_min": self.activity_level,
+            "task_duration_success": self.avg_task_duration, "task_duration_fail": self.avg_task_duration,
+        })
+        return funcs
+
+    def _calculate_generic_metric(self, df, target_event, aggregation):
+        subset = df[df["event_name"] == target_event]
+        if subset.empty: return 0.0
+        if aggregation.lower() == "count":
+            return float(len(subset))
+        vals = pd.to_numeric(subset["event_value"], errors="coerce").dropna()
+        if vals.empty: return 0.0
+        how = {"average": "mean", "mean": "mean", "sum": "sum", "max": "max", "min": "min"}.get(aggregation.lower())
+        return float(getattr(vals, how)()) if how else 0.0
+
+    def compute_category(self, category_name, df):
+        metric_funcs = self._available_metric_functions()
+        results, weighted_sum, total_weight = {}, 0, 0
+        for metric_name, params in self.config["metrics"].get(category_name, {}).items():
+            func = metric_funcs.get(metric_name)
+            if func is not None:
+                raw_value = func(df)
+            else:
+                raw_value = self._calculate_generic_metric(df, params["target_event"], params["aggregation"])
+            if raw_value is None:
+                continue
+            if pd.isna(raw_value):
+                raw_value = 0.0
+            weight = params.get("weight", 1.0)
+            normalized = self.normalize(raw_value, params.get("min"), params.get("max"), params.get("invert", False))
+            results[metric_name] = {"raw": raw_value, "normalized": normalized, "weight": weight}
+            weighted_sum += normalized * weight
+            total_weight += weight
+        results["score"] = weighted_sum / total_weight if total_weight > 0 else 0.0
+        return results
+
+    def compute_global_score(self, cat_scores, valid_cats):
+        profile = self.config.get("profiles", {}).get("novice", {})
+        weights = {cat: profile.get(f"{cat}_weight", 1) if valid_cats.get(cat, False) else 0 for cat in CATEGORIES}
+        total_w = sum(weights.values())
+        if total_w == 0: return 0.0
+        return sum(cat_scores[cat] * weights[cat] for cat in CATEGORIES) / total_w
+
+    def compute_grouped_metrics(self):
+        metric_funcs = self._available_metric_functions()
+        rows = []
+        for (user, group, session), subdf in self.df.groupby(KEYS):
+            entry = {"user_id": user, "group_id": group, "session_id": session}
+            cat_scores, valid_cats = {}, {}
+            for cat_name in CATEGORIES:
+                cat_result = self.compute_category(cat_name, subdf)
+                cat_scores[cat_name] = cat_result["score"]
+                valid_cats[cat_name] = len(cat_result) > 1
+                for metric_key, val_dict in cat_result.items():
+                    if metric_key == "score": continue
+                    final_key = metric_key if metric_key in metric_funcs else f"{cat_name}_{metric_key}"
+                    entry[final_key] = val_dict["raw"]
+            entry.update({f"{cat}_score": score for cat, score in cat_scores.items()})
+            entry["global_score"] = self.compute_global_score(cat_scores, valid_cats)
+            iv = subdf["independent_variable"].dropna().unique()
+            entry["independent_variable"] = iv[0] if len(iv) > 0 else "N/A"
+            rows.append(entry)
+        return pd.DataFrame(rows)
+
+
+def legacy_statistics(grouped_df, n_resamples, confidence=0.95, seed=0):
+    """IC bootstrap y p-valores de permutación con un nanmean por remuestreo (mismos índices)."""
+    names, matrix = iv_statistics.numeric_metrics(grouped_df)
+    codes, levels = pd.factorize(grouped_df["independent_variable"], sort=True)
+    boot_seed, perm_seed = np.random.SeedSequence(seed).spawn(2)
+    level_seeds = boot_seed.spawn(len(levels))
+    alpha = (1 - confidence) / 2
+
+    cis = []
+    for k in range(len(levels)):
+        level_matrix = matrix[codes == k]
+        n = len(level_matrix)
+        means = []
+        for size, seed_seq in iv_statistics._chunks(n_resamples, level_seeds[k]):
+            for row in np.random.default_rng(seed_seq).integers(0, n, size=(size, n)):
+                means.append(np.nanmean(level_matrix[row], axis=0))
+        cis.append(np.nanpercentile(np.array(means), [100 * alpha, 100 * (1 - alpha)], axis=0))
+
+    def between_ss(labels):
+        grand = np.nanmean(matrix, axis=0)
+        total = 0.0
+        for k in range(len(levels)):
+            sub = matrix[labels == k]
+            count = (~np.isnan(sub)).sum(axis=0)
+            total = total + np.where(count > 0, count * (np.nanmean(sub, axis=0) - grand) ** 2, 0.0)
+        return total
+
+    observed = between_ss(codes)
+    exceed = np.zeros(len(names))
+    for size, seed_seq in iv_statistics._chunks(n_resamples, perm_seed):
+        rng = np.random.default_rng(seed_seq)
+        for perm in rng.permuted(np.tile(np.arange(len(codes)), (size, 1)), axis=1):
+            exceed += between_ss(codes[perm]) >= observed - 1e-9 * np.abs(observed)
+    return cis, (1 + exceed) / (1 + n_resamples)
+
+
+# ============================================================
+# Comprobaciones
+# ============================================================
+def legacy_grouped():
+    return LegacyCalculator(legacy_parse_logs(DOCS), CONFIG).compute_grouped_metrics()
+
+
+def check_expected(grouped):
+    grouped = grouped.set_index("session_id")
+    for col, values in EXPECTED.items():
+        assert np.allclose(grouped.loc[["S1", "S2"], col].astype(float), values, equal_nan=True), col
+
+
+def check_against_legacy(grouped):
+    legacy = legacy_grouped().set_index(KEYS)
+    grouped = grouped.set_index(KEYS)
+    assert set(grouped.columns) == set(legacy.columns)
+    for col in legacy.columns.drop("independent_variable"):
+        assert np.allclose(grouped[col].astype(float), legacy[col].astype(float), equal_nan=True), col
+    assert grouped["independent_variable"].tolist() == legacy["independent_variable"].tolist() == ["audio", "visual"]
+
+
+def test_legacy_copy_matches_hand_computed_values():
+    check_expected(legacy_grouped())
+
+
+def test_parse_logs_matches_row_by_row():
+    legacy = legacy_parse_logs(DOCS)
+    columnar = PARSER.parse_logs(DOCS, expand_context=True)
+    assert len(legacy) == len(columnar)
+    assert set(legacy.columns) == set(columnar.columns)
+    for col in ("user_id", "group_id", "session_id", "event_name", "independent_variable", "audio_enabled"):
+        assert legacy[col].astype(object).where(legacy[col].notna(), None).tolist() == \
+               columnar[col].astype(object).where(columnar[col].notna(), None).tolist(), col
+    assert (pd.to_datetime(legacy["timestamp"], utc=True) == pd.to_datetime(columnar["timestamp"], utc=True)).all()
+    assert [str(v) for v in legacy["event_value"]] == [str(v) for v in columnar["event_value"]]
+
+
+def test_grouped_metrics_match_legacy():
+    calc = MetricsCalculator(PARSER.parse_logs(DOCS, expand_context=True), experiment_config=CONFIG)
+    for grouped in (calc.compute_grouped_metrics(), calc.compute_grouped_metrics(workers=2)):
+        check_expected(grouped)
+        check_against_legacy(grouped)
+
+
+def test_grouped_metrics_with_frame_tables_and_session_index():
+    index = SessionIndex()
+    tables = PARSER.parse_log_tables(DOCS, session_index=index)
+    events = tables.pop("events")
+    grouped = MetricsCalculator(events, experiment_config=CONFIG, frame_tables=tables,
+                                session_index=index).compute_grouped_metrics()
+    check_expected(grouped)
+    check_against_legacy(grouped)
+
+
+def test_generic_metrics_match_legacy():
+    calc = MetricsCalculator(PARSER.parse_logs(DOCS, expand_context=True), experiment_config=CONFIG)
+    legacy_calc = LegacyCalculator(legacy_parse_logs(DOCS), CONFIG)
+    sessions = [legacy_calc.df[legacy_calc.df["session_id"] == s] for s in ("S1", "S2")]
+    expected = {
+        "target_hit": {"count": [4.0, 3.0], "sum": [10.0, 12.0], "average": [2.5, 4.0], "mean": [2.5, 4.0],
+                       "max": [4.0, 6.0], "min": [1.0, 1.0]},
+        "target_miss": {"count": [2.0, 3.0], "sum": [0.0, 0.0], "average": [0.0, 0.0], "mean": [0.0, 0.0],
+                        "max": [0.0, 0.0], "min": [0.0, 0.0]},
+        "ui_error": {"count": [1.0, 0.0], "max": [0.0, 0.0]},
+        "never_logged": {"count": [0.0, 0.0], "sum": [0.0, 0.0]},
+    }
+    for target, by_agg in expected.items():
+        for agg, values in by_agg.items():
+            legacy = [legacy_calc._calculate_generic_metric(s, target, agg) for s in sessions]
+            optimized = GroupedMetricsEngine(calc).generic_metric({"target_event": target, "aggregation": agg})
+            assert legacy == optimized == values, (target, agg)
+
+
+def test_learning_curves_match_block_loop():
+    calc = MetricsCalculator(PARSER.parse_logs(DOCS, expand_context=True), experiment_config=CONFIG)
+    legacy_calc = LegacyCalculator(legacy_parse_logs(DOCS), CONFIG)
+    curves = GroupedMetricsEngine(calc).learning_curves(tuple(CURVES))
+    for b, expected in CURVES.items():
+        legacy = [legacy_calc.learning_curve(legacy_calc.df[legacy_calc.df["session_id"] == s], b)
+                  for s in ("S1", "S2")]
+        assert np.allclose(np.concatenate(legacy), np.concatenate(expected)), b
+        assert np.allclose(np.concatenate([c for c in curves[b]]), np.concatenate(expected)), b
+
+
+def test_streaming_matches_legacy():
+    stream = StreamingMetricsCalculator(CONFIG)
+    for i in range(0, len(DOCS), 4):
+        stream.update(DOCS[i:i + 4])
+    live = stream.snapshot()
+    check_expected(live)
+    legacy = legacy_grouped().set_index(KEYS)
+    live = live.set_index(KEYS)
+    for col in legacy.columns.drop("independent_variable"):
+        assert np.allclose(live[col].astype(float), legacy[col].astype(float), equal_nan=True), col
+
+
+def export(results_dir, raw_results, grouped):
+    summary = MetricsExporter.summarize(raw_results)
+    exporter = MetricsExporter(summary, output_dir=results_dir)
+    exporter.to_json("results.json")
+    exporter.to_csv("results.csv")
+    grouped.to_csv(results_dir / "grouped_metrics.csv", index=False)
+    return {name: (results_dir / name).read_text(encoding="utf-8")
+            for name in ("results.json", "results.csv", "grouped_metrics.csv")}
+
+
+def test_rescore_matches_full_computation():
+    df = PARSER.parse_logs(DOCS, expand_context=True)
+    # Solo cambian pesos / rangos: las métricas brutas cacheadas siguen valiendo
+    new_config = copy.deepcopy(CONFIG)
+    for i, params in enumerate(p for cat in new_config["metrics"].values() for p in cat.values()):
+        params.update({"weight": 1 + i % 4, "min": i % 3, "max": 5 * (i + 1), "invert": i % 2 == 0})
+    new_config["profiles"]["novice"] = {"eficiencia_weight": 3, "satisfaccion_weight": 0.5}
+    assert config_fingerprint(CONFIG) == config_fingerprint(new_config)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = RawMetricsCache(tmp / "cache")
+        calc = MetricsCalculator(df, experiment_config=copy.deepcopy(CONFIG))
+        raw_results, grouped = calc.compute_all(), calc.compute_grouped_metrics()
+        fingerprint = cache.fingerprint(calc)
+        cache.save(fingerprint, calc, grouped, raw_results)
+        results_dir, expected_dir = tmp / "results", tmp / "expected"
+        results_dir.mkdir()
+        expected_dir.mkdir()
+        export(results_dir, raw_results, grouped)
+        RawMetricsCache.write_manifest(results_dir, fingerprint, CONFIG)
+
+        calc = MetricsCalculator(df, experiment_config=copy.deepcopy(new_config))
+        expected = export(expected_dir, calc.compute_all(), calc.compute_grouped_metrics())
+        cache.rescore_results(results_dir, new_config)
+        assert {name: (results_dir / name).read_text(encoding="utf-8") for name in expected} == expected
+
+
+def test_iv_statistics_match_resample_loop():
+    rng = np.random.default_rng(0)
+    levels = ["audio", "visual", "mixed"] * 8
+    grouped = pd.DataFrame({"session_id": [f"S{i}" for i in range(len(levels))], "independent_variable": levels,
+                            "score": rng.normal(size=len(levels)) + [0.5 * (lv == "audio") for lv in levels],
+                            "errors": rng.integers(0, 5, size=len(levels)).astype(float)})
+    grouped.loc[[3, 10], "errors"] = np.nan
+    legacy_cis, legacy_p = legacy_statistics(grouped, 800)
+    stats = MetricsCalculator.compute_variable_statistics(grouped, n_resamples=800)
+    for k, level in enumerate(sorted(set(levels))):
+        rows = stats[stats["independent_variable"] == level]
+        assert np.allclose(rows["ci_low"], legacy_cis[k][0]) and np.allclose(rows["ci_high"], legacy_cis[k][1])
+    assert np.allclose(stats.groupby("metric", sort=False)["p_value"].first(), legacy_p)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,163 @@
+"""
+Casos límite del backend de ficheros (python_analysis.file_source) y de LogParser sobre volcados.
+
+Uso:
+    python -m pruebas.test_file_source
+    python -m pytest pruebas/test_file_source.py
+"""
+import datetime
+import itertools
+import tempfile
+from pathlib import Path
+
+import bson
+import pandas as pd
+import pytest
+from bson import ObjectId, json_util
+
+from python_analysis.file_source import FileClient, FileCollection
+from python_analysis.log_parser import LogParser
+
+OIDS = [ObjectId(f"{i:024x}") for i in range(1, 8)]
+DOCS = [
+    {"_id": OIDS[0], "timestamp": "2024-01-01T10:00:00Z", "user_id": "U1", "session_id": "S1",
+     "event_type": "task", "event_name": "task_start", "event_context": {"group_id": "G"}},
+    {"_id": OIDS[1], "timestamp": "2024-01-01 10:00:01", "user_id": "U1", "session_id": "S1",
+     "event_type": "task", "event_name": "target_hit", "event_value": 1, "event_context": {}},
+    {"_id": OIDS[2], "timestamp": "01/02/2024 10:00", "user_id": "U2",
+     "event_type": "task", "event_name": "target_miss", "event_context": {"session_id": "S2"}},
+    {"_id": OIDS[3], "timestamp": "2024-01-01T10:00:03Z", "user_id": "U3", "session_id": None,
+     "event_type": "system", "event_name": "session_start", "event_context": {}},
+    {"_id": OIDS[4], "timestamp": "2024-01-01T10:00:04Z", "user_id": "U4", "session_id": 1,
+     "event_type": "task", "event_name": "target_hit", "event_context": {}},
+    {"_id": OIDS[5], "timestamp": "2024-01-01T10:00:05Z", "user_id": "U4", "session_id": "1",
+     "event_type": "task", "event_name": "target_hit", "event_context": {}},
+]
+
+
+def write_dump(directory, docs=DOCS, suffix=".jsonl", name="logs"):
+    path = Path(directory) / f"{name}{suffix}"
+    if suffix == ".bson":
+        path.write_bytes(b"".join(bson.encode(d) for d in docs))
+    else:
+        path.write_text("\n".join(json_util.dumps(d) for d in docs) + "\n\n", encoding="utf-8")
+    return path
+
+
+def collection(directory, **kwargs):
+    write_dump(directory, **kwargs)
+    return FileClient(directory)["db"]["logs"]
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".bson"])
+def test_reads_jsonl_and_bson(suffix):
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = list(collection(tmp, suffix=suffix).find())
+    assert [d["_id"] for d in docs] == OIDS[:6]
+
+
+def test_missing_and_empty_collections():
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "empty.jsonl").write_text("", encoding="utf-8")
+        (Path(tmp) / "empty_bson.bson").write_bytes(b"")
+        db = FileClient(tmp)["db"]
+        assert list(db["questionnaires"].find()) == []
+        assert list(db["empty"].find()) == []
+        assert list(db["empty_bson"].find()) == []
+        assert db["empty"].count_documents({}) == 0
+
+
+def test_find_filters_projection_sort_and_limits():
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = collection(tmp)
+        query = LogParser.session_query(["S1", "S2"])
+        assert logs.count_documents(query) == 3
+        assert logs.count_documents({"session_id": None}) == 2          # null y ausente
+        assert logs.count_documents({"session_id": {"$exists": False}}) == 1
+        assert logs.count_documents({"session_id": 1}) == 1             # 1 y "1" son distintos
+        assert logs.count_documents({"_id": {"$gt": OIDS[3]}}) == 2
+        assert logs.count_documents({"event_value": {"$gt": "a"}}) == 0  # tipos no comparables
+
+        docs = list(logs.find({}, {"user_id": 1, "event_context.group_id": 1}))
+        assert docs[0] == {"_id": OIDS[0], "user_id": "U1", "event_context": {"group_id": "G"}}
+        assert "event_context" not in docs[3]
+
+        ordered = [d["user_id"] for d in logs.find().sort("session_id", 1)]
+        assert ordered == ["U2", "U3", "U4", "U4", "U1", "U1"]           # ausente / None, 1, "1", "S1"
+        assert [d["_id"] for d in logs.find().sort("_id", -1).skip(1).limit(2)] == [OIDS[4], OIDS[3]]
+
+
+def test_aggregate_session_stats():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dump(tmp, name="tfg")
+        parser = LogParser(dump_dir=tmp, collection_name="tfg")
+        stats = parser.session_stats()
+        scoped = parser.session_stats(["S1"])
+    assert stats == {
+        "S1": {"count": 2, "max_id": OIDS[1]},
+        "S2": {"count": 1, "max_id": OIDS[2]},
+        None: {"count": 1, "max_id": OIDS[3]},
+        1: {"count": 1, "max_id": OIDS[4]},
+        "1": {"count": 1, "max_id": OIDS[5]},
+    }
+    assert scoped == {"S1": {"count": 2, "max_id": OIDS[1]}}
+
+
+def test_sort_values_that_python_cannot_compare():
+    utc = datetime.timezone.utc
+    values = [{"b": 1, "a": 2}, {"a": 1}, [2], [1, "x"], datetime.datetime(2024, 1, 1, 12),
+              datetime.datetime(2024, 1, 1, 11, tzinfo=utc), "s", 3, None, True]
+    docs = [{"_id": i, "v": v} for i, v in enumerate(values)]
+    logs = FileCollection("logs", [])
+    logs.iter_documents = lambda: iter(docs)
+    ordered = [d["v"] for d in logs.find().sort("v", 1)]
+    assert ordered == [None, 3, "s", {"a": 1}, {"b": 1, "a": 2}, [1, "x"], [2], True,
+                       datetime.datetime(2024, 1, 1, 11, tzinfo=utc), datetime.datetime(2024, 1, 1, 12)]
+
+
+def test_aggregate_streams_match_and_compares_mixed_types():
+    class EndlessCollection(FileCollection):
+        def iter_documents(self):
+            for n in itertools.count():
+                yield {"_id": n, "session_id": n % 2}
+
+    # $match no materializa el volcado: de una colección infinita se pueden leer los primeros
+    matched = EndlessCollection("logs", []).aggregate([{"$match": {"session_id": 1}}])
+    assert [d["_id"] for d in itertools.islice(matched, 3)] == [1, 3, 5]
+
+    docs = [{"_id": 1, "s": "A", "v": 5}, {"_id": 2, "s": "A", "v": "x"}, {"_id": 3, "s": "A", "v": None}]
+    logs = FileCollection("logs", [])
+    logs.iter_documents = lambda: iter(docs)
+    rows = logs.aggregate([{"$group": {"_id": "$s", "hi": {"$max": "$v"}, "lo": {"$min": "$v"}}}])
+    assert list(rows) == [{"_id": "A", "hi": "x", "lo": 5}]                # números < texto
+
+
+def test_aggregate_unsupported_operators():
+    logs = FileCollection("logs", [])
+    with pytest.raises(NotImplementedError, match=r"\$sort"):
+        logs.aggregate([{"$sort": {"_id": 1}}])
+    with pytest.raises(NotImplementedError, match=r"\$avg"):
+        logs.aggregate([{"$group": {"_id": "$session_id", "x": {"$avg": 1}}}])
+
+
+def test_parse_dump_with_mixed_timestamp_formats():
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dump(tmp, name="tfg")
+        parser = LogParser(dump_dir=tmp, collection_name="tfg")
+        df = parser.parse_logs(parser.fetch_logs(), expand_context=True)
+    assert df["timestamp"].notna().all()
+    assert df["timestamp"].iloc[2] == pd.Timestamp("2024-01-02T10:00:00Z")
+
+
+def test_invalid_timestamp_is_not_silently_dropped():
+    with pytest.raises(ValueError):
+        LogParser._to_datetime_column(["2024-01-01T10:00:00Z", "not a date"])
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if not name.startswith("test_"):
+            continue
+        for args in ([(".jsonl",), (".bson",)] if name == "test_reads_jsonl_and_bson" else [()]):
+            test(*args)
+        print(f"✅ {name}")
@@ -0,0 +1,95 @@
+"""
+Casos límite de python_analysis.iv_statistics (IC bootstrap y pruebas de permutación).
+
+Uso:
+    python -m pruebas.test_iv_statistics
+    python -m pytest pruebas/test_iv_statistics.py
+"""
+import numpy as np
+import pandas as pd
+
+from python_analysis.iv_statistics import STATISTICS_COLUMNS, variable_statistics
+
+
+def frame(levels, **metrics):
+    df = pd.DataFrame({"session_id": [f"S{i}" for i in range(len(levels))], "independent_variable": levels})
+    for name, values in metrics.items():
+        df[name] = values
+    return df
+
+
+def test_sessions_without_iv_are_not_a_level():
+    # A=[1,2] y B=[3,4]: 2 de las 6 particiones posibles son igual de extremas -> p = 1/3
+    df = frame(["A", "A", "B", "B", "N/A", "N/A", "", None, np.nan], m=[1, 2, 3, 4, 50, 60, 70, 80, 90.0])
+    stats = variable_statistics(df, n_resamples=4000)
+    assert stats["independent_variable"].tolist() == ["A", "B"]
+    assert stats["n"].tolist() == [2, 2]
+    assert stats["mean"].tolist() == [1.5, 3.5]
+    assert abs(stats["p_value"].iloc[0] - 1 / 3) < 0.03
+
+
+def test_single_level_has_ci_but_no_p_value():
+    stats = variable_statistics(frame(["A"] * 4, m=[1.0, 2.0, 3.0, 4.0]), n_resamples=500)
+    assert len(stats) == 1
+    assert 1.0 <= stats["ci_low"].iloc[0] <= stats["mean"].iloc[0] <= stats["ci_high"].iloc[0] <= 4.0
+    assert np.isnan(stats["p_value"].iloc[0])
+
+
+def test_single_session_level_has_degenerate_ci():
+    stats = variable_statistics(frame(["A", "B", "B"], m=[5.0, 1.0, 2.0]), n_resamples=500)
+    a = stats[stats["independent_variable"] == "A"].iloc[0]
+    assert (a["n"], a["mean"], a["ci_low"], a["ci_high"]) == (1, 5.0, 5.0, 5.0)
+
+
+def test_metric_without_values_in_a_level():
+    stats = variable_statistics(frame(["A", "A", "B", "B"], m=[np.nan, np.nan, 1.0, 2.0]), n_resamples=500)
+    a = stats[stats["independent_variable"] == "A"].iloc[0]
+    assert a["n"] == 0 and np.isnan(a["mean"]) and np.isnan(a["ci_low"]) and np.isnan(a["ci_high"])
+    # Con valores en un solo nivel no hay nada que permutar entre niveles: p = 1
+    assert stats["p_value"].iloc[0] == 1.0
+
+
+def test_constant_metric_has_p_value_one():
+    stats = variable_statistics(frame(["A", "A", "B", "B"], m=[3.0] * 4), n_resamples=500)
+    assert (stats["p_value"] == 1.0).all()
+    assert (stats["ci_low"] == 3.0).all() and (stats["ci_high"] == 3.0).all()
+
+
+def test_no_iv_column_or_no_metrics():
+    assert variable_statistics(pd.DataFrame({"m": [1.0, 2.0]})) is None
+    empty = variable_statistics(frame(["A", "B"]), n_resamples=100)
+    assert empty.empty and list(empty.columns) == STATISTICS_COLUMNS
+    only_missing = variable_statistics(frame(["N/A", None], m=[1.0, 2.0]), n_resamples=100)
+    assert only_missing.empty
+
+
+def test_metric_columns_selection():
+    df = frame(["A", "A", "B", "B"], m=[1.0, 2.0, 3.0, 4.0])
+    df["user_id"] = [1, 2, 3, 4]                                          # clave de sesión
+    df["flag"] = [True, False, True, False]                               # bool
+    df["label"] = ["x", "y", "z", "w"]                                    # texto
+    df["sus_score"] = pd.Series([50, pd.NA, 70, 80], dtype=object)        # cuestionario cruzado
+    stats = variable_statistics(df, n_resamples=200)
+    assert list(dict.fromkeys(stats["metric"])) == ["m", "sus_score"]
+    assert stats.loc[stats["metric"] == "sus_score", "n"].tolist() == [1, 2]
+
+
+def test_mixed_type_levels():
+    stats = variable_statistics(frame([1, "1", 1, "1"], m=[1.0, 5.0, 2.0, 6.0]), n_resamples=200)
+    assert len(stats) == 2
+    assert sorted(stats["mean"].tolist()) == [1.5, 5.5]
+
+
+def test_seed_and_workers():
+    rng = np.random.default_rng(3)
+    df = frame(list("ABC") * 20, **{f"m{i}": rng.normal(size=60) for i in range(5)})
+    base = variable_statistics(df, n_resamples=2500, seed=7)
+    assert base.equals(variable_statistics(df, n_resamples=2500, seed=7, workers=3))
+    assert not base.equals(variable_statistics(df, n_resamples=2500, seed=8))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
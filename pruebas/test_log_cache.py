@@ -0,0 +1,134 @@
+"""
+Casos límite de python_analysis.log_cache (caché Parquet por session_id) sobre un volcado .jsonl.
+
+Uso:
+    python -m pruebas.test_log_cache
+    python -m pytest pruebas/test_log_cache.py
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from bson import ObjectId, json_util
+
+from python_analysis.log_cache import LogCache
+from python_analysis.log_parser import EVENTS_TABLE, LogParser
+
+# session_id mezclando tipos: 1 y "1", None y "" son sesiones distintas en Mongo
+SESSION_IDS = ["S1", 1, "1", None, ""]
+
+
+def make_docs(start, per_session=3, session_ids=SESSION_IDS):
+    docs, n = [], start
+    for sid in session_ids:
+        for _ in range(per_session):
+            n += 1
+            docs.append({"_id": ObjectId(f"{n:024x}"), "timestamp": f"2024-01-01T10:00:{n % 60:02d}Z",
+                         "user_id": "U1", "session_id": sid, "event_type": "task",
+                         "event_name": "target_hit", "event_value": n, "event_context": {"group_id": "G"}})
+    return docs
+
+
+def write_dump(path, docs):
+    path.write_text("\n".join(json_util.dumps(d) for d in docs) + "\n", encoding="utf-8")
+
+
+def open_cache(tmp, docs):
+    tmp = Path(tmp)
+    write_dump(tmp / "tfg.jsonl", docs)
+    parser = LogParser(dump_dir=tmp, collection_name="tfg")
+    return LogCache(parser, cache_dir=tmp / "cache")
+
+
+def cached_values(cache, session_ids=None):
+    # event_value numera los documentos: identifica qué hay en la caché
+    events = cache.load(session_ids)[EVENTS_TABLE]
+    return sorted(int(v) for v in events["event_value"])
+
+
+def values(docs):
+    return sorted(d["event_value"] for d in docs)
+
+
+def test_mixed_type_session_ids_have_own_partitions():
+    docs = make_docs(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = open_cache(tmp, docs)
+        summary = cache.sync()
+        assert summary["new_docs"] == len(docs) and summary["refetched"] == []
+        assert set(cache.manifest["sessions"]) == {"str:S1", "int:1", "str:1", "null", "str:"}
+        assert all(entry["count"] == 3 for entry in cache.manifest["sessions"].values())
+        assert cached_values(cache) == values(docs)
+        assert cached_values(cache, [1]) == values(d for d in docs if d["session_id"] == 1)
+
+
+def test_resync_is_idempotent_and_reads_only_new_documents():
+    docs = make_docs(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = open_cache(tmp, docs)
+        cache.sync()
+        assert cache.sync() == {"new_docs": 0, "deleted": [], "refetched": []}
+
+        more = make_docs(100, per_session=1, session_ids=["1", "S2"])
+        write_dump(Path(tmp) / "tfg.jsonl", docs + more)
+        assert cache.sync() == {"new_docs": 2, "deleted": [], "refetched": []}
+        assert cache.manifest["sessions"]["str:1"]["count"] == 4
+        assert cache.manifest["sessions"]["int:1"]["count"] == 3
+        assert cache.manifest["watermark"] == more[-1]["_id"]
+
+        # Una caché nueva sobre el mismo directorio parte del manifest guardado
+        reopened = LogCache(cache.parser, cache_dir=Path(tmp) / "cache")
+        assert reopened.sync()["new_docs"] == 0
+        assert cached_values(reopened) == values(docs + more)
+
+
+def test_deleted_and_rewritten_sessions():
+    docs = make_docs(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = open_cache(tmp, docs)
+        cache.sync()
+        # Se borra la sesión "" y se reescribe S1 (un documento menos, _id anteriores a la watermark)
+        kept = [d for d in docs if d["session_id"] != ""]
+        kept = [d for d in kept if d["_id"] != docs[0]["_id"]]
+        write_dump(Path(tmp) / "tfg.jsonl", kept)
+        summary = cache.sync()
+        assert summary["deleted"] == ["str:"] and summary["refetched"] == ["str:S1"]
+        assert cache.manifest["sessions"]["str:S1"]["count"] == 2
+        assert cached_values(cache) == values(kept)
+
+
+def test_invalidate_one_session_refetches_only_that_one():
+    docs = make_docs(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = open_cache(tmp, docs)
+        cache.sync()
+        cache.invalidate([1])
+        assert "int:1" not in cache.manifest["sessions"] and "str:1" in cache.manifest["sessions"]
+        assert cache.sync()["refetched"] == ["int:1"]
+        assert cached_values(cache) == values(docs)
+
+        cache.invalidate()
+        assert not cache.dir.exists()
+        assert cache.sync()["new_docs"] == len(docs)
+
+
+def test_manifest_with_old_key_format_is_discarded():
+    docs = make_docs(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = open_cache(tmp, docs)
+        cache.sync()
+        manifest_path = cache.dir / LogCache.MANIFEST
+        old = json.loads(manifest_path.read_text(encoding="utf-8"))
+        old.pop("key_version")
+        manifest_path.write_text(json.dumps(old), encoding="utf-8")
+
+        reopened = LogCache(cache.parser, cache_dir=Path(tmp) / "cache")
+        assert reopened.manifest["sessions"] == {} and reopened.manifest["watermark"] is None
+        assert reopened.sync()["new_docs"] == len(docs)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
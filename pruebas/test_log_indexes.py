@@ -0,0 +1,114 @@
+"""
+Comprobación sin MongoDB de los índices: cada consulta de LogParser.pipeline_queries (cada rama
+de su $or) debe empezar por la clave inicial de algún índice de LOG_INDEXES / AUX_INDEXES, o,
+sin filtro, ordenar por ella. Es la versión offline de `python -m python_analysis.log_parser --explain`.
+
+Uso:
+    python -m pruebas.test_log_indexes
+    python -m pytest pruebas/test_log_indexes.py
+"""
+import tempfile
+
+from python_analysis.log_parser import AUX_INDEXES, LOG_INDEXES, LogParser
+
+
+def branches(query):
+    """
+    Ramas que el planificador de Mongo resuelve por separado: las de un $or en la raíz. Un $and
+    de $or no se reparte, así que sus campos no cuentan para elegir índice.
+    """
+    if set(query) == {"$or"}:
+        return [b for q in query["$or"] for b in branches(q)]
+    return [query]
+
+
+def is_equality(cond):
+    return not isinstance(cond, dict) or set(cond) <= {"$eq", "$in"}
+
+
+def index_prefix(branch, sort, keys):
+    """Nº de claves iniciales del índice que fija la rama (igualdad / $in) más la del orden."""
+    n = 0
+    for field, _ in keys:
+        if field in branch and is_equality(branch[field]):
+            n += 1
+        else:
+            break
+    if sort and n < len(keys) and keys[n][0] == sort[0][0]:
+        n += 1
+    return n
+
+
+def pipeline_cursors():
+    with tempfile.TemporaryDirectory() as tmp:
+        parser = LogParser(dump_dir=tmp)
+        return [(description, cursor) for description, cursor in parser.pipeline_queries(session_name="demo")]
+
+
+def indexes_for(cursor):
+    name = cursor._collection.name
+    return AUX_INDEXES.get(name, LOG_INDEXES)
+
+
+def test_every_pipeline_query_branch_has_an_index():
+    for description, cursor in pipeline_cursors():
+        indexes = indexes_for(cursor)
+        for branch in branches(cursor._query):
+            best = max(index_prefix(branch, cursor._sort, keys) for keys in indexes)
+            assert best >= 1, (description, branch)
+
+
+def test_session_name_query_uses_the_full_compound_indexes():
+    # Los eventos reales: config con session.session_name y session_start con session_name
+    query = LogParser.session_name_query("demo")
+    for leading, name_field in (("event_type", "event_context.session.session_name"),
+                                ("event_name", "event_context.session_name")):
+        branch = next(b for b in branches(query) if leading in b and name_field in b)
+        assert [(leading, 1), (name_field, 1)] in LOG_INDEXES
+        assert index_prefix(branch, None, [(leading, 1), (name_field, 1)]) == 2
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+def test_index_report_only_counts_index_plans_as_covered():
+    plans = {
+        "eof": {"stage": "EOF"},
+        "idhack": {"stage": "IDHACK"},
+        "collscan": {"stage": "COLLSCAN"},
+        "fetch": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        "covered": {"stage": "PROJECTION_COVERED", "inputStage": {"stage": "IXSCAN"}},
+    }
+    parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+    parser.pipeline_queries = lambda **kwargs: [(name, FakeCursor(plan)) for name, plan in plans.items()]
+    report = {row["query"]: (row["indexed"], row["covered"]) for row in parser.index_report()}
+    assert report == {"eof": (False, False), "idhack": (False, False), "collscan": (False, False),
+                      "fetch": (True, False), "covered": (True, True)}
+
+
+def test_session_name_query_matches_the_same_events():
+    from python_analysis.file_source import matches
+
+    base = {"event_type": "task", "event_name": "x", "event_context": {}}
+    cases = [
+        (dict(base, event_type="config", event_context={"session": {"session_name": "demo"}}), True),
+        (dict(base, event_type="config", event_context={"session_name": "demo"}), True),
+        (dict(base, event_name="session_start", event_context={"session_name": "demo"}), True),
+        (dict(base, event_name="session_start", event_context={"session": {"session_name": "demo"}}), True),
+        (dict(base, event_type="config", event_context={"session_name": "otra"}), False),
+        (dict(base, event_context={"session_name": "demo"}), False),
+    ]
+    query = LogParser.session_name_query("demo")
+    assert [matches(doc, query) for doc, _ in cases] == [expected for _, expected in cases]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
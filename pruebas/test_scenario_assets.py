@@ -0,0 +1,96 @@
+"""
+Cada sesión usa el camino ideal de su mapa (map_name del experiment_config), no el genérico.
+Dos sesiones con el mismo recorrido en Maze1 y Maze2 (ficheros del paquete) deben dar
+path_efficiency y gaze_on_path_ratio distintos, calculados con su propio ideal_path_<mapa>.json.
+
+Uso:
+    python -m pruebas.test_scenario_assets
+    python -m pytest pruebas/test_scenario_assets.py
+"""
+import numpy as np
+import pandas as pd
+
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.scenario_assets import SCENARIO_ASSETS
+from python_analysis.session_index import SessionIndex
+
+PARSER = LogParser.__new__(LogParser)  # sin conexión a Mongo
+T0 = pd.Timestamp("2025-01-01T10:00:00Z")
+MAPS = {"S1": "Maze1", "S2": "Maze2"}
+# Recorrido recto de 100 m y mirada sobre los vértices de Maze1
+WALK = [(float(x), 5.0) for x in range(0, 101, 10)]
+GAZE = [tuple(pt) for pt in SCENARIO_ASSETS.ideal_path("Maze1").points]
+CONFIG = {"metrics": {
+    "eficiencia": {"path_efficiency": {"weight": 1.0, "min": 0, "max": 1}},
+    "presencia": {"gaze_on_path_ratio": {"weight": 1.0, "min": 0, "max": 1}},
+}}
+
+
+def make_logs():
+    logs = []
+
+    def log(second, session, event_type, event_name, context):
+        logs.append({"timestamp": (T0 + pd.Timedelta(seconds=second)).isoformat(), "user_id": f"U_{session}",
+                     "group_id": "G", "session_id": session, "event_type": event_type,
+                     "event_name": event_name, "event_value": None, "event_context": context})
+
+    for session, map_name in MAPS.items():
+        log(0, session, "config", "experiment_config", {"session": {"map_name": map_name}})
+        for i, (x, z) in enumerate(WALK):
+            log(1 + i, session, "telemetry", "movement_frame", {"position": {"x": x, "y": 0.0, "z": z}})
+        for i, (x, z) in enumerate(GAZE):
+            log(1 + i, session, "telemetry", "gaze_frame", {"hit_position": {"x": x, "y": 0.0, "z": z}})
+    return logs
+
+
+def expected(map_name):
+    ideal = SCENARIO_ASSETS.ideal_path(map_name)
+    gx, gz = np.array(GAZE).T
+    return min(1.0, float(ideal.length) / 100.0), ideal.index.count_within(gx, gz, 0.3) / len(GAZE)
+
+
+def check(grouped):
+    grouped = grouped.set_index("session_id")
+    for session, map_name in MAPS.items():
+        efficiency, gaze_ratio = expected(map_name)
+        assert np.isclose(grouped.loc[session, "path_efficiency"], efficiency), session
+        assert np.isclose(grouped.loc[session, "gaze_on_path_ratio"], gaze_ratio), session
+    assert grouped.loc["S1", "path_efficiency"] != grouped.loc["S2", "path_efficiency"]
+    assert grouped.loc["S1", "gaze_on_path_ratio"] != grouped.loc["S2", "gaze_on_path_ratio"]
+
+
+def test_maps_resolve_to_their_own_assets():
+    maze1, maze2 = SCENARIO_ASSETS.ideal_path("Maze1"), SCENARIO_ASSETS.ideal_path("Maze2")
+    assert maze1.path.name == "ideal_path_Maze1.json" and maze2.path.name == "ideal_path_Maze2.json"
+    assert maze1.length != maze2.length
+
+
+def test_scenario_id_from_parsed_context():
+    logs = make_logs()
+    for expand_context in (True, False):
+        df = PARSER.parse_logs(logs, expand_context=expand_context)
+        calc = MetricsCalculator(df)
+        for session, map_name in MAPS.items():
+            assert calc._scenario_id(df[df["session_id"] == session]) == map_name
+    assert calc._scenario_id(df[df["event_name"] != "experiment_config"]) == ""
+
+
+def test_grouped_metrics_use_each_session_map():
+    df = PARSER.parse_logs(make_logs(), expand_context=True)
+    check(MetricsCalculator(df, experiment_config=CONFIG).compute_grouped_metrics())
+
+
+def test_grouped_metrics_with_session_index_and_frame_tables():
+    index = SessionIndex()
+    tables = PARSER.parse_log_tables(make_logs(), session_index=index)
+    events = tables.pop("events")
+    calc = MetricsCalculator(events, experiment_config=CONFIG, frame_tables=tables, session_index=index)
+    check(calc.compute_grouped_metrics())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,105 @@
+"""
+Casos límite de python_analysis.streaming_metrics (métricas en vivo por lotes).
+
+Uso:
+    python -m pruebas.test_streaming_metrics
+    python -m pytest pruebas/test_streaming_metrics.py
+"""
+import pandas as pd
+
+from pruebas import test_scenario_assets as scenarios
+from pruebas.test_task_intervals import CONFIG, EVENTS, T0
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.streaming_metrics import StreamingMetricsCalculator
+
+KEYS = ["user_id", "group_id", "session_id"]
+
+
+def as_docs(events):
+    # Documentos como los de Mongo: timestamp en texto y contexto anidado
+    return [dict(e, timestamp=e["timestamp"].isoformat(), event_context={}) for e in events]
+
+
+def stream(batches, config=CONFIG):
+    calc = StreamingMetricsCalculator(config)
+    for batch in batches:
+        calc.update(batch)
+    return calc.snapshot().set_index(KEYS).sort_index()
+
+
+def test_empty_batches():
+    calc = StreamingMetricsCalculator(CONFIG)
+    for batch in ([], {}, pd.DataFrame(columns=["timestamp", "user_id", "session_id", "event_name"])):
+        assert calc.update(batch).empty
+    assert calc.snapshot().empty
+    # Un lote vacío entre dos no cambia nada
+    calc.update(pd.DataFrame(EVENTS[:4]))
+    calc.update([])
+    calc.update(pd.DataFrame(EVENTS[4:]))
+    assert calc.snapshot().set_index(KEYS).sort_index().equals(stream([pd.DataFrame(EVENTS)]))
+
+
+def test_batches_split_mid_task_match_full_recompute():
+    # El corte cae entre la acción (4 s) y el task_end (5 s) de la primera tarea de S1
+    df = pd.DataFrame(EVENTS)
+    live = stream([df.iloc[:4], df.iloc[4:]])
+    assert live.loc[("U_S1", "G", "S1"), "avg_task_duration_ms"] == 3500.0
+    assert live.loc[("U_S1", "G", "S1"), "avg_reaction_time_ms"] == 2500.0
+    reference = MetricsCalculator(df, experiment_config=CONFIG).compute_grouped_metrics().set_index(KEYS).sort_index()
+    pd.testing.assert_frame_equal(live[reference.columns], reference, check_dtype=False)
+
+
+def test_documents_and_dataframe_input_agree():
+    docs = as_docs(EVENTS)
+    from_docs = stream([docs[:3], docs[3:6], docs[6:]])
+    from_frame = stream([pd.DataFrame(EVENTS)])
+    pd.testing.assert_frame_equal(from_docs, from_frame, check_dtype=False)
+
+
+def test_one_event_per_batch():
+    single = stream([[doc] for doc in as_docs(EVENTS)])
+    pd.testing.assert_frame_equal(single, stream([as_docs(EVENTS)]), check_dtype=False)
+
+
+def test_session_without_actions():
+    events = [
+        {"timestamp": T0, "user_id": "U", "group_id": "G", "session_id": "S", "event_type": "system",
+         "event_name": "session_start", "event_value": None},
+        {"timestamp": T0 + pd.Timedelta(seconds=10), "user_id": "U", "group_id": "G", "session_id": "S",
+         "event_type": "task", "event_name": "task_start", "event_value": None},
+    ]
+    live = stream([pd.DataFrame(events)])
+    reference = MetricsCalculator(pd.DataFrame(events), experiment_config=CONFIG) \
+        .compute_grouped_metrics().set_index(KEYS)
+    pd.testing.assert_frame_equal(live[reference.columns], reference, check_dtype=False)
+    assert live["avg_task_duration_ms"].iloc[0] == 0.0
+
+
+def test_independent_variable():
+    docs = as_docs(EVENTS)
+    assert (stream([docs], config=None)["independent_variable"] == "N/A").all()
+    session_start = dict(docs[0], event_type="system", event_name="session_start",
+                         event_context={"independent_variable": "audio"})
+    live = stream([[session_start], docs])
+    assert live.loc[("U_S1", "G", "S1"), "independent_variable"] == "audio"
+    assert live.loc[("U_S2", "G", "S2"), "independent_variable"] == "N/A"
+
+
+def test_each_session_uses_its_map():
+    # map_name del experiment_config de cada sesión (Maze1 / Maze2), como en compute_grouped_metrics
+    logs = scenarios.make_logs()
+    df = scenarios.PARSER.parse_logs(logs, expand_context=True)
+    reference = MetricsCalculator(df, experiment_config=scenarios.CONFIG).compute_grouped_metrics()
+    scenarios.check(reference)
+    reference = reference.set_index(KEYS).sort_index()
+    for batches in ([logs[i:i + 5] for i in range(0, len(logs), 5)], [df]):
+        live = stream(batches, config=scenarios.CONFIG)
+        scenarios.check(live.reset_index())
+        pd.testing.assert_frame_equal(live[reference.columns], reference, check_dtype=False)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,74 @@
+"""
+Comprobación de comportamiento de MetricsCalculator._task_intervals: los task_start / task_end
+se emparejan dentro de cada sesión (user_id, group_id, session_id), no en el orden temporal de
+toda la tabla. Valores calculados a mano con dos sesiones intercaladas.
+
+Uso:
+    python -m pruebas.test_task_intervals
+    python -m pytest pruebas/test_task_intervals.py
+"""
+import pandas as pd
+
+from python_analysis.metrics import MetricsCalculator
+
+T0 = pd.Timestamp("2025-01-01T10:00:00Z")
+
+
+def event(second, session, name):
+    return {"timestamp": T0 + pd.Timedelta(seconds=second), "user_id": f"U_{session}", "group_id": "G",
+            "session_id": session, "event_type": "task", "event_name": name, "event_value": None}
+
+
+# S1: tarea 0 s -> 5 s (acción a los 4 s) y tarea 60 s -> 62 s (acción a los 61 s)
+# S2: empieza a los 1 s, acción a los 3 s y no termina nunca
+EVENTS = [
+    event(0, "S1", "task_start"),
+    event(1, "S2", "task_start"),
+    event(3, "S2", "action_success"),
+    event(4, "S1", "action_fail"),
+    event(5, "S1", "task_end"),
+    event(60, "S1", "task_start"),
+    event(61, "S1", "action_success"),
+    event(62, "S1", "task_end"),
+]
+
+
+CONFIG = {"metrics": {"eficiencia": {
+    "avg_task_duration_ms": {"weight": 1.0, "min": 0, "max": 10000},
+    "avg_reaction_time_ms": {"weight": 1.0, "min": 0, "max": 10000},
+}}}
+
+
+def make_calculator():
+    return MetricsCalculator(pd.DataFrame(EVENTS), experiment_config=CONFIG)
+
+
+def test_pairs_within_each_session():
+    calc = make_calculator()
+    intervals = calc._task_intervals(calc.df)
+    # Con el emparejamiento global, el inicio de S2 (1 s) se emparejaría con el fin de la segunda
+    # tarea de S1 (62 s): 61000 ms. Por sesión, S2 no tiene ningún par completo.
+    assert list(intervals["session_id"].astype(str)) == ["S1", "S1"]
+    assert intervals["task_duration_ms"].tolist() == [5000.0, 2000.0]
+    # La acción de S2 a los 3 s no es el tiempo de reacción de la primera tarea de S1
+    assert intervals["reaction_time_ms"].tolist() == [4000.0, 1000.0]
+
+
+def test_published_averages():
+    calc = make_calculator()
+    assert calc.avg_task_duration() == 3500.0
+    assert calc.avg_reaction_time() == 2500.0
+
+
+def test_grouped_metrics_per_session():
+    grouped = make_calculator().compute_grouped_metrics().set_index("session_id")
+    assert grouped.loc["S1", "avg_task_duration_ms"] == 3500.0
+    assert grouped.loc["S1", "avg_reaction_time_ms"] == 2500.0
+    # S2 sin pares completos: compute_grouped_metrics escribe 0 para las métricas sin valor
+    assert grouped.loc["S2", "avg_task_duration_ms"] == 0.0
+
+
+if __name__ == "__main__":
+    for test in (test_pairs_within_each_session, test_published_averages, test_grouped_metrics_per_session):
+        test()
+        print(f"✅ {test.__name__}")
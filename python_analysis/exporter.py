@@ -7,6 +7,24 @@ class MetricsExporter:
         self.metrics = metrics
         self.output_dir = Path(output_dir)
 
+    # -------------------------------------------------------------
+    # Formato de resultados para el PDF y el exporter
+    # -------------------------------------------------------------
+    @staticmethod
+    def summarize(raw_results):
+        """Resultado de MetricsCalculator.compute_all -> {categoria: {score, metrica: raw}, global_score}."""
+        summary = {}
+        for categoria, contenido in raw_results["categorias"].items():
+            # Subestructura compatible con PDFReporter
+            summary[categoria] = {"score": contenido["score"]}
+            for metric_name, metric_data in contenido.items():
+                if isinstance(metric_data, dict):
+                    summary[categoria][metric_name] = metric_data["raw"]
+
+        # añadir puntuación global
+        summary["global_score"] = raw_results["global_score"]
+        return summary
+
     # -------------------------------------------------------------
     # JSON Export
     # -------------------------------------------------------------
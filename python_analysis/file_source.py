@@ -0,0 +1,312 @@
+"""
+Backend de ficheros para LogParser: lee volcados de `mongodump` (.bson) y exportaciones
+`mongoexport` (.jsonl, JSON extendido) sin necesidad de un MongoDB en marcha.
+
+Imita la parte de la API de pymongo que usa el análisis (client[db][colección].find con
+filtro, proyección, sort, skip, limit y batch_size, y aggregate con $match / $group) para
+que fetch_logs / iter_logs / parse_logs / session_stats (LogCache) funcionen igual. Los
+ficheros se recorren con mmap y se decodifican documento a documento, así que la memoria
+no depende del tamaño del volcado (solo $group y sort guardan su resultado).
+
+Estructuras admitidas (LOG_DUMP_DIR):
+    dump/<db>/<colección>.bson     # salida de mongodump
+    carpeta/<colección>.jsonl      # ficheros sueltos
+"""
+import datetime
+import mmap
+import struct
+from pathlib import Path
+
+import bson
+from bson import json_util
+
+# mongoexport escribe las fechas en UTC; pymongo las devuelve naive (tz_aware=False)
+JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+FILE_SUFFIXES = (".bson", ".jsonl", ".json")
+
+_MISSING = object()
+# Orden entre tipos de BSON (como en Mongo): tras ausentes / None, números, texto, ... fechas
+_SORT_TYPES = ((int, float), str, dict, list, bytes, bson.ObjectId, bool, datetime.datetime)
+
+
+# ------------------------------------------------------------
+# Lectura incremental de ficheros
+# ------------------------------------------------------------
+def iter_bson_file(path):
+    """Recorre un .bson de mongodump (documentos concatenados) sobre un mmap."""
+    with open(path, "rb") as f:
+        if Path(path).stat().st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            pos, end = 0, len(mm)
+            try:
+                while pos + 4 <= end:
+                    (size,) = struct.unpack_from("<i", mm, pos)
+                    yield bson.decode(view[pos:pos + size])
+                    pos += size
+            finally:
+                view.release()
+
+
+def iter_jsonl_file(path):
+    """Recorre un .jsonl (un documento JSON extendido por línea) sobre un mmap."""
+    with open(path, "rb") as f:
+        if Path(path).stat().st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                line = line.strip()
+                if line:
+                    yield json_util.loads(line, json_options=JSON_OPTIONS)
+
+
+def iter_file(path):
+    return iter_bson_file(path) if Path(path).suffix == ".bson" else iter_jsonl_file(path)
+
+
+# ------------------------------------------------------------
+# Evaluación de filtros y proyecciones (subconjunto de la sintaxis de Mongo)
+# ------------------------------------------------------------
+def _get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op, arg):
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op in ("$eq", "$ne"):
+        equal = (value is _MISSING and arg is None) or value == arg
+        return equal if op == "$eq" else not equal
+    if op in ("$in", "$nin"):
+        found = (value is _MISSING and None in arg) or (value is not _MISSING and value in arg)
+        return found if op == "$in" else not found
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Operador no soportado en el backend de ficheros: {op}")
+
+
+def matches(doc, query):
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        else:
+            value = _get_path(doc, key)
+            if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+                if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                    return False
+            elif not _compare(value, "$eq", cond):
+                return False
+    return True
+
+
+def sort_key(value):
+    """
+    Clave de orden BSON (rango del tipo, forma comparable) para sort y $min / $max: un campo
+    con 1 y "1", con documentos anidados o listas, o con fechas naive y con zona se ordena en
+    vez de lanzar TypeError.
+    """
+    if value is _MISSING or value is None:
+        return (0, 0)
+    for rank, types in enumerate(_SORT_TYPES, start=1):
+        # isinstance(True, int) es cierto, pero en BSON bool es un tipo aparte
+        if isinstance(value, types) and (types is bool or not isinstance(value, bool)):
+            break
+    else:
+        return (len(_SORT_TYPES) + 1, str(value))
+
+    if isinstance(value, (dict, list)):
+        value = json_util.dumps(value, sort_keys=True)
+    elif isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        # Como pymongo con tz_aware=False: UTC naive
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (rank, value)
+
+
+def match(docs, query):
+    """Etapa $match como generador: el volcado se filtra documento a documento, sin guardarlo."""
+    return (doc for doc in docs if matches(doc, query))
+
+
+def project(doc, projection):
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = [k for k, v in projection.items() if v and k != "_id"]
+    if not fields:
+        # Proyección solo de exclusión
+        excluded = {k for k, v in projection.items() if not v}
+        return {k: v for k, v in doc.items() if k not in excluded}
+
+    out = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+    for field in fields:
+        value = _get_path(doc, field)
+        if value is _MISSING:
+            continue
+        parts = field.split(".")
+        target = out
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return out
+
+
+def _evaluate(doc, expr):
+    """Expresión de agregación: "$campo", {"$ifNull": [...]} o una constante."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict) and len(expr) == 1 and "$ifNull" in expr:
+        for option in expr["$ifNull"]:
+            value = _evaluate(doc, option)
+            if value is not None:
+                return value
+        return None
+    if isinstance(expr, dict) and any(k.startswith("$") for k in expr):
+        raise NotImplementedError(f"Expresión no soportada en el backend de ficheros: {expr}")
+    return expr
+
+
+def group(docs, spec):
+    """Etapa $group con los acumuladores $sum, $min y $max (None / ausentes se ignoran como en Mongo)."""
+    accumulators = {field: next(iter(acc.items())) for field, acc in spec.items() if field != "_id"}
+    for op, _ in accumulators.values():
+        if op not in ("$sum", "$min", "$max"):
+            raise NotImplementedError(f"Acumulador no soportado en el backend de ficheros: {op}")
+
+    groups = {}
+    for doc in docs:
+        key = _evaluate(doc, spec["_id"])
+        # dicts (claves compuestas) no son hashables: clave por su representación
+        row = groups.setdefault(repr(key), {"_id": key, **{
+            field: 0 if op == "$sum" else None for field, (op, _) in accumulators.items()}})
+        for field, (op, expr) in accumulators.items():
+            value = _evaluate(doc, expr)
+            if op == "$sum":
+                row[field] += value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+            elif value is not None:
+                current = row[field]
+                if current is None or (sort_key(value) > sort_key(current) if op == "$max"
+                                       else sort_key(value) < sort_key(current)):
+                    row[field] = value
+    return list(groups.values())
+
+
+# ------------------------------------------------------------
+# Equivalentes de cliente / base de datos / colección / cursor
+# ------------------------------------------------------------
+class FileCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        self._sort = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        # El fichero se lee documento a documento: no hay lotes de red que ajustar
+        return self
+
+    def __iter__(self):
+        docs = (doc for doc in self._collection.iter_documents() if matches(doc, self._query))
+        if self._sort:
+            # Ordenar obliga a materializar los documentos filtrados (solo lo piden consultas pequeñas
+            # o la lectura particionada por _id)
+            docs = list(docs)
+            for field, direction in reversed(self._sort):
+                docs.sort(key=lambda d: sort_key(_get_path(d, field)), reverse=direction < 0)
+        count = 0
+        for i, doc in enumerate(docs):
+            if i < self._skip:
+                continue
+            if self._limit and count >= self._limit:
+                break
+            count += 1
+            yield project(doc, self._projection)
+
+class FileCollection:
+    def __init__(self, name, paths):
+        self.name = name
+        self.paths = list(paths)
+
+    def iter_documents(self):
+        for path in self.paths:
+            yield from iter_file(path)
+
+    def find(self, query=None, projection=None):
+        return FileCursor(self, query, projection)
+
+    def count_documents(self, query):
+        return sum(1 for doc in self.iter_documents() if matches(doc, query))
+
+    def aggregate(self, pipeline):
+        """
+        Subconjunto de aggregate: etapas $match y $group (el resumen por sesión de session_stats).
+        $match se evalúa en streaming; solo el resultado de $group (una fila por grupo) se guarda.
+        """
+        docs = self.iter_documents()
+        for stage in pipeline:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = match(docs, arg)
+            elif op == "$group":
+                docs = group(docs, arg)
+            else:
+                raise NotImplementedError(f"Etapa de aggregate no soportada en el backend de ficheros: {op}")
+        return iter(docs)
+
+
+class FileDatabase:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def __getitem__(self, collection_name):
+        # Colección ausente → colección vacía (p.ej. un volcado sin cuestionarios)
+        paths = [self.directory / f"{collection_name}{suffix}" for suffix in FILE_SUFFIXES]
+        return FileCollection(collection_name, [p for p in paths if p.exists()])
+
+
+class FileClient:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def __getitem__(self, db_name):
+        # mongodump crea dump/<db>/...; si no existe esa subcarpeta se usa la raíz directamente
+        db_dir = self.root / db_name
+        return FileDatabase(db_dir if db_dir.is_dir() else self.root)
+
+    def close(self):
+        pass
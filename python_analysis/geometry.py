@@ -0,0 +1,116 @@
+"""
+Geometría del camino ideal (ideal_path_*.json) compartida por las métricas y los gráficos.
+
+SegmentIndex reparte los segmentos del camino en una rejilla uniforme (plano XZ) cuyo
+lado es el umbral de distancia: cada punto de mirada solo se compara con los segmentos
+de su celda, y los puntos se procesan en bloques vectorizados en lugar de uno a uno.
+La distancia punto-segmento es la misma que usaban gaze_on_path_ratio y
+_calculate_gaze_on_path_time, así que el resultado no cambia.
+"""
+import numpy as np
+
+CHUNK_SIZE = 65536
+MAX_CELLS_PER_AXIS = 256
+
+
+class SegmentIndex:
+    def __init__(self, points):
+        """
+        :param points: array (n, 2) con los vértices (x, z) del camino, en orden
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.p1 = self.points[:-1]
+        self.ab = self.points[1:] - self.p1
+        self.ab_sq = self.ab[:, 0] ** 2 + self.ab[:, 1] ** 2
+        self._grids = {}
+
+    @property
+    def n_segments(self):
+        return len(self.p1)
+
+    # ------------------------------------------------------------------
+    # Rejilla uniforme (una por umbral)
+    # ------------------------------------------------------------------
+    def _grid(self, threshold):
+        """
+        Rejilla de lado = umbral (como mínimo 1/MAX_CELLS_PER_AXIS de la extensión del camino).
+        Cada segmento se apunta en todas las celdas de su caja envolvente ampliada con el umbral
+        (más una celda de margen por redondeo), de modo que un punto a distancia <= umbral de un
+        segmento siempre cae en una de ellas.
+        Devuelve el origen, el lado, las dimensiones y la tabla celda -> segmentos (CSR).
+        """
+        if threshold not in self._grids:
+            lo = np.minimum(self.p1, self.p1 + self.ab) - threshold
+            hi = np.maximum(self.p1, self.p1 + self.ab) + threshold
+            # Con umbrales muy pequeños se limita la rejilla a ~MAX_CELLS_PER_AXIS celdas por eje
+            extent = float((hi.max(axis=0) - lo.min(axis=0)).max())
+            cell = max(float(threshold), extent / MAX_CELLS_PER_AXIS, 1e-9)
+            origin = lo.min(axis=0) - 2 * cell
+            first = np.floor((lo - origin) / cell).astype(np.int64) - 1
+            last = np.floor((hi - origin) / cell).astype(np.int64) + 1
+            shape = last.max(axis=0) + 1
+
+            cells, segs = [], []
+            for seg in range(self.n_segments):
+                xs = np.arange(first[seg, 0], last[seg, 0] + 1)
+                zs = np.arange(first[seg, 1], last[seg, 1] + 1)
+                cells.append((xs[:, None] * shape[1] + zs[None, :]).ravel())
+                segs.append(np.full(len(xs) * len(zs), seg))
+            cells, segs = np.concatenate(cells), np.concatenate(segs)
+
+            order = np.argsort(cells, kind="stable")
+            cells, segs = cells[order], segs[order]
+            offsets = np.searchsorted(cells, np.arange(shape[0] * shape[1] + 1))
+            self._grids[threshold] = (origin, cell, shape, offsets, segs)
+        return self._grids[threshold]
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def within(self, x, z, threshold, chunk_size=CHUNK_SIZE):
+        """
+        Máscara booleana: qué puntos (x[i], z[i]) están a distancia <= threshold de algún segmento.
+        :param x, z: arrays de coordenadas sin NaN
+        """
+        x = np.asarray(x, dtype=float)
+        z = np.asarray(z, dtype=float)
+        out = np.zeros(len(x), dtype=bool)
+        if self.n_segments == 0 or len(x) == 0:
+            return out
+        for start in range(0, len(x), chunk_size):
+            stop = start + chunk_size
+            out[start:stop] = self._within_chunk(x[start:stop], z[start:stop], threshold)
+        return out
+
+    def count_within(self, x, z, threshold, chunk_size=CHUNK_SIZE):
+        return int(self.within(x, z, threshold, chunk_size).sum())
+
+    def _within_chunk(self, px, pz, threshold):
+        origin, cell, shape, offsets, cell_segs = self._grid(threshold)
+
+        # Celda de cada punto; fuera de la rejilla no hay ningún segmento a menos del umbral
+        ix = np.floor((px - origin[0]) / cell)
+        iz = np.floor((pz - origin[1]) / cell)
+        inside = (ix >= 0) & (ix < shape[0]) & (iz >= 0) & (iz < shape[1])
+        points = np.flatnonzero(inside)
+        keys = ix[inside].astype(np.int64) * shape[1] + iz[inside].astype(np.int64)
+
+        # Pares (punto, segmento candidato) expandiendo los rangos CSR sin bucles
+        starts, counts = offsets[keys], offsets[keys + 1] - offsets[keys]
+        total = int(counts.sum())
+        hit = np.zeros(len(px), dtype=bool)
+        if total == 0:
+            return hit
+        pair_point = np.repeat(points, counts)
+        pair_seg = cell_segs[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)]
+
+        qx, qz = px[pair_point], pz[pair_point]
+        p1, ab = self.p1[pair_seg], self.ab[pair_seg]
+        ap_dot_ab = (qx - p1[:, 0]) * ab[:, 0] + (qz - p1[:, 1]) * ab[:, 1]
+        t = np.clip(ap_dot_ab / np.maximum(self.ab_sq[pair_seg], 1e-8), 0.0, 1.0)
+        closest_x = p1[:, 0] + t * ab[:, 0]
+        closest_z = p1[:, 1] + t * ab[:, 1]
+        dists = np.sqrt((qx - closest_x) ** 2 + (qz - closest_z) ** 2)
+
+        hit[pair_point[dists <= threshold]] = True
+        return hit
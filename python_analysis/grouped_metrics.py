@@ -0,0 +1,468 @@
+import numpy as np
+import pandas as pd
+
+SESSION_KEYS = ["user_id", "group_id", "session_id"]
+# Acciones por bloque de la curva de aprendizaje en las métricas (MetricsCalculator.learning_curve)
+LEARNING_BLOCK_SIZE = 5
+
+
+def block_accuracies(success, bounds, block_sizes=(LEARNING_BLOCK_SIZE,)):
+    """
+    Curvas de aprendizaje (aciertos / acciones de cada bloque de block_size acciones seguidas) de
+    varias sesiones a la vez, con sumas acumuladas de aciertos: sin bucle por bloque ni por sesión.
+    :param success: array booleano de las acciones (action_success / action_fail) ordenadas por sesión
+    :param bounds: límites de cada sesión en success (n_sesiones + 1 posiciones)
+    :param block_sizes: tamaños de bloque a calcular en la misma pasada
+    :return: {block_size: lista con un array float64 por sesión (el último bloque puede ser incompleto)}
+    """
+    hits = np.concatenate(([0], np.cumsum(np.asarray(success, dtype=bool), dtype=np.int64)))
+    bounds = np.asarray(bounds, dtype=np.int64)
+    sizes = np.diff(bounds)
+
+    curves = {}
+    for block_size in block_sizes:
+        n_blocks = -(-sizes // block_size)
+        offsets = np.cumsum(n_blocks)
+        # Posición de cada bloque dentro de su sesión
+        k = np.arange(offsets[-1] if len(offsets) else 0) - np.repeat(offsets - n_blocks, n_blocks)
+        starts = np.repeat(bounds[:-1], n_blocks) + k * block_size
+        stops = np.minimum(starts + block_size, np.repeat(bounds[1:], n_blocks))
+        accuracy = (hits[stops] - hits[starts]) / (stops - starts)
+        curves[block_size] = np.split(accuracy, offsets[:-1]) if len(sizes) else []
+    return curves
+
+
+class GroupedMetricsEngine:
+    """
+    Motor de métricas agrupadas por (user_id, group_id, session_id).
+
+    En lugar de filtrar cada sub-DataFrame una vez por métrica, se hace una sola pasada
+    sobre el df completo: máscaras por rol/evento, conteos con bincount y mínimos/máximos
+    de timestamp con un groupby por código de grupo. Después solo queda un paso escalar
+    por grupo (no por fila), con las mismas fórmulas que los métodos de MetricsCalculator.
+
+    Las métricas que no están vectorizadas (p.ej. path_efficiency, que lee el ideal_path)
+    se calculan llamando al método original con el sub-DataFrame de cada grupo.
+    """
+
+    VECTORIZED = {
+        "hit_ratio": "_hit_ratio",
+        "precision": "_precision",
+        "success_rate": "_success_rate",
+        "progression": "_progression",
+        "retries_after_end": "_retries_after_end",
+        "success_after_restart": "_success_after_restart",
+        "aid_usage": "_aid_usage",
+        "aim_errors": "_aim_errors",
+        "interface_errors": "_interface_errors",
+        "navigation_errors": "_navigation_errors",
+        "time_per_success_s": "_time_per_success",
+        "voluntary_play_time_s": "_voluntary_play_time",
+        "inactivity_time_s": "_inactivity_time",
+        "first_success_time_s": "_first_success_time",
+        "sound_localization_time_s": "_sound_localization_time",
+        "activity_level_per_min": "_activity_level",
+        "audio_performance_gain": "_audio_performance_gain",
+        "avg_reaction_time_ms": "_avg_reaction_time",
+        "avg_task_duration_ms": "_avg_task_duration",
+        "task_duration_success": "_avg_task_duration",
+        "task_duration_fail": "_avg_task_duration",
+        "learning_curve_mean": "_learning_curve_mean",
+        "learning_stability": "_learning_stability",
+        "error_reduction_rate": "_error_reduction_rate",
+    }
+
+    def __init__(self, calculator):
+        self.calc = calculator
+        df = calculator.df
+
+        grouper = df.groupby(SESSION_KEYS, observed=True, sort=True)
+        self.codes = grouper.ngroup().to_numpy()
+        self.keys = grouper.size().index
+        self.n_groups = len(self.keys)
+
+        # Filas ordenadas por grupo (estable: dentro de cada grupo se mantiene el orden original,
+        # igual que en los sub-DataFrames de groupby)
+        order = np.argsort(self.codes, kind="stable")
+        self._sorted = df.iloc[order]
+        self._bounds = np.searchsorted(self.codes[order], np.arange(self.n_groups + 1))
+
+        self._subframes = {}
+        self._masks = {}
+        self._timeline = None
+        self._task_means = {}
+        self._curves = {}
+        self._generic = None
+
+    # ------------------------------------------------------------------
+    # Acceso por grupo
+    # ------------------------------------------------------------------
+    def group_keys(self, i):
+        return dict(zip(SESSION_KEYS, self.keys[i]))
+
+    def subframe(self, i):
+        """
+        Sub-DataFrame del grupo i (mismas filas, orden e índice que en groupby). Siempre el mismo
+        objeto: MetricsCalculator memoiza los intermedios por partición usando su identidad.
+        """
+        if i not in self._subframes:
+            self._subframes[i] = self._sorted.iloc[self._bounds[i]:self._bounds[i + 1]]
+        return self._subframes[i]
+
+    def independent_variables(self):
+        """
+        independent_variable de cada grupo. MetricsCalculator._independent_variable solo mira
+        filas con la columna plana, con el objeto 'session' o eventos session_start: se le pasa
+        únicamente ese subconjunto de cada grupo en lugar del sub-DataFrame completo.
+        """
+        if self.calc.session_index is not None:
+            # Índice de metadatos construido una vez al parsear: sin recorrer el df
+            index = self.calc.session_index
+            return [index.metadata(sid).get("independent_variable")
+                    for sid in self.keys.get_level_values("session_id")]
+
+        df = self.calc.df
+        candidates = df["event_name"] == "session_start"
+        for col in ("independent_variable", "session"):
+            if col in df.columns:
+                candidates |= df[col].notna()
+        candidates = candidates.to_numpy(dtype=bool, na_value=False)
+
+        positions = candidates.nonzero()[0]
+        order = np.argsort(self.codes[positions], kind="stable")
+        rows = df.iloc[positions[order]]
+        bounds = np.searchsorted(self.codes[positions[order]], np.arange(self.n_groups + 1))
+
+        return [self.calc._independent_variable(rows.iloc[bounds[i]:bounds[i + 1]]) if bounds[i + 1] > bounds[i]
+                else None for i in range(self.n_groups)]
+
+    def learning_curves(self, block_sizes=(LEARNING_BLOCK_SIZE,)):
+        """
+        Curva de aprendizaje de cada grupo para uno o varios tamaños de bloque: las acciones
+        se seleccionan y ordenan por grupo una sola vez.
+        :return: {block_size: lista de n_groups arrays}
+        """
+        missing = [b for b in block_sizes if b not in self._curves]
+        if missing:
+            actions = self._role("action_success", "action_fail")
+            codes = self.codes[actions]
+            order = np.argsort(codes, kind="stable")
+            success = self._role("action_success")[actions][order]
+            bounds = np.searchsorted(codes[order], np.arange(self.n_groups + 1))
+            self._curves.update(block_accuracies(success, bounds, missing))
+        return {b: self._curves[b] for b in block_sizes}
+
+    def raw_metric(self, name):
+        """
+        Valores brutos de una métrica para todos los grupos (lista de longitud n_groups),
+        o None si la métrica no está vectorizada.
+        """
+        method = self.VECTORIZED.get(name)
+        return getattr(self, method)() if method else None
+
+    def generic_metric(self, params):
+        """
+        Valores de una métrica genérica de config (target_event + aggregation) para todos los
+        grupos, o None si no es genérica. La primera llamada ejecuta el plan completo.
+        """
+        target_event, aggregation = params.get("target_event"), params.get("aggregation")
+        if not (target_event and aggregation):
+            return None
+        if self._generic is None:
+            self._generic = self.generic_metrics(self.calc.generic_metric_plan())
+        values = self._generic.get((target_event, aggregation.lower()))
+        if values is None:
+            # Métrica fuera del plan (p.ej. deshabilitada): misma agregación sobre su evento
+            values = self.generic_metrics({target_event: {aggregation.lower()}})[(target_event, aggregation.lower())]
+        return values
+
+    def generic_metrics(self, plan):
+        """
+        Todas las métricas genéricas del plan ({target_event: {agregaciones}}) en una pasada: las
+        filas de los eventos del plan se agregan de una vez por par (grupo, evento) — nº de eventos,
+        suma, media, mínimo y máximo de sus valores numéricos — y cada entrada del plan se lee de
+        ahí, con las reglas de _aggregate_generic (0.0 sin eventos, sin valores o agregación desconocida).
+        :return: {(target_event, agregación): lista de longitud n_groups}
+        """
+        if not plan:
+            return {}
+        df = self.calc.df
+        targets = list(plan)
+        n_pairs = self.n_groups * len(targets)
+        target_of_row = pd.Index(targets).get_indexer(df["event_name"])
+
+        rows = np.flatnonzero(target_of_row >= 0)
+        pairs = self.codes[rows] * len(targets) + target_of_row[rows]
+        if "event_value" in df.columns:
+            numeric = pd.to_numeric(df["event_value"].iloc[rows], errors="coerce") \
+                .to_numpy(dtype=float, na_value=np.nan)
+        else:
+            numeric = np.full(len(rows), np.nan)
+
+        # Valores numéricos ordenados por par: cada par con valores es un tramo contiguo
+        present = ~np.isnan(numeric)
+        order = np.argsort(pairs[present], kind="stable")
+        valued_pairs, vals = pairs[present][order], numeric[present][order]
+        n_vals = np.bincount(valued_pairs, minlength=n_pairs)
+        has_vals = n_vals > 0
+        sums = np.bincount(valued_pairs, weights=vals, minlength=n_pairs)
+
+        stats = {"count": np.bincount(pairs, minlength=n_pairs).astype(float), "sum": sums,
+                 "mean": np.divide(sums, n_vals, out=np.zeros(n_pairs), where=has_vals)}
+        stats["average"] = stats["mean"]
+        starts = np.searchsorted(valued_pairs, np.arange(n_pairs))[has_vals]
+        for how, ufunc in (("min", np.minimum), ("max", np.maximum)):
+            stats[how] = np.zeros(n_pairs)
+            if len(vals):
+                stats[how][has_vals] = ufunc.reduceat(vals, starts)
+
+        results = {}
+        for t, target in enumerate(targets):
+            for agg in plan[target]:
+                values = stats.get(agg)
+                results[(target, agg)] = values[t::len(targets)].tolist() if values is not None \
+                    else [0.0] * self.n_groups
+        return results
+
+    # ------------------------------------------------------------------
+    # Bloques comunes (una pasada por máscara)
+    # ------------------------------------------------------------------
+    def _mask(self, key):
+        if key not in self._masks:
+            df = self.calc.df
+            kind, value = key
+            if kind == "role":
+                mask = df["event_role"] == value
+            elif kind == "name":
+                mask = df["event_name"] == value
+            elif kind == "success_str":
+                mask = df["event_value"].astype(str).str.lower() == "success"
+            else:  # "success_eq"
+                mask = df["event_value"] == "success"
+            self._masks[key] = mask.to_numpy(dtype=bool, na_value=False)
+        return self._masks[key]
+
+    def _role(self, *roles):
+        mask = self._mask(("role", roles[0]))
+        for role in roles[1:]:
+            mask = mask | self._mask(("role", role))
+        return mask
+
+    def _count(self, mask):
+        return np.bincount(self.codes[mask], minlength=self.n_groups)
+
+    def _ts_reduce(self, mask, how):
+        ts = self.calc.df["timestamp"][mask]
+        reduced = getattr(ts.groupby(self.codes[mask]), how)()
+        return reduced.reindex(range(self.n_groups)).tolist()
+
+    def _timeline_stats(self):
+        """
+        Línea temporal por grupo con todos los timestamps (df + tablas de telemetría), como
+        MetricsCalculator._all_timestamps: número de eventos, mínimo, máximo e inactividad.
+        """
+        if self._timeline is not None:
+            return self._timeline
+
+        parts_ts = [self.calc.df["timestamp"]]
+        parts_codes = [self.codes]
+        for table in self.calc.frame_tables.values():
+            idx = self.keys.get_indexer(pd.MultiIndex.from_frame(table[SESSION_KEYS]))
+            keep = idx >= 0
+            if keep.any():
+                parts_ts.append(table["timestamp"][keep])
+                parts_codes.append(idx[keep])
+        ts = pd.concat(parts_ts, ignore_index=True) if len(parts_ts) > 1 else parts_ts[0].reset_index(drop=True)
+        codes = np.concatenate(parts_codes)
+
+        count = np.bincount(codes, minlength=self.n_groups)
+        grouped = ts.groupby(codes)
+        ts_min = grouped.min().reindex(range(self.n_groups)).tolist()
+        ts_max = grouped.max().reindex(range(self.n_groups)).tolist()
+
+        # Orden (grupo, timestamp) con NaT al final, diferencias dentro de cada grupo
+        sort_key = ts.to_numpy(dtype="datetime64[ns]").astype("int64")
+        sort_key = np.where(ts.isna().to_numpy(), np.iinfo("int64").max, sort_key)
+        order = np.lexsort((sort_key, codes))
+        sorted_codes = codes[order]
+        secs = ts.iloc[order].diff().dt.total_seconds().to_numpy(dtype=float, na_value=np.nan, copy=True)
+        if len(secs):
+            first = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+            secs[first] = np.nan
+        bounds = np.searchsorted(sorted_codes, np.arange(self.n_groups + 1))
+
+        self._timeline = {"count": count, "min": ts_min, "max": ts_max, "secs": secs, "bounds": bounds}
+        return self._timeline
+
+    def _group_means(self, values, codes):
+        """Media por grupo de los valores no nulos (None si el grupo no tiene ninguno)."""
+        values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(values)
+        values, codes = values[valid], codes[valid]
+        order = np.argsort(codes, kind="stable")
+        values = values[order]
+        bounds = np.searchsorted(codes[order], np.arange(self.n_groups + 1))
+        return [float(values[bounds[i]:bounds[i + 1]].mean()) if bounds[i + 1] > bounds[i] else None
+                for i in range(self.n_groups)]
+
+    def _task_stat_means(self, column, explicit_column):
+        """
+        Media por grupo de task_duration_ms / reaction_time_ms. Los pares inicio-fin de todas las
+        sesiones salen de un único MetricsCalculator._task_intervals sobre el df completo.
+        Si el df trae la columna explícita (duration_ms / reaction_time_ms) tiene prioridad.
+        """
+        if column not in self._task_means:
+            intervals = self.calc._task_intervals(self.calc.df)
+            codes = self.keys.get_indexer(pd.MultiIndex.from_frame(intervals[SESSION_KEYS]))
+            derived = self._group_means(intervals[column], codes)
+
+            if explicit_column in self.calc.df.columns:
+                explicit = self._group_means(self.calc.df[explicit_column], self.codes)
+                derived = [e if e is not None else d for e, d in zip(explicit, derived)]
+            self._task_means[column] = [np.nan if v is None else v for v in derived]
+        return self._task_means[column]
+
+    # ------------------------------------------------------------------
+    # Métricas vectorizadas (mismas fórmulas que MetricsCalculator)
+    # ------------------------------------------------------------------
+    def _hit_ratio(self):
+        hits = self._count(self._role("action_success"))
+        fails = self._count(self._role("action_fail"))
+        return [int(h) / int(h + f) if h + f > 0 else 0.0 for h, f in zip(hits, fails)]
+
+    def _precision(self):
+        hits = self._count(self._role("action_success"))
+        actions = self._count(self._role("action_success", "action_fail"))
+        return [int(h) / int(a) if a > 0 else np.nan for h, a in zip(hits, actions)]
+
+    def _success_rate(self):
+        tasks = self._count(self._role("task_end"))
+        success = self._count(self._role("task_end") & self._mask(("success_str", None)))
+        return [int(s) / int(t) if t > 0 else np.nan for s, t in zip(success, tasks)]
+
+    def _progression(self):
+        return self._count(self._role("task_end") & self._mask(("success_str", None))).tolist()
+
+    def _retries_after_end(self):
+        return self._count(self._role("task_restart")).tolist()
+
+    def _success_after_restart(self):
+        restart = self._role("task_restart")
+        success = self._role("task_end") & self._mask(("success_str", None))
+        ts = self.calc.df["timestamp"]
+        last_success = ts[success].groupby(self.codes[success]).max().reindex(range(self.n_groups))
+        later = ts[restart].to_numpy() < last_success.to_numpy()[self.codes[restart]]
+        restarts = self._count(restart)
+        counted = np.bincount(self.codes[restart][later], minlength=self.n_groups)
+        return [int(c) / int(r) if r > 0 else 0.0 for c, r in zip(counted, restarts)]
+
+    def _curve_fallback(self, i):
+        # Sin bloques suficientes: path_efficiency del grupo (método original, memoizado)
+        eff = self.calc.path_efficiency(self.subframe(i))
+        return float(eff) if eff is not None else 0.0
+
+    def _learning_curve_mean(self):
+        curves = self.learning_curves()[LEARNING_BLOCK_SIZE]
+        return [float(np.nanmean(v)) if len(v) else self._curve_fallback(i) for i, v in enumerate(curves)]
+
+    def _learning_stability(self):
+        curves = self.learning_curves()[LEARNING_BLOCK_SIZE]
+        return [1.0 / (1.0 + np.std(v)) if len(v) >= 2 else self._curve_fallback(i) for i, v in enumerate(curves)]
+
+    def _error_reduction_rate(self):
+        curves = self.learning_curves()[LEARNING_BLOCK_SIZE]
+        return [float(v[-1] - v[0]) if len(v) >= 2 else self._curve_fallback(i) for i, v in enumerate(curves)]
+
+    def _aid_usage(self):
+        return self._count(self._role("help_event")).tolist()
+
+    def _aim_errors(self):
+        return self._count(self._role("action_fail")).tolist()
+
+    def _interface_errors(self):
+        return self._count(self._mask(("name", "ui_error"))).tolist()
+
+    def _navigation_errors(self):
+        errors = self._count(self._role("navigation_error", "action_fail")).tolist()
+        # Sin errores: estimación a partir de path_efficiency (método original, por grupo)
+        return [e if e else self.calc.navigation_errors(self.subframe(i)) for i, e in enumerate(errors)]
+
+    def _time_per_success(self):
+        hits = self._count(self._role("action_success"))
+        line = self._timeline_stats()
+        return [(t1 - t0).total_seconds() / int(h) if h > 0 else np.nan
+                for h, t0, t1 in zip(hits, line["min"], line["max"])]
+
+    def _voluntary_play_time(self):
+        task_end_time = self._ts_reduce(self._role("task_end") & self._mask(("success_eq", None)), "max")
+        has_success = self._count(self._role("task_end") & self._mask(("success_eq", None)))
+        last_event_time = self._timeline_stats()["max"]
+
+        values = []
+        for n, end, last in zip(has_success, task_end_time, last_event_time):
+            value = 0.0
+            if n and pd.notna(last) and pd.notna(end):
+                diff = (last - end).total_seconds()
+                if diff > 2.0:
+                    value = diff
+            values.append(value)
+        return values
+
+    def _inactivity_time(self, threshold=5):
+        line = self._timeline_stats()
+        secs, bounds = line["secs"], line["bounds"]
+        values = []
+        for i in range(self.n_groups):
+            diffs = secs[bounds[i]:bounds[i + 1]]
+            values.append(diffs[diffs > threshold].sum())
+        return values
+
+    def _first_success_time(self):
+        start = self._ts_reduce(self._role("session_start", "task_start"), "min")
+        succ = self._ts_reduce(self._role("action_success"), "min")
+        end = self._ts_reduce(self._role("task_end"), "min")
+
+        values = []
+        for t_start, t_succ, t_end in zip(start, succ, end):
+            if pd.notna(t_start) and pd.notna(t_succ):
+                values.append((t_succ - t_start).total_seconds())
+            elif pd.notna(t_start) and pd.notna(t_end):
+                values.append((t_end - t_start).total_seconds())
+            else:
+                values.append(np.nan)
+        return values
+
+    def _sound_localization_time(self):
+        audio = self._ts_reduce(self._mask(("name", "audio_triggered")), "min")
+        head = self._ts_reduce(self._mask(("name", "head_turn")), "min")
+        n_audio = self._count(self._mask(("name", "audio_triggered")))
+        n_head = self._count(self._mask(("name", "head_turn")))
+
+        values = []
+        for na, nh, t_audio, t_head in zip(n_audio, n_head, audio, head):
+            if not (na and nh):
+                values.append(None)
+            elif pd.notna(t_audio) and pd.notna(t_head) and t_head > t_audio:
+                values.append((t_head - t_audio).total_seconds())
+            else:
+                values.append(None)
+        return values
+
+    def _activity_level(self):
+        line = self._timeline_stats()
+        values = []
+        for n, t0, t1 in zip(line["count"], line["min"], line["max"]):
+            dur = (t1 - t0).total_seconds() / 60
+            values.append(np.nan if dur <= 0 else int(n) / dur)
+        return values
+
+    def _avg_reaction_time(self):
+        return self._task_stat_means("reaction_time_ms", "reaction_time_ms")
+
+    def _avg_task_duration(self):
+        return self._task_stat_means("task_duration_ms", "duration_ms")
+
+    def _audio_performance_gain(self):
+        if "audio_enabled" in self.calc.df.columns:
+            return [self.calc.audio_performance_gain(self.subframe(i)) for i in range(self.n_groups)]
+        return [0.0] * self.n_groups
@@ -0,0 +1,214 @@
+"""
+Intervalos de confianza bootstrap y pruebas de permutación por nivel de independent_variable.
+
+Para cada columna numérica de compute_grouped_metrics (una fila por sesión):
+  - media de cada nivel con su intervalo de confianza bootstrap (percentiles de las medias
+    remuestreadas dentro del nivel),
+  - p-valor de una prueba de permutación de las etiquetas de nivel entre sesiones. El estadístico
+    es la suma de cuadrados entre niveles, sum_k n_k (media_k - media)^2; con dos niveles equivale
+    a la diferencia de medias en valor absoluto (prueba bilateral).
+
+Los remuestreos se generan por bloques como matrices de índices (remuestreos x sesiones) y las
+medias de todas las métricas de un bloque salen de un producto de matrices (conteos o máscaras
+de nivel por valores), sin bucles por remuestreo ni por métrica. Los NaN se ignoran como en
+nanmean. Cada bloque tiene su propia semilla derivada de `seed`, así que el resultado es el
+mismo con cualquier número de hilos.
+"""
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from python_analysis.grouped_metrics import SESSION_KEYS
+
+IV_COLUMN = "independent_variable"
+# Remuestreos por bloque: acota la memoria de las matrices de índices (bloque x sesiones)
+RESAMPLE_CHUNK = 1000
+# Valor que compute_grouped_metrics escribe para las sesiones sin variable independiente
+MISSING_LEVEL = "N/A"
+STATISTICS_COLUMNS = [IV_COLUMN, "metric", "n", "mean", "ci_low", "ci_high", "confidence", "p_value"]
+
+
+def numeric_metrics(grouped_df, iv_col=IV_COLUMN):
+    """
+    Columnas numéricas de grouped_df como matriz float (sesiones x métricas).
+    Las columnas object completamente numéricas (cuestionarios cruzados con pd.NA) también cuentan.
+    """
+    columns = {}
+    for col in grouped_df.columns:
+        if col == iv_col or col in SESSION_KEYS:
+            continue
+        values = grouped_df[col]
+        if pd.api.types.is_bool_dtype(values.dtype):
+            continue
+        if not pd.api.types.is_numeric_dtype(values.dtype):
+            if values.dtype != object:
+                continue
+            numeric = pd.to_numeric(values, errors="coerce")
+            if numeric.notna().sum() == 0 or numeric.notna().sum() != values.notna().sum():
+                continue
+            values = numeric
+        columns[col] = values.to_numpy(dtype=float, na_value=np.nan)
+    names = list(columns)
+    matrix = np.column_stack([columns[c] for c in names]) if names else np.empty((len(grouped_df), 0))
+    return names, matrix
+
+
+def _chunks(n_resamples, seed):
+    """Bloques de remuestreos (tamaño, semilla): no dependen del número de workers."""
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    sizes = [min(RESAMPLE_CHUNK, n_resamples - start) for start in range(0, n_resamples, RESAMPLE_CHUNK)]
+    return list(zip(sizes, seed_sequence.spawn(len(sizes))))
+
+
+def _map(func, tasks, workers):
+    # Hilos y no procesos: el trabajo son productos de matrices de numpy (liberan el GIL)
+    if workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            return list(pool.map(func, tasks))
+    return [func(task) for task in tasks]
+
+
+def _weighted_means(weights, values, valid):
+    """Medias por fila de weights (remuestreo) de cada métrica, ignorando NaN."""
+    counts = weights @ valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weights @ values) / counts, counts
+
+
+# ----------------------------------------------------------------------
+# Bootstrap
+# ----------------------------------------------------------------------
+def bootstrap_means(matrix, n_resamples=10000, seed=0, workers=1):
+    """
+    Medias bootstrap de cada columna de matrix (sesiones x métricas).
+    :return: array (n_resamples x métricas); NaN si un remuestreo no tiene valores de la métrica
+    """
+    n = len(matrix)
+    valid = ~np.isnan(matrix)
+    values = np.where(valid, matrix, 0.0)
+    valid = valid.astype(float)
+
+    def chunk(task):
+        size, seed_seq = task
+        rng = np.random.default_rng(seed_seq)
+        # Matriz de índices remuestreados -> conteos de cada sesión por remuestreo
+        index = rng.integers(0, n, size=(size, n))
+        index += (np.arange(size) * n)[:, None]
+        counts = np.bincount(index.ravel(), minlength=size * n).reshape(size, n).astype(float)
+        return _weighted_means(counts, values, valid)[0]
+
+    return np.vstack(_map(chunk, _chunks(n_resamples, seed), workers))
+
+
+def bootstrap_ci(matrix, n_resamples=10000, confidence=0.95, seed=0, workers=1):
+    """:return: (ci_low, ci_high) por columna, percentiles de las medias bootstrap"""
+    if len(matrix) == 0:
+        empty = np.full(matrix.shape[1], np.nan)
+        return empty, empty.copy()
+    means = bootstrap_means(matrix, n_resamples, seed, workers)
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # métricas sin ningún valor en el nivel
+        low, high = np.nanpercentile(means, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return low, high
+
+
+# ----------------------------------------------------------------------
+# Permutación
+# ----------------------------------------------------------------------
+def _between_ss(masks, values, valid, grand_mean):
+    """Suma de cuadrados entre niveles por fila de masks (una máscara por nivel)."""
+    total = 0.0
+    for mask in masks:
+        means, counts = _weighted_means(mask, values, valid)
+        total = total + np.where(counts > 0, counts * (means - grand_mean) ** 2, 0.0)
+    return total
+
+
+def permutation_pvalues(matrix, codes, n_resamples=10000, seed=0, workers=1):
+    """
+    P-valor por columna de la prueba de permutación de las etiquetas `codes` (0..k-1).
+    :return: array de p-valores ((1 + permutaciones >= observado) / (1 + n_resamples));
+             NaN si hay menos de dos niveles o la métrica no tiene valores
+    """
+    levels = np.unique(codes)
+    n_metrics = matrix.shape[1]
+    if len(levels) < 2:
+        return np.full(n_metrics, np.nan)
+
+    valid = ~np.isnan(matrix)
+    values = np.where(valid, matrix, 0.0)
+    valid = valid.astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grand_mean = values.sum(axis=0) / valid.sum(axis=0)
+
+    observed = _between_ss([(codes == k).astype(float)[None, :] for k in levels], values, valid, grand_mean)[0]
+    # Tolerancia relativa: el mismo reparto en otro orden da el estadístico con otro redondeo
+    threshold = observed - 1e-9 * np.abs(observed)
+    n = len(codes)
+
+    def chunk(task):
+        size, seed_seq = task
+        rng = np.random.default_rng(seed_seq)
+        # Matriz de índices permutados -> etiquetas permutadas por remuestreo
+        labels = codes[rng.permuted(np.tile(np.arange(n), (size, 1)), axis=1)]
+        stats = _between_ss([(labels == k).astype(float) for k in levels], values, valid, grand_mean)
+        return (stats >= threshold).sum(axis=0)
+
+    exceed = sum(_map(chunk, _chunks(n_resamples, seed), workers))
+    pvalues = (1 + exceed) / (1 + n_resamples)
+    return np.where(valid.sum(axis=0) > 0, pvalues, np.nan)
+
+
+# ----------------------------------------------------------------------
+# Tabla por nivel y métrica
+# ----------------------------------------------------------------------
+def variable_statistics(grouped_df, n_resamples=10000, confidence=0.95, seed=0, workers=1, iv_col=IV_COLUMN):
+    """
+    Media, IC bootstrap y p-valor de permutación de cada métrica numérica por nivel de iv_col.
+    :param grouped_df: DataFrame de compute_grouped_metrics (una fila por sesión)
+    :param n_resamples: remuestreos bootstrap y permutaciones
+    :param confidence: nivel del intervalo de confianza
+    :param seed: semilla (mismo resultado con cualquier número de workers)
+    :param workers: hilos para los bloques de remuestreos
+    :return: DataFrame con STATISTICS_COLUMNS (una fila por nivel y métrica; el p-valor es el
+             de la métrica, repetido en sus niveles), o None si no hay columna iv_col.
+             Las sesiones sin variable independiente ("N/A") no entran en ningún nivel ni en la
+             prueba de permutación
+    """
+    if iv_col not in grouped_df.columns:
+        return None
+    # Sesiones sin variable independiente (NaN, "N/A" o texto vacío): no son un nivel
+    levels_text = grouped_df[iv_col].astype(str).str.strip()
+    labelled = grouped_df[iv_col].notna() & ~levels_text.isin([MISSING_LEVEL, ""])
+    df = grouped_df[labelled]
+    names, matrix = numeric_metrics(df, iv_col)
+    try:
+        codes, levels = pd.factorize(df[iv_col], sort=True)
+    except TypeError:
+        codes, levels = pd.factorize(df[iv_col])  # niveles de tipos mezclados: orden de aparición
+    if not names or len(levels) == 0:
+        return pd.DataFrame(columns=STATISTICS_COLUMNS)
+
+    boot_seed, perm_seed = np.random.SeedSequence(seed).spawn(2)
+    level_seeds = boot_seed.spawn(len(levels))
+    pvalues = permutation_pvalues(matrix, codes, n_resamples, perm_seed, workers)
+
+    frames = []
+    for k, level in enumerate(levels):
+        level_matrix = matrix[codes == k]
+        low, high = bootstrap_ci(level_matrix, n_resamples, confidence, level_seeds[k], workers)
+        valid = ~np.isnan(level_matrix)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(valid, level_matrix, 0.0).sum(axis=0) / valid.sum(axis=0)
+        frames.append(pd.DataFrame({
+            iv_col: level, "metric": names, "n": valid.sum(axis=0),
+            "mean": means, "ci_low": low, "ci_high": high, "confidence": confidence, "p_value": pvalues,
+        }))
+    result = pd.concat(frames, ignore_index=True)
+    # Orden: métrica (orden de columnas de grouped_df) y nivel
+    order = {name: i for i, name in enumerate(names)}
+    result = result.sort_values("metric", key=lambda s: s.map(order), kind="stable").reset_index(drop=True)
+    return result[STATISTICS_COLUMNS]
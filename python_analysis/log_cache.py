@@ -0,0 +1,253 @@
+"""
+Caché local de logs (Parquet) particionada por session_id.
+
+La primera ejecución descarga y parsea la colección; las siguientes solo piden a Mongo
+los documentos con _id posterior a la marca de agua (watermark) y cargan el resto desde
+disco. Las sesiones borradas en Mongo se eliminan de la caché y las que no cuadran con
+el resumen del servidor (nº de documentos / _id máximo) se vuelven a descargar enteras.
+Las modificaciones in situ de un documento no cambian ese resumen: en ese caso hay que
+invalidar la sesión a mano.
+
+Invalidación manual:
+    python -m python_analysis.log_cache --invalidate               # toda la caché
+    python -m python_analysis.log_cache --invalidate --session S1  # solo una sesión
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from bson import json_util
+
+from python_analysis.log_parser import LogParser, LOG_FIELDS
+
+
+class LogCache:
+    MANIFEST = "manifest.json"
+    # Formato de las claves de partición del manifest (2: claves con tipo, ver _key)
+    KEY_VERSION = 2
+
+    def __init__(self, parser, cache_dir=None):
+        """
+        :param parser: LogParser conectado a la colección que se quiere cachear
+        :param cache_dir: carpeta raíz de la caché (por defecto LOG_CACHE_DIR o ./log_cache)
+        """
+        self.parser = parser
+        root = Path(cache_dir or os.getenv("LOG_CACHE_DIR", "log_cache"))
+        self.dir = root / f"{parser.db_name}_{parser.collection_name}"
+        self.manifest = self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # Manifest (watermark + resumen por sesión)
+    # ------------------------------------------------------------------
+    def _load_manifest(self):
+        path = self.dir / self.MANIFEST
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json_util.loads(f.read())
+            if manifest.get("key_version") == self.KEY_VERSION:
+                return manifest
+            # Claves sin tipo (None y "" o 1 y "1" compartían partición): se descarta la caché
+            print(f"[LogCache] ⚠️ Caché con un formato de claves anterior, se vuelve a descargar: {self.dir}")
+            shutil.rmtree(self.dir, ignore_errors=True)
+        return {"key_version": self.KEY_VERSION, "watermark": None, "sessions": {}}
+
+    def _save_manifest(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / self.MANIFEST, "w", encoding="utf-8") as f:
+            f.write(json_util.dumps(self.manifest, indent=2))
+
+    @staticmethod
+    def _key(session_id):
+        """
+        Clave de partición (string para el manifest) con el tipo del session_id: None, "" y
+        "None" o 1 y "1" son sesiones distintas en Mongo y tienen particiones distintas.
+        """
+        if session_id is None:
+            return "null"
+        return f"{type(session_id).__name__}:{session_id}"
+
+    @staticmethod
+    def _session_id(doc):
+        # Mismo criterio que session_stats ($ifNull): solo null / ausente pasa al contexto
+        sid = doc.get("session_id")
+        return (doc.get("event_context") or {}).get("session_id") if sid is None else sid
+
+    def _partition_dir(self, key):
+        safe = re.sub(r"[^\w.-]", "_", key)[:40] or "no_session"
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+        return self.dir / "sessions" / f"{safe}_{digest}"
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura de particiones
+    # ------------------------------------------------------------------
+    def _write_partition(self, key, tables):
+        part_dir = self._partition_dir(key)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        json_columns = {}
+        for name, table in tables.items():
+            table, json_columns[name] = self._encode_object_columns(table)
+            table.to_parquet(part_dir / f"{name}.parquet", index=False)
+        return json_columns
+
+    def _read_partition(self, key):
+        entry = self.manifest["sessions"].get(key)
+        part_dir = self._partition_dir(key)
+        if entry is None or not part_dir.exists():
+            return None
+        tables = {}
+        for path in part_dir.glob("*.parquet"):
+            table = pd.read_parquet(path)
+            for col in entry.get("json_columns", {}).get(path.stem, []):
+                table[col] = table[col].map(lambda v: json.loads(v) if isinstance(v, str) else v)
+            tables[path.stem] = table
+        return tables
+
+    def _drop_partition(self, key):
+        shutil.rmtree(self._partition_dir(key), ignore_errors=True)
+        self.manifest["sessions"].pop(key, None)
+
+    @staticmethod
+    def _encode_object_columns(table):
+        """Parquet no admite columnas object con tipos mezclados (dicts, listas, float + str...)."""
+        encoded = []
+        table = table.copy()
+        for col in table.columns:
+            if table[col].dtype != object:
+                continue
+            values = [v for v in table[col] if v is not None and not (isinstance(v, float) and v != v)]
+            if all(isinstance(v, str) for v in values):
+                continue
+            table[col] = table[col].map(
+                lambda v: None if v is None or (isinstance(v, float) and v != v) else json.dumps(v, default=str))
+            encoded.append(col)
+        return table, encoded
+
+    # ------------------------------------------------------------------
+    # Sincronización incremental
+    # ------------------------------------------------------------------
+    def sync(self, session_ids=None, batch_size=5000):
+        """
+        Trae de Mongo solo lo que falta en la caché.
+        :param session_ids: limitar la sincronización a estas sesiones (None = toda la colección)
+        :return: dict con el número de documentos nuevos y las sesiones borradas / re-descargadas
+        """
+        sessions = self.manifest["sessions"]
+        scope = {self._key(s) for s in session_ids} if session_ids else None
+        stats = self.parser.session_stats(session_ids)
+        server = {self._key(sid): st for sid, st in stats.items()}
+        server_ids = {self._key(sid): sid for sid in stats}
+
+        # 1. Sesiones que ya no existen en Mongo
+        deleted = [k for k in sessions if (scope is None or k in scope) and k not in server]
+        for key in deleted:
+            self._drop_partition(key)
+
+        # 2. Documentos nuevos (posteriores a la watermark), parseados por sesión y lote
+        query = LogParser.session_query(session_ids) if session_ids else {}
+        if self.manifest["watermark"] is not None:
+            query = {"$and": [query, {"_id": {"$gt": self.manifest["watermark"]}}]}
+
+        pending, new_counts, new_max = {}, {}, {}
+        n_new = 0
+        for batch in self.parser.iter_logs(query=query, batch_size=batch_size, projection=LOG_FIELDS + ("_id",)):
+            by_session = {}
+            for doc in batch:
+                by_session.setdefault(self._key(self._session_id(doc)), []).append(doc)
+            for key, docs in by_session.items():
+                pending.setdefault(key, []).append(self.parser.parse_log_tables(docs))
+                new_counts[key] = new_counts.get(key, 0) + len(docs)
+                batch_max = max(d["_id"] for d in docs)
+                new_max[key] = batch_max if key not in new_max else max(new_max[key], batch_max)
+            n_new += len(batch)
+
+        for key, parts in pending.items():
+            existing = self._read_partition(key)
+            tables = LogParser.merge_tables(([existing] if existing else []) + parts)
+            previous = sessions.get(key, {"count": 0, "max_id": None})
+            max_id = new_max[key] if previous["max_id"] is None else max(previous["max_id"], new_max[key])
+            sessions[key] = {
+                "count": previous["count"] + new_counts[key],
+                "max_id": max_id,
+                "json_columns": self._write_partition(key, tables),
+            }
+
+        # 3. Sesiones reescritas (o ausentes en caché con _id anterior a la watermark)
+        refetched = []
+        for key, st in server.items():
+            cached = sessions.get(key)
+            if cached is not None and cached["count"] == st["count"] and cached["max_id"] == st["max_id"]:
+                continue
+            self._refetch(key, server_ids[key], batch_size)
+            refetched.append(key)
+
+        max_ids = [e["max_id"] for e in sessions.values() if e.get("max_id") is not None]
+        self.manifest["watermark"] = max(max_ids) if max_ids else None
+        self._save_manifest()
+
+        summary = {"new_docs": n_new, "deleted": deleted, "refetched": refetched}
+        print(f"[LogCache] 🔄 Sync: {n_new} documentos nuevos, {len(deleted)} sesiones borradas, "
+              f"{len(refetched)} sesiones re-descargadas.")
+        return summary
+
+    def _refetch(self, key, session_id, batch_size):
+        if session_id is None:
+            query = {"session_id": None, "event_context.session_id": None}
+        else:
+            query = LogParser.session_query([session_id])
+
+        count, max_id, parts = 0, None, []
+        for batch in self.parser.iter_logs(query=query, batch_size=batch_size, projection=LOG_FIELDS + ("_id",)):
+            parts.append(self.parser.parse_log_tables(batch))
+            count += len(batch)
+            batch_max = max(d["_id"] for d in batch)
+            max_id = batch_max if max_id is None else max(max_id, batch_max)
+
+        self._drop_partition(key)
+        if count:
+            self.manifest["sessions"][key] = {
+                "count": count,
+                "max_id": max_id,
+                "json_columns": self._write_partition(key, LogParser.merge_tables(parts)),
+            }
+
+    # ------------------------------------------------------------------
+    # Carga e invalidación
+    # ------------------------------------------------------------------
+    def load(self, session_ids=None):
+        """Devuelve las tablas de parse_log_tables para las sesiones cacheadas (None = todas)."""
+        keys = [self._key(s) for s in session_ids] if session_ids else list(self.manifest["sessions"])
+        partitions = [self._read_partition(k) for k in sorted(keys)]
+        return LogParser.merge_tables(p for p in partitions if p)
+
+    def invalidate(self, session_ids=None):
+        """Borra la caché completa o solo las sesiones indicadas (se re-descargan en el próximo sync)."""
+        if not session_ids:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.manifest = {"key_version": self.KEY_VERSION, "watermark": None, "sessions": {}}
+            print(f"[LogCache] 🗑️ Caché eliminada: {self.dir}")
+            return
+        for sid in session_ids:
+            self._drop_partition(self._key(sid))
+        self._save_manifest()
+        print(f"[LogCache] 🗑️ Sesiones invalidadas: {', '.join(map(str, session_ids))}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Caché local de logs (Parquet por session_id)")
+    arg_parser.add_argument("--invalidate", action="store_true", help="Borrar la caché (o solo --session)")
+    arg_parser.add_argument("--session", action="append", help="session_id a invalidar/sincronizar (repetible)")
+    arg_parser.add_argument("--sync", action="store_true", help="Sincronizar la caché con Mongo")
+    args = arg_parser.parse_args()
+
+    log_parser = LogParser()
+    cache = LogCache(log_parser)
+    if args.invalidate:
+        cache.invalidate(args.session)
+    if args.sync:
+        cache.sync(args.session)
+    log_parser.close()
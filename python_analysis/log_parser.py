@@ -2,20 +2,70 @@ import pandas as pd
 from pymongo import MongoClient
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from python_analysis.file_source import FileClient
+
 # Cargar variables de entorno desde el archivo .env (si existe)
 load_dotenv()
 
+# Campos que usa el análisis. Se usan como proyección por defecto en la lectura
+# por lotes para no traer de Mongo campos que no se van a parsear (_id, save...).
+LOG_FIELDS = (
+    "timestamp", "user_id", "group_id", "session_id",
+    "event_type", "event_name", "event_value", "event_context",
+)
+
+# Telemetría de alta frecuencia (~25 Hz) que se enruta a tablas densas y tipadas
+# en parse_log_tables. Las columnas numéricas se guardan como float32.
+FRAME_TABLE_SCHEMAS = {
+    "movement_frame": ["position_x", "position_y", "position_z", "velocity"],
+    "gaze_frame": ["hit_position_x", "hit_position_y", "hit_position_z", "target"],
+    "eye_frame": ["pupil_diameter_left", "pupil_diameter_right", "hit_position_x", "hit_position_z", "target"],
+}
+FRAME_BASE_COLUMNS = ["timestamp", "user_id", "group_id", "session_id", "event_type", "event_name"]
+EVENTS_TABLE = "events"
+
+# Identificadores y nombres de evento: pocos valores distintos repetidos en millones de filas.
+# Se emiten como pandas.Categorical (códigos enteros) para que filtros y groupby comparen enteros.
+CATEGORICAL_COLUMNS = ["user_id", "group_id", "session_id", "event_type", "event_name"]
+
+# Índices compuestos que necesitan las consultas del análisis (ver LogParser.ensure_indexes).
+# Claves de la colección de logs: session_id (raíz o en event_context) + _id para el filtro por
+# sesiones, la lectura particionada y session_stats; event_type/event_name para config y
+# session_start; user_id + timestamp para las consultas por participante.
+LOG_INDEXES = [
+    [("session_id", 1), ("_id", 1)],
+    [("event_context.session_id", 1), ("_id", 1)],
+    [("event_type", 1), ("timestamp", -1)],
+    [("event_type", 1), ("event_context.session.session_name", 1)],
+    [("event_name", 1), ("event_context.session_name", 1)],
+    [("user_id", 1), ("timestamp", 1)],
+]
+AUX_INDEXES = {
+    "questionnaires": [[("user_id", 1)]],
+    "participants": [[("participant_id", 1)], [("created_at", -1)]],
+}
+
 
 class LogParser:
-    def __init__(self, mongo_uri=None, db_name=None, collection_name=None):
+    def __init__(self, mongo_uri=None, db_name=None, collection_name=None, dump_dir=None):
+        """
+        :param dump_dir: carpeta con un volcado .bson (mongodump) o .jsonl (mongoexport).
+                         Si se indica (o existe LOG_DUMP_DIR) se trabaja sin MongoDB.
+        """
         # Prioridad: Argumento > Variable de Entorno > Default Hardcoded
         self.mongo_uri = mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017")
         self.db_name = db_name or os.getenv("DB_NAME", "test")
         self.collection_name = collection_name or os.getenv("COLLECTION_NAME", "tfg")
+        self.dump_dir = dump_dir or os.getenv("LOG_DUMP_DIR")
 
-        self.client = MongoClient(self.mongo_uri)
+        if self.dump_dir:
+            self.client = FileClient(self.dump_dir)
+        else:
+            self.client = MongoClient(self.mongo_uri)
         self.collection = self.client[self.db_name][self.collection_name]
 
     def fetch_logs(self, query=None, limit=0):
@@ -25,61 +75,427 @@ class LogParser:
         cursor = self.collection.find(query or {}).limit(limit)
         return list(cursor)
 
-    def parse_logs(self, logs, expand_context=False):
+    def fetch_latest_config(self):
+        """
+        Devuelve el documento 'config' más reciente (o None) sin descargar el resto de logs.
+        """
+        cursor = self.collection.find({"event_type": "config"}, self._projection(LOG_FIELDS))
+        docs = list(cursor.sort("timestamp", -1).limit(1))
+        return docs[0] if docs else None
+
+    def find_session_ids(self, session_name):
+        """
+        Resuelve en Mongo los session_id cuyos eventos 'config' / 'session_start' tienen este session_name.
+        """
+        projection = {"_id": 0, "session_id": 1, "event_context.session_id": 1}
+
+        session_ids = set()
+        for doc in self.collection.find(self.session_name_query(session_name), projection):
+            sid = doc.get("session_id") or (doc.get("event_context") or {}).get("session_id")
+            if sid:
+                session_ids.add(sid)
+        return session_ids
+
+    @staticmethod
+    def session_name_query(session_name):
+        """
+        Filtro Mongo de los eventos 'config' / 'session_start' de un session_name.
+        Un $or plano (las cuatro combinaciones de tipo de evento y campo del nombre) para que cada
+        rama empiece por event_type / event_name y la sirva un índice de LOG_INDEXES.
+        """
+        return {"$or": [
+            {"event_type": "config", "event_context.session.session_name": session_name},
+            {"event_type": "config", "event_context.session_name": session_name},
+            {"event_name": "session_start", "event_context.session_name": session_name},
+            {"event_name": "session_start", "event_context.session.session_name": session_name},
+        ]}
+
+    def session_stats(self, session_ids=None):
+        """
+        Resumen por sesión calculado en el servidor: {session_id: {"count": n, "max_id": _id máximo}}.
+        Sirve para detectar sesiones nuevas, borradas o reescritas sin descargar sus eventos.
+        """
+        pipeline = [
+            {"$match": self.session_query(session_ids) if session_ids else {}},
+            {"$group": {
+                "_id": {"$ifNull": ["$session_id", "$event_context.session_id"]},
+                "count": {"$sum": 1},
+                "max_id": {"$max": "$_id"},
+            }},
+        ]
+        return {row["_id"]: {"count": row["count"], "max_id": row["max_id"]}
+                for row in self.collection.aggregate(pipeline)}
+
+    @staticmethod
+    def session_query(session_ids):
+        """Filtro Mongo para traer solo los eventos de las sesiones indicadas."""
+        session_ids = sorted(session_ids)
+        return {"$or": [{"session_id": {"$in": session_ids}},
+                        {"event_context.session_id": {"$in": session_ids}}]}
+
+    @staticmethod
+    def _projection(fields):
+        if fields is None or isinstance(fields, dict):
+            return fields
+        projection = {field: 1 for field in fields}
+        projection.setdefault("_id", 0)
+        return projection
+
+    def iter_logs(self, query=None, batch_size=5000, projection=LOG_FIELDS, limit=0, sort=None):
+        """
+        Lee logs desde MongoDB por lotes (generador) sin materializar toda la colección.
+        :param batch_size: número de documentos por lote (también se usa como batch del cursor)
+        :param projection: campos a traer de Mongo (None = documento completo)
+        :param sort: orden opcional del cursor, p.ej. [("_id", 1)]
+        """
+        cursor = self.collection.find(query or {}, self._projection(projection))
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = cursor.batch_size(batch_size).limit(limit)
+
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # ------------------------------------------------------------------
+    # Lectura particionada en paralelo
+    # ------------------------------------------------------------------
+    def partition_queries(self, query=None, partitions=4, session_ids=None):
+        """
+        Divide una consulta en particiones disjuntas.
+        :param session_ids: si se indican, se reparten en bloques contiguos de sesiones;
+                            si no, la colección se corta en rangos de _id de tamaño similar.
+        """
+        base = query or {}
+        if session_ids:
+            ids = sorted(session_ids)
+            size = -(-len(ids) // max(1, partitions))
+            chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+            return [self._and(base, self.session_query(chunk)) for chunk in chunks]
+
+        total = self.collection.count_documents(base)
+        if partitions <= 1 or total < partitions:
+            return [base]
+
+        # Cortes por cuantiles de _id (usa el índice por defecto de _id)
+        step = total // partitions
+        bounds = []
+        for k in range(1, partitions):
+            cursor = self.collection.find(base, {"_id": 1}).sort("_id", 1).skip(k * step).limit(1)
+            doc = next(iter(cursor), None)
+            if doc is not None and (not bounds or doc["_id"] > bounds[-1]):
+                bounds.append(doc["_id"])
+
+        ranges = [{"_id": {"$lt": bounds[0]}}] if bounds else [{}]
+        ranges += [{"_id": {"$gte": lo, "$lt": hi}} for lo, hi in zip(bounds, bounds[1:])]
+        if bounds:
+            ranges.append({"_id": {"$gte": bounds[-1]}})
+        return [self._and(base, r) for r in ranges]
+
+    @staticmethod
+    def _and(*queries):
+        queries = [q for q in queries if q]
+        if not queries:
+            return {}
+        return queries[0] if len(queries) == 1 else {"$and": queries}
+
+    def parallel_log_tables(self, query=None, workers=4, batch_size=5000, session_ids=None):
+        """
+        Descarga y parsea (parse_log_tables) una consulta repartida en particiones que se leen
+        a la vez con un pool de hilos. El resultado se une en el orden de las particiones
+        (y cada partición se lee ordenada por _id), por lo que es determinista.
+        :param workers: número de hilos / particiones
+        :param session_ids: particionar por listas de session_id en vez de por rangos de _id
+        """
+        start = time.perf_counter()
+        queries = self.partition_queries(query, partitions=workers, session_ids=session_ids)
+
+        def fetch_partition(partition_query):
+            batches = self.iter_logs(query=partition_query, batch_size=batch_size, sort=[("_id", 1)])
+            return self.parse_log_table_batches(batches)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(fetch_partition, queries))
+        tables = self.merge_tables(results)
+
+        elapsed = time.perf_counter() - start
+        n_docs = sum(len(t) for t in tables.values())
+        self.last_fetch_stats = {"docs": n_docs, "seconds": elapsed, "workers": workers,
+                                 "partitions": len(queries),
+                                 "docs_per_sec": n_docs / elapsed if elapsed > 0 else float("nan")}
+        print(f"[LogParser] ⚡ {n_docs} documentos en {elapsed:.2f}s "
+              f"({self.last_fetch_stats['docs_per_sec']:,.0f} docs/s, {workers} hilos, {len(queries)} particiones)")
+        return tables
+
+    def parse_logs(self, logs, expand_context=False, session_index=None):
         """
         Convierte los logs JSON en un DataFrame con campos relevantes.
+        Construcción columnar: se recogen los campos en listas y timestamps, event_value
+        y Vector3 del contexto se convierten por columnas completas (no fila a fila).
         :param expand_context: si True, expande los campos de 'event_context' en columnas.
+        :param session_index: SessionIndex opcional que se rellena en la misma pasada con
+                              los eventos config/session_start (búsquedas por session_name).
+        """
+        df, contexts = self._build_base_columns(logs, session_index)
+
+        if not expand_context:
+            # Guardar contexto como JSON string (útil para exportación o debugging)
+            df["context"] = [json.dumps(self._flatten_context(ctx)) for ctx in contexts]
+            return self._order_columns(df)
+
+        return self._order_columns(self._categorize(self._join_context(df, contexts)))
+
+    def parse_log_tables(self, logs, session_index=None):
+        """
+        Parsea los logs repartiendo la telemetría de alta frecuencia en tablas densas.
+        Devuelve un dict {event_name: DataFrame} con una tabla por cada evento de
+        FRAME_TABLE_SCHEMAS (columnas numéricas en float32) y la tabla "events" con
+        el resto de eventos discretos (contexto expandido solo con sus propias claves).
         """
-        parsed = []
+        df, contexts = self._build_base_columns(logs, session_index)
+        names = df["event_name"].to_numpy()
+
+        tables = {}
+        is_frame = pd.Series(False, index=df.index)
+        for event_name, columns in FRAME_TABLE_SCHEMAS.items():
+            mask = names == event_name
+            is_frame |= mask
+            positions = mask.nonzero()[0]
+            frames = self._join_context(df.iloc[positions].reset_index(drop=True),
+                                        [contexts[i] for i in positions])
+            tables[event_name] = self._categorize(self._dense_frame_table(frames, columns))
+
+        positions = (~is_frame).to_numpy().nonzero()[0]
+        events = self._join_context(df.iloc[positions].reset_index(drop=True), [contexts[i] for i in positions])
+        tables[EVENTS_TABLE] = self._order_columns(self._categorize(events))
+        return tables
+
+    def _build_base_columns(self, logs, session_index=None):
+        """Recoge los campos base en listas y los convierte por columnas. Devuelve (df, contextos)."""
+        timestamps, user_ids, group_ids, session_ids = [], [], [], []
+        event_types, event_names, event_values, contexts = [], [], [], []
+
         for log in logs:
+            raw_context = log.get("event_context")
+            if not isinstance(raw_context, dict):
+                raw_context = {}
+
             # Intentar leer session_id y group_id tanto desde nivel raíz como desde event_context
-            session_id = log.get("session_id") or log.get("event_context", {}).get("session_id")
-            group_id = log.get("group_id") or log.get("event_context", {}).get("group_id")
-
-            base = {
-                "timestamp": pd.to_datetime(log.get("timestamp")),
-                "user_id": log.get("user_id", "UNKNOWN"),
-                "group_id": group_id,
-                "session_id": session_id,
-                "event_type": log.get("event_type", "undefined"),
-                "event_name": log.get("event_name", "undefined"),
-                "event_value": log.get("event_value", None),
-            }
+            session_id = log.get("session_id") or raw_context.get("session_id")
+            event_type = log.get("event_type", "undefined")
+            event_name = log.get("event_name", "undefined")
 
-            # Intentar convertir event_value a número si es posible
-            try:
-                base["event_value"] = float(base["event_value"])
-            except (ValueError, TypeError):
-                pass  # dejarlo como está si no es convertible
-
-            # Contexto dinámico
-            context = {}
-            if "event_context" in log and isinstance(log["event_context"], dict):
-                raw_context = log["event_context"]
-                for k, v in raw_context.items():
-                    if k in ["session_id", "group_id"]:
-                        continue
-                    
-                    # Flatten Vector3-like dicts (x, y, z)
-                    if isinstance(v, dict) and all(key in v for key in ["x", "y", "z"]):
-                        context[f"{k}_x"] = v["x"]
-                        context[f"{k}_y"] = v["y"]
-                        context[f"{k}_z"] = v["z"]
-                        # Also keep original for reference if needed? No, flat is better for dataframe
-                    else:
-                        context[k] = v
-
-            if expand_context:
-                # Expandir el contexto en columnas separadas
-                row = {**base, **context}
+            timestamps.append(log.get("timestamp"))
+            user_ids.append(log.get("user_id", "UNKNOWN"))
+            group_ids.append(log.get("group_id") or raw_context.get("group_id"))
+            session_ids.append(session_id)
+            event_types.append(event_type)
+            event_names.append(event_name)
+            event_values.append(log.get("event_value", None))
+            contexts.append(raw_context)
+
+            if session_index is not None and session_index.wants(event_type, event_name):
+                session_index.add(session_id, event_type, event_name, log.get("timestamp"), raw_context,
+                                  group_ids[-1])
+
+        df = pd.DataFrame({
+            "timestamp": self._to_datetime_column(timestamps),
+            "user_id": pd.Categorical(user_ids),
+            "group_id": pd.Categorical(group_ids),
+            "session_id": pd.Categorical(session_ids),
+            "event_type": pd.Categorical(event_types),
+            "event_name": pd.Categorical(event_names),
+            "event_value": self._to_numeric_where_possible(event_values),
+        })
+        return df, contexts
+
+    def _join_context(self, df, contexts):
+        # Contexto dinámico: un DataFrame con la unión de claves, expandido por columnas
+        context_df = pd.DataFrame.from_records(contexts, index=df.index)
+        context_df = context_df.drop(columns=["session_id", "group_id"], errors="ignore")
+        context_df = self._expand_vector3_columns(context_df)
+
+        # Las claves del contexto tienen prioridad sobre los campos base (como en {**base, **context})
+        overlap = [c for c in context_df.columns if c in df.columns]
+        for col in overlap:
+            df[col] = context_df[col].where(context_df[col].notna(), df[col])
+        context_df = context_df.drop(columns=overlap)
+
+        return pd.concat([df, context_df], axis=1)
+
+    @staticmethod
+    def _dense_frame_table(frames, columns):
+        """Selecciona las columnas del esquema (float32 salvo 'target') sobre las columnas base."""
+        # Algunos logs antiguos usan hit_point en lugar de hit_position
+        frames = frames.rename(columns={
+            c: c.replace("hit_point_", "hit_position_") for c in frames.columns
+            if c.startswith("hit_point_") and c.replace("hit_point_", "hit_position_") not in frames.columns
+        })
+        table = frames[[c for c in FRAME_BASE_COLUMNS if c in frames.columns]].copy()
+        for col in columns:
+            if col == "target":
+                table[col] = frames[col] if col in frames.columns else pd.Series(None, index=frames.index, dtype=object)
+            else:
+                values = frames[col] if col in frames.columns else pd.Series(float("nan"), index=frames.index)
+                table[col] = pd.to_numeric(values, errors="coerce").astype("float32")
+        return table
+
+    # ------------------------------------------------------------------
+    # Conversión por columnas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _to_datetime_column(values):
+        """
+        Columna de timestamps con el mismo resultado que pd.to_datetime valor a valor.
+        Un valor que no es una fecha lanza ValueError (nunca se convierte en NaT en silencio).
+        """
+        values = pd.Series(values, dtype=object)
+        try:
+            return pd.to_datetime(values)
+        except (ValueError, TypeError):
+            pass
+        try:
+            # Textos con varios formatos (volcados JSONL, ISO con y sin 'T'...): formato por valor
+            return pd.to_datetime(values, format="mixed")
+        except (ValueError, TypeError):
+            # Mezcla de timestamps con/sin zona horaria → normalizar a UTC
+            return pd.to_datetime(values, format="mixed", utc=True)
+
+    @staticmethod
+    def _to_numeric_where_possible(values):
+        """Equivalente por columnas de 'try: float(v)': convierte lo numérico y deja el resto como está."""
+        raw = pd.Series(values, dtype=object)
+        try:
+            numeric = pd.to_numeric(raw, errors="coerce")
+        except TypeError:
+            numeric = pd.Series([LogParser._try_float(v) for v in values], dtype=float)
+
+        convertible = numeric.notna()
+        if convertible.all() or not (raw.notna() & ~convertible).any():
+            return numeric.astype(float)
+        return raw.where(~convertible, numeric.astype(object)).infer_objects()
+
+    @staticmethod
+    def _try_float(value):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return float("nan")
+
+    @staticmethod
+    def _is_vector3(value):
+        return isinstance(value, dict) and "x" in value and "y" in value and "z" in value
+
+    @classmethod
+    def _flatten_context(cls, raw_context):
+        # Flatten Vector3-like dicts (x, y, z)
+        context = {}
+        for k, v in raw_context.items():
+            if k in ["session_id", "group_id"]:
+                continue
+            if cls._is_vector3(v):
+                context[f"{k}_x"] = v["x"]
+                context[f"{k}_y"] = v["y"]
+                context[f"{k}_z"] = v["z"]
+            else:
+                context[k] = v
+        return context
+
+    @classmethod
+    def _expand_vector3_columns(cls, context_df):
+        """Sustituye cada columna con Vector3 (dicts x/y/z) por sus columnas _x/_y/_z."""
+        columns = {}
+        for col in context_df.columns:
+            values = context_df[col]
+            if values.dtype != object:
+                columns[col] = values
+                continue
+
+            is_vec = values.map(cls._is_vector3).astype(bool)
+            if not is_vec.any():
+                columns[col] = values
+                continue
+
+            vectors = pd.DataFrame.from_records(values[is_vec].tolist(), index=values.index[is_vec],
+                                                columns=["x", "y", "z"])
+            rest = values.where(~is_vec)
+            if rest.notna().any():
+                columns[col] = rest
+            for axis in ("x", "y", "z"):
+                columns[f"{col}_{axis}"] = vectors[axis].reindex(values.index)
+
+        return pd.DataFrame(columns, index=context_df.index)
+
+    def parse_log_batches(self, batches, expand_context=False, session_index=None):
+        """
+        Parsea lote a lote un iterable de listas de logs (p.ej. el generador de iter_logs).
+        Solo un lote de documentos está vivo en memoria a la vez.
+        """
+        return self.concat_parsed(
+            self.parse_logs(batch, expand_context=expand_context, session_index=session_index)
+            for batch in batches
+        )
+
+    def parse_log_table_batches(self, batches, session_index=None):
+        """Versión por lotes de parse_log_tables (concatena tabla a tabla)."""
+        return self.merge_tables(self.parse_log_tables(batch, session_index=session_index) for batch in batches)
+
+    @classmethod
+    def merge_tables(cls, table_dicts):
+        """Concatena, tabla a tabla, varios resultados de parse_log_tables."""
+        parts = {}
+        for table_dict in table_dicts:
+            for name, table in table_dict.items():
+                parts.setdefault(name, []).append(table)
+
+        tables = {}
+        for name in list(FRAME_TABLE_SCHEMAS) + [EVENTS_TABLE]:
+            frames = [t for t in parts.get(name, []) if not t.empty]
+            if name == EVENTS_TABLE:
+                tables[name] = cls.concat_parsed(frames)
+            elif frames:
+                tables[name] = cls._categorize(pd.concat(frames, ignore_index=True))
             else:
-                # Guardar contexto como JSON string (útil para exportación o debugging)
-                row = {**base, "context": json.dumps(context)}
+                tables[name] = cls._dense_frame_table(pd.DataFrame(columns=FRAME_BASE_COLUMNS),
+                                                      FRAME_TABLE_SCHEMAS[name])
+        return tables
 
-            parsed.append(row)
+    @staticmethod
+    def select_sessions(tables, session_ids):
+        """Filtra todas las tablas de parse_log_tables a un conjunto de session_id."""
+        return {name: t[t["session_id"].isin(session_ids)] if "session_id" in t.columns else t
+                for name, t in tables.items()}
 
-        df = pd.DataFrame(parsed)
+    @classmethod
+    def concat_parsed(cls, frames):
+        """Une los DataFrames parseados por lotes manteniendo el orden de columnas."""
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return cls._order_columns(cls._categorize(pd.concat(frames, ignore_index=True)))
+
+    @staticmethod
+    def _categorize(df):
+        """
+        Deja CATEGORICAL_COLUMNS como categóricas con solo las categorías presentes (ordenadas).
+        pd.concat de lotes con categorías distintas devuelve object: aquí se vuelven a codificar.
+        """
+        for col in CATEGORICAL_COLUMNS:
+            if col not in df.columns:
+                continue
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
+            else:
+                df[col] = df[col].astype("category")
+        return df
 
+    @staticmethod
+    def _order_columns(df):
         # Asegurar orden de columnas más útil (pero manteniendo las demás)
         priority_cols = [
             "timestamp", "user_id", "group_id", "session_id",
@@ -91,9 +507,100 @@ class LogParser:
         other_cols = [c for c in df.columns if c not in priority_cols]
 
         # Combine
-        df = df[existing_priority + other_cols]
+        return df[existing_priority + other_cols]
 
-        return df
+    # ------------------------------------------------------------------
+    # Mantenimiento: índices y plan de las consultas del pipeline
+    # ------------------------------------------------------------------
+    def ensure_indexes(self):
+        """
+        Crea (si no existen) los índices de LOG_INDEXES y AUX_INDEXES.
+        create_index es idempotente, así que se puede lanzar en cada despliegue.
+        :return: {colección: [nombres de índice]}
+        """
+        db = self.client[self.db_name]
+        targets = [(self.collection, LOG_INDEXES)]
+        targets += [(db[name], indexes) for name, indexes in AUX_INDEXES.items()]
+
+        created = {}
+        for collection, indexes in targets:
+            created[collection.name] = [collection.create_index(keys) for keys in indexes]
+            print(f"[LogParser] 🗂️ {collection.name}: {', '.join(created[collection.name])}")
+        return created
+
+    def pipeline_queries(self, session_name="<session_name>", session_ids=("<session_id>",)):
+        """
+        Consultas que lanza el pipeline (vr_analysis / configurador), como cursores sin ejecutar.
+        :return: lista de (descripción, cursor)
+        """
+        db = self.client[self.db_name]
+        return [
+            ("config más reciente",
+             self.collection.find({"event_type": "config"}, self._projection(LOG_FIELDS)).sort("timestamp", -1).limit(1)),
+            ("session_id por session_name",
+             self.collection.find(self.session_name_query(session_name),
+                                  {"_id": 0, "session_id": 1, "event_context.session_id": 1})),
+            ("logs de las sesiones filtradas",
+             self.collection.find(self.session_query(session_ids), self._projection(LOG_FIELDS)).sort("_id", 1)),
+            ("logs de un participante",
+             self.collection.find({"user_id": "<user_id>"}, self._projection(LOG_FIELDS)).sort("timestamp", 1)),
+            ("cuestionario de un participante",
+             db["questionnaires"].find({"user_id": "<user_id>"})),
+            ("participantes (configurador)",
+             db["participants"].find({}, {"participant_id": 1}).sort("created_at", -1)),
+        ]
+
+    def index_report(self, **kwargs):
+        """
+        Imprime, a partir de explain(), si cada consulta del pipeline usa índice (IXSCAN),
+        si está cubierta por él (sin FETCH) o si recorre la colección (COLLSCAN).
+        :return: lista de dicts {query, stages, indexed, covered}
+        """
+        report = []
+        for description, cursor in self.pipeline_queries(**kwargs):
+            try:
+                plan = cursor.explain()["queryPlanner"]["winningPlan"]
+            except (AttributeError, KeyError, NotImplementedError) as e:
+                print(f"[LogParser] ⚠️ {description}: explain() no disponible ({e})")
+                continue
+            stages = self._plan_stages(plan.get("queryPlan", plan))
+            row = {
+                "query": description,
+                "stages": stages,
+                "indexed": "COLLSCAN" not in stages and any("IXSCAN" in st for st in stages),
+            }
+            # Cubierta = resuelta solo con el índice (un plan EOF o IDHACK no lo es)
+            row["covered"] = row["indexed"] and "FETCH" not in stages
+            report.append(row)
+            status = "✅ cubierta" if row["covered"] else ("✅ índice" if row["indexed"] else "❌ COLLSCAN")
+            print(f"[LogParser] {status:<12} {description}: {' > '.join(stages)}")
+        return report
+
+    @classmethod
+    def _plan_stages(cls, plan):
+        stages = [plan.get("stage", "?")]
+        children = plan.get("inputStages", [])
+        if "inputStage" in plan:
+            children = [plan["inputStage"]] + children
+        for child in children:
+            stages += cls._plan_stages(child)
+        return stages
 
     def close(self):
         self.client.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos de logs")
+    arg_parser.add_argument("--ensure-indexes", action="store_true", help="Crear los índices del análisis")
+    arg_parser.add_argument("--explain", action="store_true", help="Informe explain() de las consultas del pipeline")
+    args = arg_parser.parse_args()
+
+    log_parser = LogParser()
+    if args.ensure_indexes:
+        log_parser.ensure_indexes()
+    if args.explain:
+        log_parser.index_report()
+    log_parser.close()
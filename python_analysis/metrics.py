@@ -1,37 +1,149 @@
+from collections import Counter
+from contextlib import contextmanager
+
 import pandas as pd
 import numpy as np
 
+from python_analysis.grouped_metrics import GroupedMetricsEngine, LEARNING_BLOCK_SIZE, SESSION_KEYS, block_accuracies
+from python_analysis.iv_statistics import variable_statistics
+from python_analysis.scenario_assets import SCENARIO_ASSETS
+from python_analysis.session_index import SessionIndex
+
+CATEGORIES = ["efectividad", "eficiencia", "satisfaccion", "presencia"]
+CORE_ROLES = ["action_success", "action_fail", "task_start", "task_end", "task_restart", "navigation_error",
+              "session_start", "session_end"]
+# Parámetros de una métrica que solo intervienen en la puntuación (no en el valor bruto)
+SCORING_PARAMS = ("weight", "min", "max", "invert")
+# Columnas del df y de las tablas de telemetría que leen las métricas (incluida la resolución de
+# independent_variable y map_name sin SessionIndex). compute_grouped_metrics(workers=N) solo
+# envía estas a los procesos hijo: una métrica que lea otra columna tiene que añadirla aquí.
+SOURCE_COLUMNS = ["user_id", "group_id", "session_id", "timestamp", "event_type", "event_name", "event_value",
+                  "event_role", "audio_enabled", "duration_ms", "reaction_time_ms",
+                  "position_x", "position_z", "hit_position_x", "hit_position_z", "hit_point_x", "hit_point_z",
+                  "independent_variable", "session", "map_name", "context", "event_context"]
+
+
+def _fill_key(values, default):
+    """fillna para columnas de claves que pueden venir como categóricas (LogParser)."""
+    if not values.isna().any():
+        return values  # sin nulos: la misma columna, sin copia
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if default not in categories:
+            categories = categories.append(pd.Index([default]))
+            try:
+                # Mantener el orden lexicográfico (mismo orden de groupby que con strings)
+                categories = categories.sort_values()
+            except TypeError:
+                pass
+            values = values.cat.set_categories(categories)
+    return values.fillna(default)
+
+
+def _to_utc(values):
+    """
+    Timestamps en UTC como pd.to_datetime(utc=True, errors="coerce"), sin reconvertir las
+    columnas que ya son datetime (LogParser): las que tienen zona solo se pasan a UTC y las
+    que no, se marcan como UTC (mismo instante que to_datetime).
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values if str(values.dt.tz) == "UTC" else values.dt.tz_convert("UTC")
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.dt.tz_localize("UTC")
+    return pd.to_datetime(values, utc=True, errors="coerce")
+
 
 class MetricsCalculator:
-    def __init__(self, df: pd.DataFrame, experiment_config=None, user_profile="novice"):
+    # Intermedios compartidos entre métricas: nombre -> método que lo calcula sobre un df
+    INTERMEDIATES = {
+        "role_counts": "_role_counts",
+        "name_counts": "_name_counts",
+        "all_timestamps": "_all_timestamps_uncached",
+        "task_stats": "_task_stats",
+        "learning_curve": "_learning_curve",
+        "scenario_id": "_scenario_id",
+        "path_efficiency": "_path_efficiency",
+    }
+
+    # Grafo de dependencias: intermedios que usa cada métrica y cada intermedio
+    METRIC_DEPENDENCIES = {
+        "hit_ratio": ["role_counts"],
+        "precision": ["role_counts"],
+        "learning_curve_mean": ["learning_curve", "path_efficiency"],
+        "avg_reaction_time_ms": ["task_stats"],
+        "avg_task_duration_ms": ["task_stats"],
+        "time_per_success_s": ["role_counts", "all_timestamps"],
+        "retries_after_end": ["role_counts"],
+        "voluntary_play_time_s": ["all_timestamps"],
+        "aid_usage": ["role_counts"],
+        "inactivity_time_s": ["all_timestamps"],
+        "activity_level_per_min": ["all_timestamps"],
+        "navigation_errors": ["role_counts", "path_efficiency"],
+        "aim_errors": ["role_counts"],
+        "task_duration_success": ["task_stats"],
+        "task_duration_fail": ["task_stats"],
+        "interface_errors": ["name_counts"],
+        "learning_stability": ["learning_curve", "path_efficiency"],
+        "error_reduction_rate": ["learning_curve", "path_efficiency"],
+        "path_efficiency": ["path_efficiency"],
+        "gaze_on_path_ratio": ["scenario_id"],
+    }
+    INTERMEDIATE_DEPENDENCIES = {
+        "path_efficiency": ["scenario_id"],
+    }
+
+    def __init__(self, df: pd.DataFrame, experiment_config=None, user_profile="novice", frame_tables=None,
+                 session_index=None):
         """
         Calculadora avanzada de métricas basada 100% en experiment_config.
+        :param frame_tables: dict opcional {event_name: DataFrame} con la telemetría de alta
+                             frecuencia separada (LogParser.parse_log_tables). Si se pasa, df
+                             puede contener solo los eventos discretos.
+        :param session_index: SessionIndex opcional (rellenado al parsear); si se pasa, la
+                              independent_variable de cada sesión sale de sus metadatos
         """
 
-        self.df = df.copy()
+        # Copia superficial: con copy-on-write las columnas se comparten con df hasta que se
+        # modifican, y las que se reasignan abajo no afectan al DataFrame del llamador
+        self.df = df.copy(deep=False)
         self.config = experiment_config or {}
         self.user_profile = user_profile
+        self.session_index = session_index
+
+        # Tablas densas de telemetría (movement_frame, gaze_frame, eye_frame...)
+        self.frame_tables = {}
+        for name, table in (frame_tables or {}).items():
+            if name == "events" or table is None or table.empty:
+                continue
+            table = table.copy(deep=False)
+            if "timestamp" in table.columns:
+                table["timestamp"] = _to_utc(table["timestamp"])
+            for col, default in (("user_id", "UNKNOWN"), ("group_id", "GROUP"), ("session_id", "SESSION")):
+                table[col] = _fill_key(table[col], default) if col in table.columns else default
+            # Igual que en el df mixto: una columna solo "existe" si algún evento la trae
+            self.frame_tables[name] = table.dropna(axis=1, how="all")
+        self._init_state()
 
         # ------------------------------------------------------------------
         # Normalización de timestamp
         # ------------------------------------------------------------------
         if "timestamp" in self.df.columns:
-            self.df["timestamp"] = pd.to_datetime(self.df["timestamp"], utc=True, errors="coerce")
+            self.df["timestamp"] = _to_utc(self.df["timestamp"])
 
         if "user_id" not in self.df.columns:
             self.df["user_id"] = "UNKNOWN"
         else:
-            self.df["user_id"] = self.df["user_id"].fillna("UNKNOWN")
+            self.df["user_id"] = _fill_key(self.df["user_id"], "UNKNOWN")
 
         if "group_id" not in self.df.columns:
             self.df["group_id"] = "GROUP"
         else:
-            self.df["group_id"] = self.df["group_id"].fillna("GROUP")
+            self.df["group_id"] = _fill_key(self.df["group_id"], "GROUP")
 
         if "session_id" not in self.df.columns:
             self.df["session_id"] = "SESSION"
         else:
-            self.df["session_id"] = self.df["session_id"].fillna("SESSION")
+            self.df["session_id"] = _fill_key(self.df["session_id"], "SESSION")
 
         # ------------------------------------------------------------------
         # Asignación de roles desde config (corregido)
@@ -39,13 +151,19 @@ class MetricsCalculator:
         roles_cfg = self.config.get("event_roles", {})
 
         def resolve_role(ev):
-            core_roles = ["action_success", "action_fail", "task_start", "task_end", "task_restart", "navigation_error",
-                          "session_start", "session_end"]
-            if ev in core_roles:
+            if ev in CORE_ROLES:
                 return ev
             return roles_cfg.get(ev, "custom_event")
 
-        self.df["event_role"] = self.df["event_name"].apply(resolve_role)
+        # El rol se resuelve una vez por categoría de event_name y se asigna por código
+        names = self.df["event_name"]
+        if not isinstance(names.dtype, pd.CategoricalDtype):
+            names = names.astype("category")
+        category_roles = [resolve_role(ev) for ev in names.cat.categories]
+        roles = pd.Index(list(dict.fromkeys(category_roles + [resolve_role(np.nan)])))
+        # Último hueco de la tabla: eventos sin event_name (código -1)
+        lookup = np.append(roles.get_indexer(category_roles), roles.get_loc(resolve_role(np.nan)))
+        self.df["event_role"] = pd.Categorical.from_codes(lookup[names.cat.codes.to_numpy()], categories=roles)
 
         # ------------------------------------------------------------------
         # Registro de métricas y perfiles desde config
@@ -53,6 +171,137 @@ class MetricsCalculator:
         self.metrics_cfg = self.config.get("metrics", {})
         self.profiles_cfg = self.config.get("profiles", {})
 
+    def _init_state(self):
+        self._frame_tables_by_session = {}
+
+        # Memoización de intermedios por partición (ver memoized)
+        self._memo = {}
+        self._memo_depth = 0
+        self._memo_shared = None
+        self.memo_stats = {"computed": Counter(), "reused": Counter()}
+
+    @classmethod
+    def from_prepared(cls, df, frame_tables, experiment_config=None, user_profile="novice", session_index=None):
+        """
+        Calculadora sobre datos ya normalizados por otra instancia (su df con event_role y sus
+        frame_tables), sin copiar ni volver a normalizar. La usan los procesos de
+        compute_grouped_metrics(workers=N) con su parte de las sesiones.
+        """
+        calc = cls.__new__(cls)
+        calc.df = df
+        calc.config = experiment_config or {}
+        calc.user_profile = user_profile
+        calc.session_index = session_index
+        calc.frame_tables = frame_tables
+        calc._init_state()
+        calc.metrics_cfg = calc.config.get("metrics", {})
+        calc.profiles_cfg = calc.config.get("profiles", {})
+        return calc
+
+    # ----------------------------------------------------------------------
+    # Acceso a telemetría (tabla densa si existe, si no filtrado del df mixto)
+    # ----------------------------------------------------------------------
+    def _frames(self, df, event_name):
+        table = self.frame_tables.get(event_name)
+        if table is None:
+            return df[df["event_name"] == event_name]
+        if df is self.df:
+            return table
+
+        # Mismas claves que compute_grouped_metrics: (user_id, group_id, session_id)
+        keys = df[SESSION_KEYS].drop_duplicates()
+        if len(keys) == 1:
+            if event_name not in self._frame_tables_by_session:
+                self._frame_tables_by_session[event_name] = dict(tuple(table.groupby(SESSION_KEYS, sort=False, observed=True)))
+            return self._frame_tables_by_session[event_name].get(tuple(keys.iloc[0]), table.iloc[0:0])
+        wanted = pd.MultiIndex.from_frame(keys)
+        return table[pd.MultiIndex.from_frame(table[SESSION_KEYS]).isin(wanted)]
+
+    def _all_timestamps(self, df):
+        """Timestamps de todos los eventos de df, incluida la telemetría separada en tablas."""
+        return self._cached(df, "all_timestamps")
+
+    def _all_timestamps_uncached(self, df):
+        if not self.frame_tables:
+            return df["timestamp"]
+        parts = [df["timestamp"]] + [self._frames(df, name)["timestamp"] for name in self.frame_tables]
+        return pd.concat([p for p in parts if len(p) > 0] or [df["timestamp"]], ignore_index=True)
+
+    # ----------------------------------------------------------------------
+    # Memoización de intermedios por partición (df) y grafo de dependencias
+    # ----------------------------------------------------------------------
+    @contextmanager
+    def memoized(self, metric_names=None):
+        """
+        Ámbito en el que cada intermedio se calcula una sola vez por partición (sub-DataFrame).
+        Fuera de él cada llamada recalcula, porque el df podría cambiar entre llamadas.
+        :param metric_names: métricas que se van a calcular; con ellas y METRIC_DEPENDENCIES solo
+                             se guardan los intermedios que comparten al menos dos (None = todos)
+        """
+        if self._memo_depth == 0:
+            self._memo_shared = self._shared_intermediates(metric_names) if metric_names is not None else None
+        self._memo_depth += 1
+        try:
+            yield self
+        finally:
+            self._memo_depth -= 1
+            if self._memo_depth == 0:
+                self._memo.clear()
+                self._memo_shared = None
+
+    def metric_dependencies(self, metric_name):
+        """Intermedios que necesita una métrica, incluidos los de sus intermedios, en orden de cálculo."""
+        ordered = []
+
+        def visit(name):
+            for dep in self.INTERMEDIATE_DEPENDENCIES.get(name, []):
+                visit(dep)
+            if name not in ordered:
+                ordered.append(name)
+
+        for dep in self.METRIC_DEPENDENCIES.get(metric_name, []):
+            visit(dep)
+        return ordered
+
+    def _shared_intermediates(self, metric_names):
+        uses = Counter(dep for name in metric_names for dep in self.metric_dependencies(name))
+        return {name for name, n in uses.items() if n > 1}
+
+    def _enabled_metrics(self, categories):
+        return [name for cat in categories for name, params in self.metrics_cfg.get(cat, {}).items()
+                if params.get("enabled", True)]
+
+    def _cached(self, df, name, *args):
+        """Intermedio `name` de df: se reutiliza dentro de un ámbito memoized()."""
+        compute = getattr(self, self.INTERMEDIATES[name])
+        if self._memo_depth == 0 or (self._memo_shared is not None and name not in self._memo_shared):
+            return compute(df, *args)
+
+        # Clave por identidad del df (se guarda la referencia para que el id no se reutilice)
+        entry = self._memo.setdefault(id(df), (df, {}))[1]
+        key = (name,) + args
+        if key in entry:
+            self.memo_stats["reused"][name] += 1
+            return entry[key]
+        self.memo_stats["computed"][name] += 1
+        entry[key] = value = compute(df, *args)
+        return value
+
+    def memo_report(self):
+        """Resumen de los contadores: intermedios calculados y recálculos evitados."""
+        computed, reused = self.memo_stats["computed"], self.memo_stats["reused"]
+        if not computed:
+            return "[Metrics] ♻️ Sin intermedios memoizados."
+        detail = ", ".join(f"{name} {computed[name]}/{reused[name]}" for name in sorted(computed))
+        return (f"[Metrics] ♻️ Intermedios calculados/reutilizados: {detail} "
+                f"({sum(reused.values())} recálculos evitados)")
+
+    def _role_counts(self, df):
+        return df["event_role"].value_counts().to_dict()
+
+    def _name_counts(self, df):
+        return df["event_name"].value_counts().to_dict()
+
     # ----------------------------------------------------------------------
     # Normalización universal
     # ----------------------------------------------------------------------
@@ -77,17 +326,19 @@ class MetricsCalculator:
     def hit_ratio(self, df=None):
         if df is None: df = self.df
         if df.empty: return 0.0  # Safe default
-        hits = len(df[df["event_role"] == "action_success"])
-        fails = len(df[df["event_role"] == "action_fail"])
+        counts = self._cached(df, "role_counts")
+        hits = counts.get("action_success", 0)
+        fails = counts.get("action_fail", 0)
         tot = hits + fails
         return hits / tot if tot > 0 else 0.0
 
     def precision(self, df=None):
         if df is None: df = self.df
-        actions = df[df["event_role"].isin(["action_success", "action_fail"])]
-        if len(actions) == 0: return np.nan
-        hits = len(actions[actions["event_role"] == "action_success"])
-        return hits / len(actions)
+        counts = self._cached(df, "role_counts")
+        hits = counts.get("action_success", 0)
+        actions = hits + counts.get("action_fail", 0)
+        if actions == 0: return np.nan
+        return hits / actions
 
     def success_rate(self, df=None):
         if df is None: df = self.df
@@ -96,69 +347,91 @@ class MetricsCalculator:
         success = len(tasks[tasks["event_value"].astype(str).str.lower() == "success"])
         return success / len(tasks)
 
-    def learning_curve(self, df=None, block_size=5):
+    def learning_curve(self, df=None, block_size=LEARNING_BLOCK_SIZE):
         if df is None: df = self.df
-        actions = df[df["event_role"].isin(["action_success", "action_fail"])]
-        res = []
-        for i in range(0, len(actions), block_size):
-            block = actions.iloc[i:i + block_size]
-            hits = len(block[block["event_role"] == "action_success"])
-            res.append(hits / len(block) if len(block) > 0 else np.nan)
-        return res
+        return self._cached(df, "learning_curve", block_size)
+
+    def _learning_curve(self, df, block_size):
+        roles = df["event_role"]
+        actions = roles[roles.isin(["action_success", "action_fail"])]
+        success = (actions == "action_success").to_numpy(dtype=bool)
+        return block_accuracies(success, [0, len(success)], [block_size])[block_size][0].tolist()
+
+    def learning_curves(self, block_sizes=(LEARNING_BLOCK_SIZE,)):
+        """
+        Curva de aprendizaje de cada sesión para uno o varios tamaños de bloque en una pasada
+        (p.ej. para gráficas con sesiones largas).
+        :return: {block_size: Series de arrays indexada por (user_id, group_id, session_id)}
+        """
+        engine = GroupedMetricsEngine(self)
+        return {b: pd.Series(curves, index=engine.keys, dtype=object)
+                for b, curves in engine.learning_curves(block_sizes).items()}
 
     def _derive_task_stats(self, df: pd.DataFrame):
         """
         Derive task_duration_ms and reaction_time_ms from raw event stream.
-        Robust pairing: Uses session_id and task sequence if available, or strict time sorting.
+        Intermedio memoizado: avg_reaction_time y avg_task_duration comparten un único cálculo.
         """
-        if df is None or df.empty or "timestamp" not in df.columns:
-            return pd.DataFrame(columns=["task_duration_ms", "reaction_time_ms"])
-
-        tmp = df.copy()
-        tmp["timestamp"] = pd.to_datetime(tmp["timestamp"], utc=True, errors="coerce")
-        tmp = tmp.sort_values("timestamp")
-
-        # Find all starts and ends
-        starts = tmp[tmp["event_role"] == "task_start"].reset_index(drop=True)
-        ends = tmp[tmp["event_role"] == "task_end"].reset_index(drop=True)
-
-        task_durations = []
-        reaction_times = []
+        return self._cached(df, "task_stats")
 
-        # Robust pairing: Simply zip and check timestamps.
-        # If mismatched counts, we truncate to the shorter list (simple robust approach).
-        # A more complex approach would be to match by an explicit ID if it existed.
-        count = min(len(starts), len(ends))
+    def _task_stats(self, df):
+        return self._task_intervals(df)[["task_duration_ms", "reaction_time_ms"]]
 
-        for i in range(count):
-            t0 = starts.loc[i, "timestamp"]
-            t1 = ends.loc[i, "timestamp"]
-
-            # Sanity check: Start must be before End
-            if t0 > t1:
-                # Discard misaligned pair (or try to look ahead? For now, discard/NaN safe)
-                continue
-
-            dur_ms = (t1 - t0).total_seconds() * 1000.0
-            task_durations.append(dur_ms)
-
-            # Reaction time: First action between t0 and t1
-            actions = tmp[
-                (tmp["event_role"].isin(["action_success", "action_fail"])) &
-                (tmp["timestamp"] >= t0) &
-                (tmp["timestamp"] <= t1)
-                ]
-
-            if not actions.empty:
-                rt_ms = (actions.iloc[0]["timestamp"] - t0).total_seconds() * 1000.0
-                reaction_times.append(rt_ms)
-            else:
-                reaction_times.append(np.nan)
+    def _task_intervals(self, df: pd.DataFrame):
+        """
+        Empareja task_start / task_end dentro de cada sesión (user_id, group_id, session_id):
+        el i-ésimo inicio con el i-ésimo fin en orden temporal (si hay más de unos que de otros,
+        sobran los últimos). Se descartan los pares con inicio posterior al fin.
+        Tiempo de reacción: primera acción (action_success / action_fail) entre inicio y fin,
+        buscada para todos los pares a la vez con merge_asof.
+        :return: DataFrame con las claves de sesión, task_duration_ms y reaction_time_ms
+        """
+        columns = SESSION_KEYS + ["task_duration_ms", "reaction_time_ms"]
+        if df is None or df.empty or "timestamp" not in df.columns:
+            return pd.DataFrame(columns=columns)
+
+        relevant = df["event_role"].isin(["task_start", "task_end", "action_success", "action_fail"])
+        tmp = df.loc[relevant.to_numpy(dtype=bool, na_value=False), SESSION_KEYS + ["timestamp", "event_role"]]
+        if not isinstance(tmp["timestamp"].dtype, pd.DatetimeTZDtype):
+            tmp = tmp.assign(timestamp=pd.to_datetime(tmp["timestamp"], utc=True, errors="coerce"))
+        tmp = tmp.sort_values("timestamp", kind="stable")
+
+        def numbered(role):
+            rows = tmp[tmp["event_role"] == role]
+            return rows.assign(task_n=rows.groupby(SESSION_KEYS, observed=True, sort=False).cumcount())
+
+        starts = numbered("task_start")
+        ends = numbered("task_end")[SESSION_KEYS + ["task_n", "timestamp"]]
+        pairs = starts[SESSION_KEYS + ["task_n", "timestamp"]].merge(
+            ends, on=SESSION_KEYS + ["task_n"], suffixes=("_start", "_end"))
+
+        # Sanity check: Start must be before End
+        pairs = pairs[~(pairs["timestamp_start"] > pairs["timestamp_end"])].reset_index(drop=True)
+        pairs["task_duration_ms"] = self._total_seconds(pairs["timestamp_end"] - pairs["timestamp_start"]) * 1000.0
+
+        # Reaction time: First action between t0 and t1
+        actions = tmp[tmp["event_role"].isin(["action_success", "action_fail"]) & tmp["timestamp"].notna()]
+        actions = actions[SESSION_KEYS + ["timestamp"]].rename(columns={"timestamp": "action_ts"})
+        left = pairs[pairs["timestamp_start"].notna()].sort_values("timestamp_start", kind="stable")
+        first_action = pd.merge_asof(
+            left.reset_index(), actions, left_on="timestamp_start", right_on="action_ts",
+            by=SESSION_KEYS, direction="forward",
+        ).set_index("index")["action_ts"].reindex(pairs.index)
+        first_action = first_action.where(first_action <= pairs["timestamp_end"])
+        pairs["reaction_time_ms"] = self._total_seconds(first_action - pairs["timestamp_start"]) * 1000.0
+
+        return pairs[columns]
 
-        return pd.DataFrame({
-            "task_duration_ms": task_durations,
-            "reaction_time_ms": reaction_times
-        })
+    @staticmethod
+    def _total_seconds(deltas):
+        """
+        Versión vectorizada de Timedelta.total_seconds() escalar (días*86400 + segundos + µs/1e6),
+        que no da exactamente el mismo float que Series.dt.total_seconds().
+        """
+        micros = deltas.astype("timedelta64[us]")
+        values = micros.to_numpy(dtype="timedelta64[us]").astype("int64")
+        seconds = (values // 10 ** 6) + (values % 10 ** 6) / 1e6
+        return pd.Series(np.where(micros.isna().to_numpy(), np.nan, seconds), index=deltas.index)
 
     def avg_reaction_time(self, df=None):
         if df is None:
@@ -192,15 +465,16 @@ class MetricsCalculator:
 
     def time_per_success(self, df=None):
         if df is None: df = self.df
-        hits = df[df["event_role"] == "action_success"]
-        if len(hits) == 0:
+        hits = self._cached(df, "role_counts").get("action_success", 0)
+        if hits == 0:
             return np.nan
-        total_time = (df["timestamp"].max() - df["timestamp"].min()).total_seconds()
-        return total_time / len(hits)
+        ts = self._all_timestamps(df)
+        total_time = (ts.max() - ts.min()).total_seconds()
+        return total_time / hits
 
     def retries_after_end(self, df=None):
         if df is None: df = self.df
-        return len(df[df["event_role"] == "task_restart"])
+        return self._cached(df, "role_counts").get("task_restart", 0)
 
     def voluntary_play_time(self, df=None):
         if df is None: df = self.df
@@ -214,7 +488,7 @@ class MetricsCalculator:
 
         # 2. Buscar el último evento registrado en la sesión
         # (puede ser session_end o simplemente el último log antes de cerrar)
-        last_event_time = df["timestamp"].max()
+        last_event_time = self._all_timestamps(df).max()
 
         # 3. Calcular diferencia
         if pd.notna(last_event_time) and pd.notna(task_end_time):
@@ -227,11 +501,11 @@ class MetricsCalculator:
 
     def aid_usage(self, df=None):
         if df is None: df = self.df
-        return len(df[df["event_role"] == "help_event"])
+        return self._cached(df, "role_counts").get("help_event", 0)
 
     def inactivity_time(self, df=None, threshold=5):
         if df is None: df = self.df
-        ts = df["timestamp"].sort_values()
+        ts = self._all_timestamps(df).sort_values()
         diffs = ts.diff().dt.total_seconds()
         return diffs[diffs > threshold].sum()
 
@@ -267,9 +541,10 @@ class MetricsCalculator:
 
     def activity_level(self, df=None):
         if df is None: df = self.df
-        dur = (df["timestamp"].max() - df["timestamp"].min()).total_seconds() / 60
+        ts = self._all_timestamps(df)
+        dur = (ts.max() - ts.min()).total_seconds() / 60
         if dur <= 0: return np.nan
-        return len(df) / dur
+        return len(ts) / dur
 
     def learning_curve_mean(self, df=None):
         vals = self.learning_curve(df)
@@ -289,35 +564,29 @@ class MetricsCalculator:
 
     def success_after_restart(self, df=None):
         if df is None: df = self.df
-        # Buscar patrones: task_restart -> ... -> task_end(success)
         # Buscar patrones: task_restart -> ... -> task_end(success) dentro de la misma sesión
         restarts = df[df["event_role"] == "task_restart"]
         if restarts.empty:
             return 0.0
 
-        success_count = 0
-
-        # Iterar sobre cada reinicio para ver si DESPUÉS hubo un éxito
-        for idx, restart_row in restarts.iterrows():
-            restart_time = restart_row["timestamp"]
-            session_id = restart_row["session_id"]
-
-            # Buscar éxitos posteriores en la MISMA sesión
-            future_successes = df[
-                (df["session_id"] == session_id) &
-                (df["timestamp"] > restart_time) &
-                (df["event_role"] == "task_end") &
-                (df["event_value"].astype(str).str.lower() == "success")
-                ]
+        # Un reinicio va seguido de un éxito si y solo si es anterior al ÚLTIMO éxito de su sesión:
+        # un único groupby responde a todos los reinicios a la vez
+        successes = df[
+            (df["event_role"] == "task_end") &
+            (df["event_value"].astype(str).str.lower() == "success")
+            ]
+        last_success = successes.groupby("session_id", observed=True)["timestamp"].max()
+        last_success.index = last_success.index.astype(object)
 
-            if not future_successes.empty:
-                success_count += 1
+        later = last_success.reindex(restarts["session_id"].astype(object)).to_numpy()
+        success_count = int((restarts["timestamp"].to_numpy() < later).sum())
 
         return success_count / len(restarts)
 
     def navigation_errors(self, df=None):
         if df is None: df = self.df
-        errors = len(df[df["event_role"].isin(["navigation_error", "action_fail"])])
+        counts = self._cached(df, "role_counts")
+        errors = counts.get("navigation_error", 0) + counts.get("action_fail", 0)
         if errors == 0:
             # Fallback: estimate from path_efficiency
             eff = self.path_efficiency(df)
@@ -327,7 +596,7 @@ class MetricsCalculator:
 
     def aim_errors(self, df=None):
         if df is None: df = self.df
-        return len(df[df["event_role"] == "action_fail"])
+        return self._cached(df, "role_counts").get("action_fail", 0)
 
     def task_duration_success(self, df=None):
         # Duración promedio solo de tareas exitosas
@@ -342,7 +611,7 @@ class MetricsCalculator:
 
     def interface_errors(self, df=None):
         if df is None: df = self.df
-        return len(df[df["event_name"] == "ui_error"])
+        return self._cached(df, "name_counts").get("ui_error", 0)
 
     def learning_stability(self, df=None):
         vals = self.learning_curve(df)
@@ -358,51 +627,46 @@ class MetricsCalculator:
             return float(eff) if eff is not None else 0.0
         return vals[-1] - vals[0]
 
-    def path_efficiency(self, df=None):
-        if df is None: df = self.df
-
-        # 1. Leer el ideal_path.json si existe
-        from pathlib import Path
-        import json
-        import numpy as np
-
-        scenario_id = ""
+    def _scenario_id(self, df):
+        """
+        map_name de la sesión del primer experiment_config de df ("" si no hay). Sale de los
+        metadatos del SessionIndex de la calculadora y, si no lo hay (o no conoce la sesión),
+        del contexto ya parseado de esa fila (columnas expandidas o columna 'context' en JSON).
+        """
         config_logs = df[df["event_name"] == "experiment_config"]
-        if not config_logs.empty:
-            try:
-                first_val = config_logs.iloc[0]["event_context"]
-                if isinstance(first_val, str):
-                    first_val = json.loads(first_val.replace("'", '"'))
-                if isinstance(first_val, dict):
-                    session_ctx = first_val.get("session", first_val)
-                    scenario_id = session_ctx.get("map_name", "")
-            except:
-                pass
+        if config_logs.empty:
+            return ""
+        first = config_logs.iloc[[0]]
+        session_id = first["session_id"].iloc[0] if "session_id" in first.columns else None
 
-        ideal_file = Path(f"ideal_path_{scenario_id}.json") if scenario_id else Path("ideal_path.json")
-        if not ideal_file.exists():
-            ideal_file = Path("ideal_path.json")
+        metadata = self.session_index.metadata(session_id) if self.session_index is not None else {}
+        if not metadata:
+            metadata = SessionIndex.from_events(first).metadata(session_id)
+        return metadata.get("map_name") or ""
 
-        if not ideal_file.exists():
-            return None  # Return None para que compute_category lo salte por completo sin penalizar con 0
+    def path_efficiency(self, df=None):
+        if df is None: df = self.df
+        # Memoizado: también lo usan como fallback learning_curve_mean, learning_stability,
+        # error_reduction_rate y navigation_errors
+        return self._cached(df, "path_efficiency")
 
+    def _path_efficiency(self, df):
+        # 1. Leer el ideal_path.json si existe
+        scenario_id = self._cached(df, "scenario_id")
         try:
-            with open(ideal_file, "r", encoding="utf-8") as f:
-                ideal_data = json.load(f)
+            ideal = SCENARIO_ASSETS.ideal_path(scenario_id)
+            if ideal is None:
+                return None  # Return None para que compute_category lo salte por completo sin penalizar con 0
 
-            if not isinstance(ideal_data, list) or len(ideal_data) < 2:
+            if not isinstance(ideal.data, list) or len(ideal.data) < 2:
                 return None
 
-            # Calcular distancia euclidiana total del ideal_path
-            ix = [pt["x"] for pt in ideal_data if "x" in pt and "z" in pt]
-            iz = [pt["z"] for pt in ideal_data if "x" in pt and "z" in pt]
-            if len(ix) < 2: return None
-
-            ideal_pts = np.column_stack((ix, iz))
-            ideal_dist = np.sum(np.sqrt(np.sum(np.diff(ideal_pts, axis=0) ** 2, axis=1)))
+            # Distancia euclidiana total del ideal_path (calculada al cargarlo en el registro)
+            if len(ideal.points) < 2: return None
+            ideal_dist = ideal.length
 
             # 2. Calcular distancia euclidiana total caminada por el participante
-            moves = df[df["event_name"] == "movement_frame"]
+            moves = self._frames(df, "movement_frame")
             if "position_x" not in moves.columns or "position_z" not in moves.columns or len(moves) < 2:
                 return None
 
@@ -429,39 +693,17 @@ class MetricsCalculator:
 
     def gaze_on_path_ratio(self, df=None, threshold=0.3):
         if df is None: df = self.df
-        from pathlib import Path
-
-        scenario_id = ""
-        config_logs = df[df["event_name"] == "experiment_config"]
-        if not config_logs.empty:
-            try:
-                import json
-                first_val = config_logs.iloc[0]["event_context"]
-                if isinstance(first_val, str):
-                    first_val = json.loads(first_val.replace("'", '"'))
-                if isinstance(first_val, dict):
-                    session_ctx = first_val.get("session", first_val)
-                    scenario_id = session_ctx.get("map_name", "")
-            except:
-                pass
-
-        ideal_file = Path(f"ideal_path_{scenario_id}.json") if scenario_id else Path("ideal_path.json")
-        if not ideal_file.exists():
-            ideal_file = Path("ideal_path.json")
-
-        if not ideal_file.exists():
-            return None
 
+        scenario_id = self._cached(df, "scenario_id")
         try:
-            import json
-            import numpy as np
-            with open(ideal_file, "r", encoding="utf-8") as f:
-                ideal_data = json.load(f)
+            ideal = SCENARIO_ASSETS.ideal_path(scenario_id)
+            if ideal is None:
+                return None
 
-            if not isinstance(ideal_data, list) or len(ideal_data) < 2:
+            if not isinstance(ideal.data, list) or len(ideal.data) < 2:
                 return None
 
-            gazes = df[df["event_name"] == "gaze_frame"]
+            gazes = self._frames(df, "gaze_frame")
             bx = "hit_position_x" if "hit_position_x" in gazes.columns else "hit_point_x"
             bz = "hit_position_z" if "hit_position_z" in gazes.columns else "hit_point_z"
 
@@ -477,34 +719,11 @@ class MetricsCalculator:
             if len(gx) == 0:
                 return 0.0
 
-            path_pts = np.array([[pt["x"], pt["z"]] for pt in ideal_data if "x" in pt and "z" in pt])
-            if len(path_pts) < 2: return None
-
-            P1 = path_pts[:-1]
-            P2 = path_pts[1:]
+            if ideal.index is None: return None
 
-            hits = 0
+            hits = ideal.index.count_within(gx, gz, threshold)
             total = len(gx)
 
-            for i in range(total):
-                px, pz = gx[i], gz[i]
-
-                AB = P2 - P1
-                AP = np.column_stack((np.full(len(P1), px) - P1[:, 0], np.full(len(P1), pz) - P1[:, 1]))
-
-                ab_sq = np.sum(AB ** 2, axis=1)
-                ap_dot_ab = np.sum(AP * AB, axis=1)
-
-                t = ap_dot_ab / np.maximum(ab_sq, 1e-8)
-                t = np.clip(t, 0.0, 1.0)
-
-                closest_x = P1[:, 0] + t * AB[:, 0]
-                closest_z = P1[:, 1] + t * AB[:, 1]
-
-                dists = np.sqrt((px - closest_x) ** 2 + (pz - closest_z) ** 2)
-                if np.min(dists) <= threshold:
-                    hits += 1
-
             return float(hits / total)
 
         except Exception as e:
@@ -583,15 +802,24 @@ class MetricsCalculator:
         subset = df[df["event_name"] == target_event]
         if subset.empty: return 0.0
 
+        # Para operaciones numéricas, asegurar que tenemos valores
+        vals = pd.to_numeric(subset["event_value"], errors="coerce").dropna().to_numpy() \
+            if "event_value" in subset.columns else np.empty(0)
+        return self._aggregate_generic(len(subset), vals, aggregation)
+
+    @staticmethod
+    def _aggregate_generic(n_events, vals, aggregation):
+        """
+        Agregación de una métrica genérica.
+        :param n_events: nº de eventos target_event (para "count")
+        :param vals: array con sus event_value numéricos, sin nulos
+        """
         agg_lower = aggregation.lower()
 
         if agg_lower == "count":
-            return float(len(subset))
-
-        # Para operaciones numéricas, asegurar que tenemos valores
-        vals = pd.to_numeric(subset["event_value"], errors="coerce").dropna()
+            return float(n_events)
 
-        if vals.empty: return 0.0
+        if len(vals) == 0: return 0.0
 
         if agg_lower == "average" or agg_lower == "mean":
             return float(vals.mean())
@@ -604,36 +832,67 @@ class MetricsCalculator:
 
         return 0.0  # Unknown aggregation
 
+    def generic_metric_plan(self):
+        """
+        Plan de las métricas genéricas habilitadas en config (target_event + aggregation):
+        {target_event: {agregaciones en minúsculas}}. compute_grouped_metrics las calcula todas
+        en una sola pasada agrupada (GroupedMetricsEngine.generic_metrics).
+        """
+        metric_funcs = self._available_metric_functions()
+        plan = {}
+        for cat_cfg in self.metrics_cfg.values():
+            for metric_name, params in cat_cfg.items():
+                if metric_name in metric_funcs or not params.get("enabled", True):
+                    continue
+                target_event, aggregation = params.get("target_event"), params.get("aggregation")
+                if target_event and aggregation:
+                    plan.setdefault(target_event, set()).add(aggregation.lower())
+        return plan
+
     def compute_category(self, category_name, df=None):
         if df is None:
             df = self.df
 
-        cat_cfg = self.metrics_cfg.get(category_name, {})
         metric_funcs = self._available_metric_functions()
+        with self.memoized(self._enabled_metrics([category_name])):
+            return self._score_category(
+                category_name, lambda metric_name, params: self._raw_metric_value(metric_name, params, df, metric_funcs))
+
+    def _raw_metric_value(self, metric_name, params, df, metric_funcs):
+        """Valor bruto de una métrica sobre df (None = métrica a omitir)."""
+        func = metric_funcs.get(metric_name)
+
+        # Check if we have a hardcoded function
+        if func is not None:
+            return func(df)
+
+        # Try generic calculation if params exist
+        target_event = params.get("target_event")
+        aggregation = params.get("aggregation")
+
+        if target_event and aggregation:
+            return self._calculate_generic_metric(df, target_event, aggregation)
+
+        # Metric defined in config but no function and no generic params? Skip
+        return None
+
+    def _score_category(self, category_name, raw_value_of):
+        """
+        Normaliza y pondera las métricas de una categoría.
+        :param raw_value_of: función (metric_name, params) -> valor bruto (None = omitir)
+        """
+        cat_cfg = self.metrics_cfg.get(category_name, {})
 
         results = {}
         weighted_sum = 0
         total_weight = 0
 
         for metric_name, params in cat_cfg.items():
-            func = metric_funcs.get(metric_name)
             # Check if metric is enabled in config (Default: True)
             if not params.get("enabled", True):
                 continue
 
-            # Check if we have a hardcoded function
-            if func is not None:
-                raw_value = func(df)
-            else:
-                # Try generic calculation if params exist
-                target_event = params.get("target_event")
-                aggregation = params.get("aggregation")
-
-                if target_event and aggregation:
-                    raw_value = self._calculate_generic_metric(df, target_event, aggregation)
-                else:
-                    # Metric defined in config but no function and no generic params? Skip
-                    continue
+            raw_value = raw_value_of(metric_name, params)
 
             # Logic for optional metrics (return None -> Skip)
             if raw_value is None:
@@ -691,114 +950,262 @@ class MetricsCalculator:
 
         return final / total_w
 
+    # ----------------------------------------------------------------------
+    # PUNTUACIÓN MATRICIAL (todas las sesiones a la vez)
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def normalize_array(values, min_val, max_val, invert=False):
+        """normalize aplicado a un array completo (mismas operaciones, elemento a elemento)."""
+        values = np.asarray(values, dtype=float)
+        missing = np.isnan(values)
+        if min_val is None or max_val is None:
+            return np.where(missing, 0.0, values)
+        if abs(max_val - min_val) < 1e-9:
+            return np.zeros(len(values))
+
+        v = np.clip((values - min_val) / (max_val - min_val), 0, 1)
+        return np.where(missing, 0.0, 1 - v if invert else v)
+
+    @staticmethod
+    def metric_column(category_name, metric_name, metric_funcs):
+        """Columna de compute_grouped_metrics de una métrica: las de config llevan el prefijo de la categoría."""
+        if metric_name not in metric_funcs and not metric_name.startswith(category_name):
+            return f"{category_name}_{metric_name}"
+        return metric_name
+
+    def score_matrix(self, raw):
+        """
+        Normalización, pesos de categoría y pesos del perfil para todas las sesiones en una llamada.
+        :param raw: DataFrame sesiones × métricas con los valores brutos tal como los guarda
+                    compute_grouped_metrics (columnas metric_column; NaN = métrica omitida)
+        :return: DataFrame (mismo índice) con {categoria}_score y global_score
+        """
+        metric_funcs = self._available_metric_functions()
+        n = len(raw)
+        scores, valid_cats = {}, {}
+
+        for cat_name in CATEGORIES:
+            weighted_sum = np.zeros(n)
+            total_weight = np.zeros(n)
+            evaluated = np.zeros(n, dtype=bool)
+            for metric_name, params in self.metrics_cfg.get(cat_name, {}).items():
+                if not params.get("enabled", True):
+                    continue
+                column = self.metric_column(cat_name, metric_name, metric_funcs)
+                if column not in raw.columns:
+                    continue
+                values = pd.to_numeric(raw[column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                present = ~np.isnan(values)
+
+                weight = params.get("weight", 1.0)
+                normalized = self.normalize_array(values, params.get("min"), params.get("max"),
+                                                  params.get("invert", False))
+                # Sumar 0.0 donde la métrica se omite deja la suma igual que en _score_category
+                weighted_sum += np.where(present, normalized * weight, 0.0)
+                total_weight += np.where(present, weight, 0)
+                evaluated |= present
+
+            has_weight = total_weight > 0
+            scores[cat_name] = np.where(has_weight, weighted_sum / np.where(has_weight, total_weight, 1), 0.0)
+            # Categoría válida para la puntuación global si evaluó al menos una métrica
+            valid_cats[cat_name] = evaluated
+
+        result = pd.DataFrame({f"{cat}_score": scores[cat] for cat in CATEGORIES}, index=raw.index)
+        result["global_score"] = self.global_score_matrix(scores, valid_cats)
+        return result
+
+    def global_score_matrix(self, scores, valid_cats):
+        """
+        compute_global_score sobre arrays.
+        :param scores: {categoria: array de puntuaciones}
+        :param valid_cats: {categoria: array booleano}
+        """
+        profile = self.profiles_cfg.get(self.user_profile, {})
+        weights = [np.where(valid_cats[cat], profile.get(f"{cat}_weight", 1), 0) for cat in CATEGORIES]
+
+        total_w = weights[0] + weights[1] + weights[2] + weights[3]
+        final = (
+                scores["efectividad"] * weights[0] +
+                scores["eficiencia"] * weights[1] +
+                scores["satisfaccion"] * weights[2] +
+                scores["presencia"] * weights[3]
+        )
+        return np.where(total_w == 0, 0.0, final / np.where(total_w == 0, 1, total_w))
+
+    # ----------------------------------------------------------------------
+    # RE-PUNTUACIÓN DESDE VALORES BRUTOS (solo cambian pesos, rangos o perfiles)
+    # ----------------------------------------------------------------------
+    def raw_config(self):
+        """
+        Parte de la config de la que dependen los valores brutos: roles de eventos y definición
+        de las métricas sin SCORING_PARAMS. Los perfiles solo afectan a la puntuación global.
+        """
+        metrics = {cat: {name: {k: v for k, v in params.items() if k not in SCORING_PARAMS}
+                         for name, params in self.metrics_cfg.get(cat, {}).items()}
+                   for cat in CATEGORIES}
+        return {"event_roles": self.config.get("event_roles", {}), "metrics": metrics}
+
+    @staticmethod
+    def raw_values(results):
+        """Valores brutos de compute_all: {categoria: {metrica: raw}} (las omitidas no aparecen)."""
+        return {cat: {name: data["raw"] for name, data in content.items() if isinstance(data, dict)}
+                for cat, content in results["categorias"].items()}
+
+    def rescore_all(self, raw_values):
+        """
+        compute_all a partir de valores brutos guardados (raw_values), con los pesos, rangos y
+        perfiles de la config actual. Mismo resultado que compute_all si raw_config no cambió.
+        """
+        cat_scores = {}
+        for cat in CATEGORIES:
+            cat_raw = raw_values.get(cat, {})
+            cat_scores[cat] = self._score_category(cat, lambda metric_name, params: cat_raw.get(metric_name))
+        return {
+            "categorias": cat_scores,
+            "global_score": self.compute_global_score(cat_scores)
+        }
+
+    def rescore_grouped(self, grouped):
+        """
+        compute_grouped_metrics a partir de un resultado anterior: conserva claves, valores
+        brutos y el resto de columnas y sustituye {categoria}_score y global_score.
+        """
+        grouped = grouped.copy()
+        scores = self.score_matrix(grouped)
+        for col in scores.columns:
+            grouped[col] = scores[col]
+        return grouped
+
     # ----------------------------------------------------------------------
     # MÉTRICAS AGRUPADAS POR USUARIO Y SESIÓN
     # ----------------------------------------------------------------------
-    def compute_grouped_metrics(self):
+    def compute_grouped_metrics(self, workers=1):
+        """
+        Métricas por (user_id, group_id, session_id).
+        :param workers: nº de procesos; con más de uno las sesiones se reparten en un pool de
+                        procesos (python_analysis.parallel_metrics) y el resultado es el mismo
+        """
+        if workers and workers > 1:
+            from python_analysis.parallel_metrics import grouped_rows_parallel
+            return pd.DataFrame(grouped_rows_parallel(self, workers))
+        return pd.DataFrame(self._grouped_rows())
+
+    def _grouped_rows(self):
+        # Los intermedios de cada grupo (learning_curve, path_efficiency...) se calculan una vez
+        with self.memoized(self._enabled_metrics(CATEGORIES)):
+            return self._compute_grouped_rows()
+
+    def _compute_grouped_rows(self):
         metric_funcs = self._available_metric_functions()
+
+        # Valores brutos de todas las métricas para todos los grupos a la vez (GroupedMetricsEngine);
+        # las métricas no vectorizadas se calculan por grupo con su método original
+        engine = GroupedMetricsEngine(self)
+        raw_cache = {}
+
+        def raw_values(cat_name, metric_name, params):
+            key = (cat_name, metric_name)
+            if key not in raw_cache:
+                if metric_name in metric_funcs:
+                    values = engine.raw_metric(metric_name)
+                else:
+                    # Métricas genéricas de config: todas a la vez con el plan compilado
+                    values = engine.generic_metric(params)
+                if values is None:
+                    values = [self._raw_metric_value(metric_name, params, engine.subframe(i), metric_funcs)
+                              for i in range(engine.n_groups)]
+                raw_cache[key] = values
+            return raw_cache[key]
+
+        # Matriz grupos × métricas con los valores que se guardan en cada fila: None = métrica omitida
+        # (NaN en la matriz) y NaN de una métrica obligatoria -> 0.0, como en _score_category
+        columns = {}
+        for cat_name in CATEGORIES:
+            for metric_name, params in self.metrics_cfg.get(cat_name, {}).items():
+                # Check if metric is enabled in config (Default: True)
+                if not params.get("enabled", True):
+                    continue
+                column = self.metric_column(cat_name, metric_name, metric_funcs)
+                columns[(cat_name, column)] = [v if v is None or not pd.isna(v) else 0.0
+                                               for v in raw_values(cat_name, metric_name, params)]
+
+        raw = pd.DataFrame({column: np.array([np.nan if v is None else v for v in values], dtype=float)
+                            for (_, column), values in columns.items()}, index=range(engine.n_groups))
+        scores = self.score_matrix(raw)
+        score_columns = {col: scores[col].tolist() for col in scores.columns}
+
+        iv_values = engine.independent_variables()
         rows = []
+        for i in range(engine.n_groups):
+            entry = engine.group_keys(i)
 
-        grouped = self.df.groupby(["user_id", "group_id", "session_id"])
+            # Valor raw de cada métrica evaluada (para visualización y el JSON plano)
+            for (_, column), values in columns.items():
+                if values[i] is not None:
+                    entry[column] = values[i]
 
-        for (user, group, session), subdf in grouped:
-            entry = {
-                "user_id": user,
-                "group_id": group,
-                "session_id": session,
-            }
+            entry.update({col: values[i] for col, values in score_columns.items()})
+
+            iv_val = iv_values[i]
+            entry["independent_variable"] = iv_val if iv_val else "N/A"
+
+            rows.append(entry)
 
-            # (Eliminado loop ciego)
-            # Ahora confiamos SOLO en compute_category para añadir métricas (respetando config)
-
-            # Añadir categorías normalizadas Y métricas individuales
-            cat_scores = {}
-            valid_cats = {}
-            for cat_name in ["efectividad", "eficiencia", "satisfaccion", "presencia"]:
-                cat_result = self.compute_category(cat_name, subdf)
-                cat_scores[f"{cat_name}_score"] = cat_result["score"]
-                
-                # Una categoría es válida si evaluó al menos una métrica (tiene más keys que solo 'score')
-                valid_cats[cat_name] = len(cat_result) > 1
-
-                # Desempaquetar cada métrica de la categoría para que esté disponible en el JSON plano
-                for metric_key, val_dict in cat_result.items():
-                    if metric_key == "score": continue
-
-                    # Guardamos el valor raw para visualización
-                    if isinstance(val_dict, dict) and "raw" in val_dict:
-                        # CRITICAL FIX: Ensure custom metrics are prefixed with category so Visualizer can find them
-                        final_key = metric_key
-                        if metric_key not in metric_funcs:
-                            if not metric_key.startswith(cat_name):
-                                final_key = f"{cat_name}_{metric_key}"
-
-                        entry[final_key] = val_dict["raw"]
-
-            entry.update(cat_scores)
-
-            # Puntuación global para este participante
-            entry["global_score"] = self.compute_global_score({
-                "efectividad": {"score": cat_scores["efectividad_score"]},
-                "eficiencia": {"score": cat_scores["eficiencia_score"]},
-                "satisfaccion": {"score": cat_scores["satisfaccion_score"]},
-                "presencia": {"score": cat_scores["presencia_score"]},
-            }, valid_cats)
-
-            # Retrieve independent_variable from context
-            # Strategy: Logic updated to handle nested 'session' object from config logs
-            iv_val = None
-
-            # 1. Direct column (flat)
-            if "independent_variable" in subdf.columns:
-                vals = subdf["independent_variable"].dropna().unique()
-                if len(vals) > 0: iv_val = vals[0]
-
-            # 2. Nested in 'session' column (common if expand_context=True and log had session obj)
-            if not iv_val and "session" in subdf.columns:
-                for val in subdf["session"].dropna():
-                    if isinstance(val, dict) and "independent_variable" in val:
-                        iv_val = val["independent_variable"]
-                        break
-                    # Handle case where it might be a JSON string
-                    elif isinstance(val, str):
+        return rows
+
+    def _independent_variable(self, subdf):
+        """independent_variable de un grupo (columna plana, objeto 'session' o evento session_start)."""
+        # Retrieve independent_variable from context
+        # Strategy: Logic updated to handle nested 'session' object from config logs
+        iv_val = None
+
+        # 1. Direct column (flat)
+        if "independent_variable" in subdf.columns:
+            vals = subdf["independent_variable"].dropna().unique()
+            if len(vals) > 0: iv_val = vals[0]
+
+        # 2. Nested in 'session' column (common if expand_context=True and log had session obj)
+        if not iv_val and "session" in subdf.columns:
+            for val in subdf["session"].dropna():
+                if isinstance(val, dict) and "independent_variable" in val:
+                    iv_val = val["independent_variable"]
+                    break
+                # Handle case where it might be a JSON string
+                elif isinstance(val, str):
+                    try:
+                        import json
+                        d = json.loads(val)
+                        if "independent_variable" in d:
+                            iv_val = d["independent_variable"]
+                            break
+                    except:
+                        pass
+
+        # 3. Fallback: Check specific start events for 'event_context'
+        if not iv_val:
+            starts = subdf[subdf["event_name"] == "session_start"]
+            for _, r in starts.iterrows():
+                # Check if context is available (dict or json str)
+                ctx = r.get("context") or r.get("event_context")
+                if ctx:
+                    if isinstance(ctx, str):
                         try:
-                            import json
-                            d = json.loads(val)
-                            if "independent_variable" in d:
-                                iv_val = d["independent_variable"]
-                                break
+                            ctx = json.loads(ctx)
                         except:
-                            pass
-
-            # 3. Fallback: Check specific start events for 'event_context'
-            if not iv_val:
-                starts = subdf[subdf["event_name"] == "session_start"]
-                for _, r in starts.iterrows():
-                    # Check if context is available (dict or json str)
-                    ctx = r.get("context") or r.get("event_context")
-                    if ctx:
-                        if isinstance(ctx, str):
-                            try:
-                                ctx = json.loads(ctx)
-                            except:
-                                ctx = {}
-
-                        if isinstance(ctx, dict):
-                            # Check root
-                            if "independent_variable" in ctx:
-                                iv_val = ctx["independent_variable"]
-                            # Check nested session
-                            elif "session" in ctx and isinstance(ctx["session"], dict):
-                                if "independent_variable" in ctx["session"]:
-                                    iv_val = ctx["session"]["independent_variable"]
-
-                    if iv_val: break
+                            ctx = {}
 
-            entry["independent_variable"] = iv_val if iv_val else "N/A"
+                    if isinstance(ctx, dict):
+                        # Check root
+                        if "independent_variable" in ctx:
+                            iv_val = ctx["independent_variable"]
+                        # Check nested session
+                        elif "session" in ctx and isinstance(ctx["session"], dict):
+                            if "independent_variable" in ctx["session"]:
+                                iv_val = ctx["session"]["independent_variable"]
 
-            rows.append(entry)
+                if iv_val: break
 
-        return pd.DataFrame(rows)
+        return iv_val
 
     # ----------------------------------------------------------------------
     # MÉTRICAS AGRUPADAS POR VARIABLE INDEPENDIENTE
@@ -819,14 +1226,26 @@ class MetricsCalculator:
         result = grouped_df.groupby("independent_variable")[numeric_cols].mean().reset_index()
         return result
 
+    @staticmethod
+    def compute_variable_statistics(grouped_df: pd.DataFrame, n_resamples=10000, confidence=0.95, seed=0,
+                                    workers=1):
+        """
+        Media, intervalo de confianza bootstrap y p-valor de una prueba de permutación de cada
+        columna numérica por independent_variable (ver python_analysis.iv_statistics).
+        Requiere el DF generado por compute_grouped_metrics.
+        """
+        return variable_statistics(grouped_df, n_resamples=n_resamples, confidence=confidence, seed=seed,
+                                   workers=workers)
+
     # ----------------------------------------------------------------------
     # MÉTRICAS GLOBALES
     # ----------------------------------------------------------------------
     def compute_all(self):
-        efectividad = self.compute_category("efectividad")
-        eficiencia = self.compute_category("eficiencia")
-        satisfaccion = self.compute_category("satisfaccion")
-        presencia = self.compute_category("presencia")
+        with self.memoized(self._enabled_metrics(CATEGORIES)):
+            efectividad = self.compute_category("efectividad")
+            eficiencia = self.compute_category("eficiencia")
+            satisfaccion = self.compute_category("satisfaccion")
+            presencia = self.compute_category("presencia")
 
         cat_scores = {
             "efectividad": efectividad,
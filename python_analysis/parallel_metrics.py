@@ -0,0 +1,182 @@
+"""
+compute_grouped_metrics en paralelo con un pool de procesos.
+
+Las sesiones (grupos user_id, group_id, session_id, en el mismo orden que el cálculo
+secuencial) se reparten en bloques contiguos con un número de filas parecido. Cada bloque
+viaja al proceso hijo como un stream IPC de Arrow escrito en memoria compartida, no como un
+DataFrame serializado con pickle: el hijo copia el buffer de una vez, lo reconstruye con
+pyarrow y calcula sus filas con MetricsCalculator.from_prepared. Las filas se unen en el
+orden de los bloques, así que el resultado es el mismo que con workers=1.
+
+Solo viajan las columnas que leen las métricas (metrics.SOURCE_COLUMNS) y, del SessionIndex,
+las entradas de las sesiones del bloque. Las categóricas y las columnas de texto van como
+diccionarios de Arrow; las columnas object que no son solo texto (dicts de contexto, valores
+mixtos) van como texto JSON, igual que en la caché Parquet de LogCache, también en diccionario.
+"""
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from python_analysis.grouped_metrics import SESSION_KEYS
+from python_analysis.metrics import SOURCE_COLUMNS, MetricsCalculator
+
+
+# ------------------------------------------------------------
+# DataFrame <-> Arrow en memoria compartida
+# ------------------------------------------------------------
+def _encode_frame(df):
+    """
+    Tabla Arrow del DataFrame, {columna de texto: dtype original} y las columnas que van como
+    JSON. Las de texto se codifican como diccionario de Arrow: cada valor distinto (un contexto
+    'session' por sesión, pocos independent_variable...) se escribe una sola vez.
+    """
+    # Copia superficial: solo se reasignan las columnas JSON, el resto se comparte con df
+    df = df.copy(deep=False)
+    text_columns, json_columns = {}, []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == object:
+            values = df[col].to_numpy()
+            missing = pd.isna(values) if values.size else np.zeros(0, dtype=bool)
+            present = values[~missing]
+            if not all(isinstance(v, str) for v in present):
+                encoded = np.full(len(values), None, dtype=object)
+                encoded[~missing] = [json.dumps(v, default=str) for v in present]
+                df[col] = pd.Series(encoded, index=df.index, dtype=object)
+                json_columns.append(col)
+        elif isinstance(dtype, pd.CategoricalDtype) or not pd.api.types.is_string_dtype(dtype):
+            continue
+        text_columns[col] = dtype
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    for col in text_columns:
+        i = table.schema.get_field_index(col)
+        if not pa.types.is_null(table.schema.field(i).type):  # columna sin ningún valor
+            table = table.set_column(i, col, table.column(i).dictionary_encode())
+    return table, text_columns, json_columns
+
+
+def _decode_frame(table, text_columns, json_columns):
+    df = table.to_pandas()
+    for col, dtype in text_columns.items():
+        values = df[col]  # categórica: un valor por código del diccionario
+        if col not in json_columns or not isinstance(values.dtype, pd.CategoricalDtype):
+            df[col] = values.astype(dtype)
+            continue
+        # Se parsea cada valor distinto una vez; el código -1 (nulo) apunta al None del final
+        categories = values.cat.categories
+        decoded = np.empty(len(categories) + 1, dtype=object)
+        for i, text in enumerate(categories):
+            decoded[i] = json.loads(text)
+        df[col] = pd.Series(decoded[values.cat.codes.to_numpy()], index=df.index, dtype=object)
+    return df
+
+
+def to_shared_memory(df):
+    """
+    Escribe df como stream IPC de Arrow en un bloque de memoria compartida.
+    :return: (SharedMemory, handle) — el handle es lo único que se envía al proceso hijo
+    """
+    table, text_columns, json_columns = _encode_frame(df)
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+        writer.write_table(table)
+    return shm, {"name": shm.name, "size": size, "text_columns": text_columns, "json_columns": json_columns}
+
+
+def from_shared_memory(handle):
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        # Una sola copia del buffer: así el bloque se puede cerrar aunque pandas reutilice la memoria
+        data = bytes(shm.buf[:handle["size"]])
+    finally:
+        shm.close()
+    table = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+    return _decode_frame(table, handle["text_columns"], handle["json_columns"])
+
+
+# ------------------------------------------------------------
+# Reparto de sesiones y proceso hijo
+# ------------------------------------------------------------
+def _session_chunks(calc, n_chunks):
+    """Bloques contiguos de grupos (orden de compute_grouped_metrics) con un nº de filas parecido."""
+    grouper = calc.df.groupby(SESSION_KEYS, observed=True, sort=True)
+    codes = grouper.ngroup().to_numpy()
+    sizes = np.bincount(codes[codes >= 0], minlength=grouper.ngroups)
+    n_chunks = max(1, min(n_chunks, grouper.ngroups))
+
+    # Cortes donde la suma acumulada de filas cruza cada fracción del total
+    cumulative = np.cumsum(sizes)
+    targets = cumulative[-1] * np.arange(1, n_chunks) / n_chunks if len(cumulative) else []
+    cuts = np.unique(np.concatenate(([0], np.searchsorted(cumulative, targets, side="right"), [grouper.ngroups])))
+    return codes, grouper.size().index, [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+
+
+def _chunk_rows(task):
+    df = from_shared_memory(task["events"])
+    frame_tables = {name: from_shared_memory(handle) for name, handle in task["frame_tables"].items()}
+    calc = MetricsCalculator.from_prepared(df, frame_tables, task["config"], task["user_profile"],
+                                           task["session_index"])
+    return calc._grouped_rows(), calc.memo_stats
+
+
+def grouped_rows_parallel(calc, workers):
+    """
+    Filas de compute_grouped_metrics calculadas en `workers` procesos.
+    :param calc: MetricsCalculator ya construido (df normalizado, roles y frame_tables)
+    """
+    codes, keys, chunks = _session_chunks(calc, workers)
+    if not chunks:
+        return []
+    columns = [c for c in calc.df.columns if c in SOURCE_COLUMNS]
+    segments, tasks = [], []
+    try:
+        for start, stop in chunks:
+            events = calc.df.loc[(codes >= start) & (codes < stop), columns]
+            wanted = keys[start:stop]
+            shm, handle = to_shared_memory(events)
+            segments.append(shm)
+
+            frame_handles = {}
+            for name, table in calc.frame_tables.items():
+                part = table.loc[pd.MultiIndex.from_frame(table[SESSION_KEYS]).isin(wanted),
+                                 [c for c in table.columns if c in SOURCE_COLUMNS]]
+                shm, frame_handles[name] = to_shared_memory(part)
+                segments.append(shm)
+
+            session_index = calc.session_index
+            if session_index is not None:
+                session_index = session_index.subset(wanted.get_level_values("session_id"))
+            tasks.append({"events": handle, "frame_tables": frame_handles,
+                          "config": calc.config, "user_profile": calc.user_profile,
+                          "session_index": session_index})
+
+        # fork donde exista: con spawn cada hijo volvería a ejecutar el script principal (vr_analysis no
+        # tiene guarda __main__); los datos de las sesiones viajan igualmente por memoria compartida
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+        rows = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+            # map conserva el orden de los bloques: mismo orden de filas que el cálculo secuencial
+            for chunk_rows, memo_stats in pool.map(_chunk_rows, tasks):
+                rows.extend(chunk_rows)
+                for kind, counter in memo_stats.items():
+                    calc.memo_stats[kind].update(counter)
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    print(f"[Metrics] ⚙️ Métricas agrupadas: {len(keys)} sesiones en {len(tasks)} bloques / {workers} procesos.")
+    return rows
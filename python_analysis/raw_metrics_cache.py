@@ -0,0 +1,186 @@
+"""
+Caché de valores brutos de métricas (por sesión y globales) indexada por una huella de sus entradas.
+
+Los valores brutos solo dependen de los datos, de los ficheros de escenario (ideal_path_<mapa>.json)
+y de la parte de la config que los define (MetricsCalculator.raw_config: event_roles y métricas
+sin weight/min/max/invert). Si un cambio de config solo toca pesos, rangos, invert o perfiles,
+la huella no cambia y grouped_metrics.csv y los resultados globales se recalculan desde la caché
+(score_matrix / _score_category) sin volver a calcular ninguna métrica.
+
+Re-puntuar un análisis ya exportado con una config nueva (sin Mongo ni parseo):
+    python -m python_analysis.raw_metrics_cache --rescore pruebas/analysis_<ts> --config nueva.json
+    python -m python_analysis.raw_metrics_cache --invalidate
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from python_analysis.exporter import MetricsExporter
+from python_analysis.metrics import MetricsCalculator
+from python_analysis.scenario_assets import SCENARIO_ASSETS
+
+# Subir si cambia el cálculo de alguna métrica (invalida todas las entradas anteriores)
+RAW_METRICS_VERSION = 1
+MANIFEST = "raw_metrics.json"
+
+
+def config_fingerprint(experiment_config):
+    """Huella de la parte de la config que afecta a los valores brutos."""
+    raw_config = MetricsCalculator.from_prepared(None, {}, experiment_config).raw_config()
+    raw_config["version"] = RAW_METRICS_VERSION
+    payload = json.dumps(raw_config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def data_fingerprint(df, frame_tables=None):
+    """Huella del contenido de df y de las tablas de telemetría (columna a columna)."""
+    digest = hashlib.sha256()
+    tables = {"events": df, **(frame_tables or {})}
+    for name in sorted(tables):
+        table = tables[name]
+        digest.update(f"{name}:{len(table)}".encode("utf-8"))
+        for col in table.columns:
+            # Columnas object con números (event_value): hash de float64 en lugar de por elemento
+            values = table[col].infer_objects()
+            try:
+                hashed = pd.util.hash_pandas_object(values, index=False)
+            except TypeError:
+                # Columnas object con dicts / listas (contexto expandido)
+                hashed = pd.util.hash_pandas_object(values.astype(str), index=False)
+            digest.update(str(col).encode("utf-8"))
+            digest.update(hashed.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _to_builtin(value):
+    # Escalares de numpy -> tipos de Python (json)
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+class RawMetricsCache:
+    def __init__(self, cache_dir=None):
+        """:param cache_dir: carpeta de la caché (por defecto RAW_METRICS_CACHE_DIR o ./raw_metrics_cache)"""
+        self.dir = Path(cache_dir or os.getenv("RAW_METRICS_CACHE_DIR", "raw_metrics_cache"))
+
+    @staticmethod
+    def fingerprint(calc):
+        """
+        Huella de las entradas de los valores brutos de una MetricsCalculator: config, datos y
+        ficheros de escenario (path_efficiency y gaze_on_path_ratio dependen de ideal_path_<mapa>.json).
+        """
+        combined = config_fingerprint(calc.config) + data_fingerprint(calc.df, calc.frame_tables) \
+            + SCENARIO_ASSETS.fingerprint()
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------------
+    def load(self, fingerprint):
+        """
+        :return: (grouped, global_raw) guardados con esa huella, o None si no hay entrada.
+                 grouped es el DataFrame de compute_grouped_metrics y global_raw los valores de
+                 MetricsCalculator.raw_values(compute_all())
+        """
+        entry = self.dir / fingerprint
+        if not (entry / "grouped.pkl").exists() or not (entry / "global.json").exists():
+            return None
+        with open(entry / "global.json", "r", encoding="utf-8") as f:
+            global_raw = json.load(f)["raw_values"]
+        # Pickle en lugar de Parquet: conserva los dtypes exactos (claves categóricas,
+        # independent_variable con tipos mezclados)
+        return pd.read_pickle(entry / "grouped.pkl"), global_raw
+
+    def save(self, fingerprint, calc, grouped, raw_results):
+        """Guarda los valores brutos de compute_grouped_metrics y compute_all con su huella."""
+        entry = self.dir / fingerprint
+        entry.mkdir(parents=True, exist_ok=True)
+        grouped.to_pickle(entry / "grouped.pkl")
+        meta = {
+            "config_fingerprint": config_fingerprint(calc.config),
+            "raw_values": MetricsCalculator.raw_values(raw_results),
+        }
+        with open(entry / "global.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, default=_to_builtin)
+        print(f"[RawMetrics] 💾 Valores brutos guardados: {entry}")
+
+    def invalidate(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        print(f"[RawMetrics] 🗑️ Caché eliminada: {self.dir}")
+
+    # ------------------------------------------------------------------
+    # Re-puntuación de un análisis exportado
+    # ------------------------------------------------------------------
+    def rescore_results(self, results_dir, experiment_config, user_profile="novice"):
+        """
+        Reescribe grouped_metrics.csv, results.json/csv y group_results de una carpeta de
+        resultados de vr_analysis con los pesos, rangos y perfiles de experiment_config.
+        Solo cambian las columnas de puntuación; el resto del CSV (cuestionarios...) se conserva.
+        :raise ValueError: si la config cambia algo más que la puntuación o falta la entrada
+        """
+        results_dir = Path(results_dir)
+        with open(results_dir / MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if config_fingerprint(experiment_config) != manifest["config_fingerprint"]:
+            raise ValueError("La config cambia la definición de alguna métrica o los roles de eventos: "
+                             "hay que recalcular los valores brutos (vr_analysis).")
+        cached = self.load(manifest["fingerprint"])
+        if cached is None:
+            raise ValueError(f"No hay valores brutos en {self.dir} para {manifest['fingerprint']}")
+        grouped, global_raw = cached
+
+        calc = MetricsCalculator.from_prepared(None, {}, experiment_config, user_profile)
+        results_for_export = MetricsExporter.summarize(calc.rescore_all(global_raw))
+        exporter = MetricsExporter(results_for_export, output_dir=results_dir)
+        exporter.to_json("results.json")
+        exporter.to_csv("results.csv")
+        MetricsExporter.export_multiple([results_for_export], ["Global"], mode="json",
+                                        output_dir=results_dir, filename="group_results")
+
+        grouped_path = results_dir / "grouped_metrics.csv"
+        scores = calc.score_matrix(grouped)
+        # El CSV exportado se lee como texto para no reformatear las columnas que no cambian
+        csv_df = pd.read_csv(grouped_path, dtype=str, keep_default_na=False)
+        if len(csv_df) != len(scores):
+            raise ValueError(f"{grouped_path.name} no corresponde a los valores brutos guardados")
+        for col in scores.columns:
+            csv_df[col] = scores[col].to_numpy()
+        csv_df.to_csv(grouped_path, index=False)
+
+        print(f"[RawMetrics] ✅ {len(scores)} sesiones re-puntuadas en {results_dir} "
+              f"(global_score: {results_for_export['global_score']:.4f})")
+        return results_for_export
+
+    @staticmethod
+    def write_manifest(results_dir, fingerprint, experiment_config):
+        """Deja en la carpeta de resultados la huella con la que re-puntuarla después."""
+        manifest = {"fingerprint": fingerprint, "config_fingerprint": config_fingerprint(experiment_config)}
+        with open(Path(results_dir) / MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Caché de valores brutos de métricas")
+    arg_parser.add_argument("--rescore", metavar="ANALYSIS_DIR",
+                            help="Carpeta analysis_<ts> (o su results/) a re-puntuar")
+    arg_parser.add_argument("--config", help="experiment_config con los nuevos pesos / rangos (JSON)")
+    arg_parser.add_argument("--profile", default="novice", help="Perfil de usuario para la puntuación global")
+    arg_parser.add_argument("--invalidate", action="store_true", help="Borrar la caché")
+    args = arg_parser.parse_args()
+
+    cache = RawMetricsCache()
+    if args.invalidate:
+        cache.invalidate()
+    if args.rescore:
+        target = Path(args.rescore)
+        if (target / "results").is_dir():
+            target = target / "results"
+        config_path = Path(args.config) if args.config else target / "experiment_config_from_mongo.json"
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        cache.rescore_results(target, config, args.profile)
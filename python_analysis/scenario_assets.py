@@ -0,0 +1,158 @@
+"""
+Registro de ficheros de escenario (ideal_path_<mapa>.json / labyrinth_mesh_<mapa>.json).
+
+Cada fichero se lee y se convierte a arrays de numpy una sola vez por proceso; la entrada
+se invalida si cambia su mtime o su tamaño. Las métricas y los gráficos (incluidos los GIF,
+que redibujan el mapa en cada fotograma) comparten así el mismo objeto ya parseado.
+
+Los ficheros se buscan, en este orden, en:
+    1. SCENARIO_ASSETS_DIR (una o varias carpetas separadas por os.pathsep)
+    2. la carpeta de este paquete (python_analysis/, donde están los Maze*)
+    3. el directorio de trabajo (compatibilidad con el ideal_path.json "suelto" de antes)
+Primero el fichero específico del mapa en todas las carpetas y después el genérico
+(ideal_path.json / labyrinth_mesh.json).
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from python_analysis.geometry import SegmentIndex
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+class IdealPath:
+    """Camino ideal ya parseado: vértices (x, z), longitud total e índice de segmentos."""
+
+    def __init__(self, data):
+        self.data = data
+        pts = [[pt["x"], pt["z"]] for pt in data if "x" in pt and "z" in pt] if isinstance(data, list) else []
+        self.points = np.array(pts, dtype=float).reshape(-1, 2)
+        # np.float64 (no float de Python): con NEP 50 un float de Python dividido entre la distancia
+        # real en float32 daría un resultado float32
+        self.length = np.sum(np.sqrt(np.sum(np.diff(self.points, axis=0) ** 2, axis=1)))
+        self.index = SegmentIndex(self.points) if len(self.points) >= 2 else None
+
+
+class LabyrinthMesh:
+    """
+    Malla del laberinto ya parseada: triángulos (t, 3, 2) para la PolyCollection y aristas
+    de borde (e, 2, 2) para la LineCollection. Las colecciones de matplotlib no se pueden
+    compartir entre figuras, así que se guardan sus vértices y cada gráfico crea la suya.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        if not isinstance(data, dict):
+            data = {}
+        self.start_point = self._marker(data.get("start_point"))
+        self.end_point = self._marker(data.get("end_point"))
+        self.polygons = np.empty((0, 3, 2))
+        self.boundary_lines = np.empty((0, 2, 2))
+
+        if "vertices" not in data or "indices" not in data:
+            return
+        pts = np.array([[pt["x"], pt["z"]] for pt in data["vertices"] if "x" in pt and "z" in pt])
+        if len(pts) < 3:
+            return
+        indices = list(data["indices"])
+        triangles = np.array(indices[:len(indices) // 3 * 3], dtype=np.int64).reshape(-1, 3)
+        if len(triangles) == 0:
+            return
+        self.polygons = pts[triangles]
+
+        # Aristas (A,B) y (B,A) como una sola; las que aparecen una única vez son el borde del mesh.
+        # Se conserva el orden de primera aparición, como el recorrido original triángulo a triángulo.
+        edges = np.sort(np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+        _, first, counts = np.unique(edges, axis=0, return_index=True, return_counts=True)
+        boundary = np.sort(first[counts == 1])
+        self.boundary_lines = pts[edges[boundary]]
+
+    @staticmethod
+    def _marker(point):
+        if isinstance(point, dict) and "x" in point and "z" in point:
+            return point["x"], point["z"]
+        return None
+
+
+class ScenarioAssets:
+    KINDS = {"ideal_path": IdealPath, "labyrinth_mesh": LabyrinthMesh}
+
+    def __init__(self, search_dirs=None):
+        """
+        :param search_dirs: carpetas donde buscar (por defecto SCENARIO_ASSETS_DIR, el paquete y el CWD)
+        """
+        self._search_dirs = search_dirs
+        self._cache = {}  # ruta -> (mtime_ns, tamaño, asset)
+        self._lock = threading.Lock()
+
+    def search_dirs(self):
+        if self._search_dirs is not None:
+            return [Path(d) for d in self._search_dirs]
+        env = os.getenv("SCENARIO_ASSETS_DIR", "")
+        dirs = [Path(d) for d in env.split(os.pathsep) if d]
+        return dirs + [PACKAGE_DIR, Path.cwd()]
+
+    def find(self, kind, map_name):
+        """Ruta del fichero `kind` para el mapa (o el genérico); None si no hay ninguno."""
+        names = ([f"{kind}_{map_name}.json"] if map_name else []) + [f"{kind}.json"]
+        dirs = self.search_dirs()
+        for name in names:
+            for directory in dirs:
+                path = directory / name
+                if path.is_file():
+                    return path
+        return None
+
+    def get(self, kind, map_name):
+        """Asset parseado (IdealPath / LabyrinthMesh) o None si no existe el fichero."""
+        path = self.find(kind, map_name)
+        if path is None:
+            return None
+        stat = path.stat()
+        key = path.resolve()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+
+        with open(path, "r", encoding="utf-8") as f:
+            asset = self.KINDS[kind](json.load(f))
+        asset.path = path
+        with self._lock:
+            self._cache[key] = (stat.st_mtime_ns, stat.st_size, asset)
+        return asset
+
+    def fingerprint(self, kinds=None):
+        """
+        Huella del contenido de todos los ficheros de escenario que podría usar find() (cada
+        carpeta de búsqueda en orden, específicos y genéricos): cambia si se edita, añade o
+        borra alguno. La usa RawMetricsCache para no servir valores brutos calculados con otros.
+        """
+        digest = hashlib.sha256()
+        for i, directory in enumerate(self.search_dirs()):
+            for kind in kinds or self.KINDS:
+                if not directory.is_dir():
+                    continue
+                for path in sorted(directory.glob(f"{kind}*.json")):
+                    digest.update(f"{i}:{path.name}:".encode("utf-8"))
+                    digest.update(hashlib.sha256(path.read_bytes()).digest())
+        return digest.hexdigest()
+
+    def ideal_path(self, map_name):
+        return self.get("ideal_path", map_name)
+
+    def labyrinth_mesh(self, map_name):
+        return self.get("labyrinth_mesh", map_name)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Registro compartido por MetricsCalculator y SpatialVisualizer
+SCENARIO_ASSETS = ScenarioAssets()
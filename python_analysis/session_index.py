@@ -0,0 +1,199 @@
+import json
+
+import pandas as pd
+
+# session_id con el que MetricsCalculator rellena los eventos sin sesión
+MISSING_SESSION = "SESSION"
+# Columnas de LogParser / MetricsCalculator que no vienen del contexto del evento
+BASE_COLUMNS = {"timestamp", "user_id", "group_id", "session_id", "event_type", "event_name", "event_value",
+                "event_role", "context", "event_context"}
+
+
+def _is_missing(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+def _as_dict(value):
+    """Objeto de contexto que puede llegar como dict o como JSON string."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, dict) else None
+
+
+class SessionIndex:
+    """
+    Índice lateral de los eventos de sesión/configuración.
+    Se rellena durante LogParser.parse_logs (una sola pasada) para poder resolver
+    búsquedas por session_name o recuperar la config sin recorrer el DataFrame completo.
+    session_metadata() resume cada sesión (independent_variable, mapa, área de juego, grupo
+    y config) para las métricas agrupadas, la agrupación espacial y los informes.
+    """
+
+    INDEXED_EVENT_TYPES = {"config"}
+    INDEXED_EVENT_NAMES = {"session_start", "experiment_config"}
+
+    def __init__(self):
+        self.entries = []
+        self._json_cache = {}
+        self._metadata = None
+
+    def wants(self, event_type, event_name):
+        return event_type in self.INDEXED_EVENT_TYPES or event_name in self.INDEXED_EVENT_NAMES
+
+    def add(self, session_id, event_type, event_name, timestamp, context, group_id=None):
+        self.entries.append({
+            "session_id": session_id,
+            "group_id": group_id,
+            "event_type": event_type,
+            "event_name": event_name,
+            "timestamp": timestamp,
+            "context": context if isinstance(context, dict) else {},
+        })
+        self._metadata = None
+
+    @classmethod
+    def from_events(cls, events):
+        """Índice a partir de una tabla de eventos ya parseada (caché Parquet, lectura en paralelo...)."""
+        index = cls()
+        index.add_events(events)
+        return index
+
+    def add_events(self, events):
+        """
+        Indexa las filas de config/session_start de una tabla de eventos ya parseada: el contexto
+        se recompone con sus columnas expandidas, o con la columna 'context' (JSON) si el df se
+        parseó sin expandir ('event_context' si son los documentos sin parsear).
+        """
+        if events is None or events.empty:
+            return
+        mask = (events["event_type"].isin(self.INDEXED_EVENT_TYPES)
+                | events["event_name"].isin(self.INDEXED_EVENT_NAMES))
+        rows = events[mask.to_numpy(dtype=bool, na_value=False)]
+        context_columns = [c for c in rows.columns if c not in BASE_COLUMNS]
+        for record in rows.to_dict("records"):
+            # 'event_context': DataFrame armado a mano con los documentos de Mongo sin parsear
+            context = _as_dict(record.get("context", record.get("event_context")))
+            if context is None:
+                context = {c: record[c] for c in context_columns if not _is_missing(record[c])}
+            self.add(record.get("session_id"), record.get("event_type"), record.get("event_name"),
+                     record.get("timestamp"), context, record.get("group_id"))
+
+    def subset(self, session_ids):
+        """Índice con solo las entradas de estas sesiones (la parte de un proceso de parallel_metrics)."""
+        wanted = set(session_ids)
+        if MISSING_SESSION in wanted:
+            wanted.add(None)
+        index = SessionIndex()
+        index.entries = [e for e in self.entries if e["session_id"] in wanted]
+        return index
+
+    # ------------------------------------------------------------------
+    # Vista JSON (perezosa: solo se serializa lo que se consulta)
+    # ------------------------------------------------------------------
+    def context_json(self, pos):
+        if pos not in self._json_cache:
+            self._json_cache[pos] = json.dumps(self.entries[pos]["context"], default=str)
+        return self._json_cache[pos]
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def sessions_matching(self, session_name, event_types=("config", "session_start")):
+        """
+        Devuelve los session_id cuyos eventos config/session_start mencionan session_name,
+        ya sea en session.session_name o en cualquier parte de su contexto.
+        """
+        matches = set()
+        for pos, entry in enumerate(self.entries):
+            if entry["event_type"] not in event_types and entry["event_name"] not in event_types:
+                continue
+            ctx = entry["context"]
+            session_ctx = ctx.get("session") if isinstance(ctx.get("session"), dict) else ctx
+            if session_ctx.get("session_name") == session_name or session_name in self.context_json(pos):
+                matches.add(entry["session_id"])
+        matches.discard(None)
+        return matches
+
+    def configs(self):
+        return [e for e in self.entries if e["event_type"] == "config"]
+
+    def latest_config(self):
+        """Devuelve la entrada 'config' más reciente (o None)."""
+        configs = self.configs()
+        if not configs:
+            return None
+        try:
+            return max(configs, key=lambda e: e["timestamp"])
+        except TypeError:
+            return configs[-1]
+
+    # ------------------------------------------------------------------
+    # Metadatos por sesión
+    # ------------------------------------------------------------------
+    def session_metadata(self):
+        """
+        {session_id: {independent_variable, map_name, play_area_width, play_area_depth, group_id, config}}
+        Se calcula una vez (hasta el siguiente add). config es el contexto del primer evento de
+        configuración de la sesión (None si no hay).
+        """
+        if self._metadata is None:
+            by_session = {}
+            for entry in self.entries:
+                by_session.setdefault(entry["session_id"], []).append(entry)
+            self._metadata = {sid: self._resolve_session(entries) for sid, entries in by_session.items()}
+        return self._metadata
+
+    def metadata(self, session_id):
+        """Metadatos de una sesión ({} si no tiene eventos indexados)."""
+        metadata = self.session_metadata()
+        if session_id in metadata:
+            return metadata[session_id]
+        # Los eventos sin session_id llevan en MetricsCalculator la clave por defecto "SESSION"
+        return metadata.get(None, {}) if session_id == MISSING_SESSION else {}
+
+    @staticmethod
+    def _resolve_session(entries):
+        # independent_variable: misma prioridad que MetricsCalculator._independent_variable
+        # (clave en la raíz del contexto, p.ej. session_start; después el objeto 'session')
+        iv = None
+        for entry in entries:
+            iv = entry["context"].get("independent_variable")
+            if iv:
+                break
+        if not iv:
+            for entry in entries:
+                session = _as_dict(entry["context"].get("session"))
+                if session is not None and "independent_variable" in session:
+                    iv = session["independent_variable"]
+                    break
+
+        configs = [e for e in entries if e["event_type"] == "config" or e["event_name"] == "experiment_config"]
+        config = configs[0]["context"] if configs else None
+        session = (_as_dict(config.get("session")) or config) if config is not None else {}
+        group_ids = [e["group_id"] for e in entries if not _is_missing(e["group_id"])]
+
+        return {
+            "independent_variable": iv,
+            "map_name": session.get("map_name"),
+            "play_area_width": session.get("play_area_width"),
+            "play_area_depth": session.get("play_area_depth"),
+            "group_id": group_ids[0] if group_ids else None,
+            "config": config,
+        }
+
+    def condition_groups(self):
+        """
+        Sesiones con config agrupadas por condición: {(independent_variable, map_name): [session_id]}
+        (en el orden de aparición; "Unknown" / "" si la config no los trae).
+        """
+        groups = {}
+        for sid, meta in self.session_metadata().items():
+            if meta["config"] is None:
+                continue
+            session = _as_dict(meta["config"].get("session")) or meta["config"]
+            key = (session.get("independent_variable", "Unknown"), meta["map_name"] or "")
+            groups.setdefault(key, []).append(sid)
+        return groups
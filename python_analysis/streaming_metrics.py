@@ -0,0 +1,626 @@
+"""
+Métricas en vivo: versión incremental de MetricsCalculator para sesiones en curso.
+
+StreamingMetricsCalculator guarda por sesión (user_id, group_id, session_id) acumuladores
+de las métricas brutas de MetricsCalculator: contadores de roles y eventos, inicios de tarea
+abiertos (con su primera acción), sumas de duraciones y tiempos de reacción, primer/último
+timestamp, huecos de inactividad, bloques de la curva de aprendizaje, distancia recorrida y
+aciertos de mirada sobre el camino ideal. update(lote) solo recorre el lote: el coste es
+O(tamaño del lote), no de la sesión completa, y devuelve los valores actuales de las
+sesiones que aparecen en él.
+
+Diferencias con el cálculo completo:
+- Se supone que los eventos de cada sesión llegan en orden temporal (un lote puede mezclar
+  sesiones). Un evento más antiguo que el último de su sesión se cuenta, pero no parte los
+  huecos de inactividad ya sumados ni reabre tareas cerradas.
+- Las sumas (inactividad, distancia, duraciones, desviación de la curva de aprendizaje) se
+  acumulan en línea y pueden diferir del cálculo completo en los últimos decimales.
+- La mirada se compara con el camino ideal del mapa conocido cuando llega (el
+  experiment_config es el primer evento de la sesión).
+- success_after_restart empareja reinicios y éxitos dentro de la sesión completa
+  (user_id, group_id, session_id), no solo por session_id.
+"""
+from collections import Counter, deque
+
+import numpy as np
+import pandas as pd
+
+from python_analysis.grouped_metrics import SESSION_KEYS
+from python_analysis.log_parser import LogParser
+from python_analysis.metrics import CATEGORIES, CORE_ROLES, MetricsCalculator
+from python_analysis.scenario_assets import SCENARIO_ASSETS
+from python_analysis.session_index import SessionIndex
+
+KEY_DEFAULTS = {"user_id": "UNKNOWN", "group_id": "GROUP", "session_id": "SESSION"}
+NAT = np.iinfo(np.int64).min
+
+# Eventos que hay que tratar uno a uno (emparejamiento de tareas, primeros timestamps...)
+SEQUENTIAL_ROLES = {"action_success", "action_fail", "task_start", "task_end", "task_restart", "session_start"}
+SEQUENTIAL_NAMES = {"audio_triggered", "head_turn"}
+
+
+def _seconds(ns):
+    """Timedelta.total_seconds() de una diferencia en nanosegundos."""
+    return pd.Timedelta(int(ns), unit="ns").total_seconds()
+
+
+def _timestamps_ns(table):
+    if "timestamp" not in table.columns:
+        return np.full(len(table), NAT, dtype=np.int64)
+    # Nanosegundos UTC (los datetime64 sin zona se toman como UTC, igual que to_datetime(utc=True))
+    ts = table["timestamp"]
+    if isinstance(ts.dtype, pd.DatetimeTZDtype):
+        ts = ts.dt.tz_convert(None)
+    elif not pd.api.types.is_datetime64_dtype(ts.dtype):
+        ts = pd.to_datetime(ts, utc=True, errors="coerce").dt.tz_convert(None)
+    return ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+class SessionState:
+    """Acumuladores de una sesión."""
+
+    def __init__(self):
+        self.n_events = 0
+        self.roles = Counter()
+        self.names = Counter()
+
+        # Timestamps de todos los eventos, telemetría incluida
+        self.n_timestamps = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.inactivity_s = 0.0
+        self.first = {}  # "start", "action_success", "task_end", "audio_triggered", "head_turn" -> ns mínimo
+
+        # task_end: en minúsculas (success_rate, progression) y exacto (voluntary_play_time)
+        self.task_ends = 0
+        self.task_successes = 0
+        self.last_exact_success = None
+
+        # Emparejamiento i-ésimo task_start con i-ésimo task_end: inicios abiertos [ts, primera acción]
+        # y fines que llegaron antes que su inicio
+        self.open_starts = deque()
+        self.pending_ends = deque()
+        self.last_action = None
+        self.durations = [0.0, 0]
+        self.reactions = [0.0, 0]
+        self.explicit = {"duration_ms": [0.0, 0], "reaction_time_ms": [0.0, 0]}
+
+        # success_after_restart: reinicios aún sin un éxito posterior
+        self.restarts = 0
+        self.restarts_resolved = 0
+        self.pending_restarts = []
+
+        # Curva de aprendizaje: bloque en curso [aciertos, acciones] y bloques cerrados
+        self.block = [0, 0]
+        self.n_blocks = 0
+        self.blocks_sum = 0.0
+        self.blocks_sq_sum = 0.0
+        self.first_block = None
+        self.last_block = None
+
+        # audio_performance_gain: task_end y éxitos con audio_enabled True / False
+        self.audio = {True: [0, 0], False: [0, 0]}
+
+        # Métricas genéricas de config: target_event -> [nº eventos, nº valores, suma, mín, máx]
+        self.generic = {}
+
+        # Telemetría espacial
+        self.scenario_id = None
+        self.n_moves = 0
+        self.n_path_points = 0
+        self.path_length = 0.0
+        self.last_position = None
+        self.gaze_total = 0
+        self.gaze_hits = 0
+
+    def start_task(self, ts):
+        # Una acción con el mismo timestamp que el inicio cuenta aunque haya llegado antes (merge_asof)
+        action = ts if ts == self.last_action else None
+        if self.pending_ends:
+            self._close_task(ts, action, self.pending_ends.popleft())
+        else:
+            self.open_starts.append([ts, action])
+
+    def end_task(self, ts):
+        if self.open_starts:
+            start, action = self.open_starts.popleft()
+            self._close_task(start, action, ts)
+        else:
+            self.pending_ends.append(ts)
+
+    def _close_task(self, start, action, end):
+        # Sanity check: Start must be before End
+        if start > end:
+            return
+        self.durations[0] += _seconds(end - start) * 1000.0
+        self.durations[1] += 1
+        if action is not None and action <= end:
+            self.reactions[0] += _seconds(action - start) * 1000.0
+            self.reactions[1] += 1
+
+    def add_action(self, ts, success, block_size):
+        # La primera acción posterior a cada inicio abierto: los más recientes aún no la tienen
+        for entry in reversed(self.open_starts):
+            if entry[1] is not None:
+                break
+            if entry[0] <= ts:
+                entry[1] = ts
+
+        self.last_action = ts
+        self.block[0] += success
+        self.block[1] += 1
+        if self.block[1] == block_size:
+            value = self.block[0] / self.block[1]
+            self.n_blocks += 1
+            self.blocks_sum += value
+            self.blocks_sq_sum += value * value
+            if self.first_block is None:
+                self.first_block = value
+            self.last_block = value
+            self.block = [0, 0]
+
+    def add_success(self, ts):
+        if ts == NAT:
+            return
+        self.restarts_resolved += sum(1 for r in self.pending_restarts if r < ts)
+        self.pending_restarts = [r for r in self.pending_restarts if r >= ts]
+
+    def learning_curve(self):
+        """(nº de bloques, media, desviación típica, primer bloque, último bloque); el bloque incompleto cuenta."""
+        n, total, sq_total = self.n_blocks, self.blocks_sum, self.blocks_sq_sum
+        first, last = self.first_block, self.last_block
+        if self.block[1] > 0:
+            value = self.block[0] / self.block[1]
+            n, total, sq_total, last = n + 1, total + value, sq_total + value * value, value
+            if first is None:
+                first = value
+        if n == 0:
+            return 0, np.nan, np.nan, None, None
+        mean = total / n
+        return n, mean, np.sqrt(max(sq_total / n - mean * mean, 0.0)), first, last
+
+
+class StreamingMetricsCalculator:
+    def __init__(self, experiment_config=None, user_profile="novice", block_size=5,
+                 inactivity_threshold=5, gaze_threshold=0.3):
+        """
+        Calculadora incremental: update(lote) -> métricas actuales de las sesiones del lote.
+        :param block_size: acciones por bloque de la curva de aprendizaje (como learning_curve)
+        :param inactivity_threshold: segundos a partir de los cuales un hueco cuenta como inactividad
+        :param gaze_threshold: distancia máxima al camino ideal para gaze_on_path_ratio
+        """
+        self.config = experiment_config or {}
+        self.roles_cfg = self.config.get("event_roles", {})
+        self.block_size = block_size
+        self.inactivity_threshold = inactivity_threshold
+        self.gaze_threshold = gaze_threshold
+
+        # Normalización, ponderación y puntuación global: las mismas que el cálculo completo
+        self.scorer = MetricsCalculator.from_prepared(None, {}, self.config, user_profile)
+        self.metric_names = list(self.scorer._available_metric_functions())
+        self.generic_targets = {
+            params["target_event"]
+            for cat_cfg in self.scorer.metrics_cfg.values() for name, params in cat_cfg.items()
+            if name not in self.metric_names and params.get("target_event") and params.get("aggregation")
+        }
+
+        self.sessions = {}  # (user_id, group_id, session_id) -> SessionState
+        self._keys = []
+        self._positions = {}  # clave -> índice en self._keys
+        self._audio_column = False
+        self._parser = None
+        # Metadatos de sesión (independent_variable...) de los eventos config/session_start recibidos
+        self.session_index = SessionIndex()
+
+    # ----------------------------------------------------------------------
+    # Entrada de lotes
+    # ----------------------------------------------------------------------
+    def update(self, batch):
+        """
+        Incorpora un lote de eventos.
+        :param batch: lista de logs (documentos de Mongo), dict de tablas de LogParser.parse_log_tables
+                      o DataFrame de eventos con la telemetría mezclada (como el df de MetricsCalculator)
+        :return: DataFrame con las métricas actuales de las sesiones que aparecen en el lote
+        """
+        touched = []
+        if isinstance(batch, pd.DataFrame):
+            # Telemetría mezclada con los eventos: sus timestamps ya están en el df
+            self.session_index.add_events(batch)
+            ids = self._row_ids(batch, touched)
+            names = batch["event_name"].to_numpy(dtype=object)
+            parts = [("events", batch, ids, True)]
+            for name in ("movement_frame", "gaze_frame"):
+                mask = names == name
+                parts.append((name, batch[mask], ids[mask], False))
+        else:
+            if isinstance(batch, dict):
+                self.session_index.add_events(batch.get("events"))
+            else:
+                if self._parser is None:
+                    self._parser = LogParser.__new__(LogParser)  # sin conexión a Mongo
+                batch = self._parser.parse_log_tables(list(batch), session_index=self.session_index)
+            parts = [(name, table, self._row_ids(table, touched), True)
+                     for name, table in batch.items() if table is not None and len(table)]
+
+        adders = {"events": self._add_events, "movement_frame": self._add_movement, "gaze_frame": self._add_gaze}
+        for name, table, ids, _ in parts:
+            if name in adders and len(table):
+                adders[name](table, ids)
+
+        timestamps = [(ids, _timestamps_ns(table)) for _, table, ids, with_timestamps in parts
+                      if with_timestamps and len(table)]
+        if timestamps:
+            self._add_timestamps(np.concatenate([ids for ids, _ in timestamps]),
+                                 np.concatenate([ts for _, ts in timestamps]))
+        return self.snapshot(list(dict.fromkeys(touched)))
+
+    def _row_ids(self, table, touched):
+        """Índice (en self._keys) de la sesión de cada fila; crea el estado de las sesiones nuevas."""
+        columns = []
+        for col, default in KEY_DEFAULTS.items():
+            if col in table.columns:
+                values = table[col].to_numpy(dtype=object)
+                columns.append(np.where(pd.isna(values), default, values))
+            else:
+                columns.append(np.full(len(table), default, dtype=object))
+
+        ids = np.empty(len(table), dtype=np.int64)
+        for i, key in enumerate(zip(*columns)):
+            position = self._positions.get(key)
+            if position is None:
+                position = self._positions[key] = len(self._keys)
+                self._keys.append(key)
+                self.sessions[key] = SessionState()
+            ids[i] = position
+        touched.extend(self._keys[i] for i in np.unique(ids))
+        return ids
+
+    def _state(self, session_idx):
+        return self.sessions[self._keys[session_idx]]
+
+    def _resolve_role(self, ev):
+        if ev in CORE_ROLES:
+            return ev
+        return self.roles_cfg.get(ev, "custom_event")
+
+    # ----------------------------------------------------------------------
+    # Acumuladores
+    # ----------------------------------------------------------------------
+    def _add_timestamps(self, ids, ts):
+        for idx, n in zip(*np.unique(ids, return_counts=True)):
+            self._state(idx).n_timestamps += int(n)
+
+        valid = ts != NAT
+        ids, ts = ids[valid], ts[valid]
+        order = np.lexsort((ts, ids))
+        ids, ts = ids[order], ts[order]
+        bounds = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1], True])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            state, seg = self._state(ids[start]), ts[start:stop]
+            gaps = np.diff(seg) if state.last_ts is None else np.diff(np.r_[state.last_ts, seg])
+            gaps = gaps / 1e9
+            state.inactivity_s += float(gaps[gaps > self.inactivity_threshold].sum())
+            state.first_ts = seg[0] if state.first_ts is None else min(state.first_ts, seg[0])
+            state.last_ts = seg[-1] if state.last_ts is None else max(state.last_ts, seg[-1])
+
+    def _add_events(self, events, ids):
+        names = events["event_name"].astype(object).to_numpy()
+        roles = np.array([self._resolve_role(ev) for ev in names], dtype=object)
+
+        for idx, n in zip(*np.unique(ids, return_counts=True)):
+            self._state(idx).n_events += int(n)
+        for attr, labels in (("roles", roles), ("names", names)):
+            codes, uniques = pd.factorize(labels, use_na_sentinel=False)
+            pairs, counts = np.unique(ids * len(uniques) + codes, return_counts=True)
+            for pair, n in zip(pairs, counts):
+                getattr(self._state(pair // len(uniques)), attr)[uniques[pair % len(uniques)]] += int(n)
+
+        # Duración / tiempo de reacción explícitos (si el parser los trae)
+        for col, acc in (("duration_ms", "duration_ms"), ("reaction_time_ms", "reaction_time_ms")):
+            if col not in events.columns:
+                continue
+            vals = pd.to_numeric(events[col], errors="coerce").to_numpy(dtype=float)
+            present = ~np.isnan(vals)
+            for idx, total, n in self._sums_by_id(ids[present], vals[present]):
+                self._state(idx).explicit[acc][0] += total
+                self._state(idx).explicit[acc][1] += n
+
+        self._audio_column |= "audio_enabled" in events.columns
+        audio = events["audio_enabled"].to_numpy(dtype=object) if "audio_enabled" in events.columns else None
+
+        # Mapa de la sesión: update ya ha añadido los config del lote al SessionIndex
+        for idx in np.unique(ids[names == "experiment_config"]):
+            state = self._state(idx)
+            if state.scenario_id is None:
+                state.scenario_id = self.session_index.metadata(self._keys[idx][2]).get("map_name") or ""
+
+        rows = np.flatnonzero(np.isin(roles, list(SEQUENTIAL_ROLES)) |
+                              np.isin(names, list(SEQUENTIAL_NAMES | self.generic_targets)))
+        if len(rows) == 0:
+            return
+        ts = _timestamps_ns(events)[rows]
+        values = events["event_value"].to_numpy(dtype=object)[rows] if "event_value" in events.columns \
+            else np.full(len(rows), None, dtype=object)
+        numeric = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+        # Los eventos se tratan en orden de llegada (se suponen ordenados en el tiempo dentro de la sesión)
+        for pos, row in enumerate(rows):
+            state, role, name, t, value = self._state(ids[row]), roles[row], names[row], ts[pos], values[pos]
+
+            if role in ("session_start", "task_start"):
+                self._first(state, "start", t)
+            if name in ("audio_triggered", "head_turn"):
+                self._first(state, name, t)
+            if name in self.generic_targets:
+                acc = state.generic.setdefault(name, [0, 0, 0.0, np.inf, -np.inf])
+                acc[0] += 1
+                if not np.isnan(numeric[pos]):
+                    acc[1] += 1
+                    acc[2] += numeric[pos]
+                    acc[3] = min(acc[3], numeric[pos])
+                    acc[4] = max(acc[4], numeric[pos])
+
+            if t == NAT:
+                if role == "task_restart":
+                    state.restarts += 1
+                if role == "task_end":
+                    self._count_task_end(state, value, audio[row] if audio is not None else None)
+                continue
+
+            if role == "task_start":
+                state.start_task(t)
+            elif role in ("action_success", "action_fail"):
+                if role == "action_success":
+                    self._first(state, "action_success", t)
+                state.add_action(t, role == "action_success", self.block_size)
+            elif role == "task_restart":
+                state.restarts += 1
+                state.pending_restarts.append(t)
+            elif role == "task_end":
+                self._first(state, "task_end", t)
+                state.end_task(t)
+                if self._count_task_end(state, value, audio[row] if audio is not None else None):
+                    state.add_success(t)
+                if value == "success":
+                    state.last_exact_success = t if state.last_exact_success is None \
+                        else max(state.last_exact_success, t)
+
+    @staticmethod
+    def _first(state, name, ts):
+        if ts != NAT and (name not in state.first or ts < state.first[name]):
+            state.first[name] = ts
+
+    @staticmethod
+    def _count_task_end(state, value, audio):
+        """Cuenta un task_end; devuelve si es un éxito (event_value en minúsculas == "success")."""
+        success = str(value).lower() == "success"
+        state.task_ends += 1
+        state.task_successes += success
+        for flag in (True, False):
+            if audio == flag:
+                state.audio[flag][0] += 1
+                state.audio[flag][1] += success
+        return success
+
+    @staticmethod
+    def _sums_by_id(ids, values):
+        """(sesión, suma, nº) de values agrupados por sesión."""
+        if len(ids) == 0:
+            return []
+        uniques, codes = np.unique(ids, return_inverse=True)
+        return zip(uniques, np.bincount(codes, weights=values), np.bincount(codes))
+
+    def _segments(self, ids, mask):
+        """Filas válidas agrupadas por sesión, conservando el orden de llegada: [(sesión, posiciones)]."""
+        rows = np.flatnonzero(mask)
+        rows = rows[np.argsort(ids[rows], kind="stable")]
+        bounds = np.flatnonzero(np.r_[True, ids[rows][1:] != ids[rows][:-1], True]) if len(rows) else [0]
+        return [(ids[rows[a]], rows[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def _add_movement(self, moves, ids):
+        for idx, n in zip(*np.unique(ids, return_counts=True)):
+            self._state(idx).n_moves += int(n)
+        if "position_x" not in moves.columns or "position_z" not in moves.columns:
+            return
+
+        rx = pd.to_numeric(moves["position_x"], errors="coerce").to_numpy(dtype=float)
+        rz = pd.to_numeric(moves["position_z"], errors="coerce").to_numpy(dtype=float)
+        for idx, rows in self._segments(ids, ~np.isnan(rx) & ~np.isnan(rz)):
+            state = self._state(idx)
+            pts = np.column_stack((rx[rows], rz[rows]))
+            if state.last_position is not None:
+                pts = np.vstack((state.last_position, pts))
+            state.path_length += float(np.sum(np.sqrt(np.sum(np.diff(pts, axis=0) ** 2, axis=1))))
+            state.n_path_points += len(rows)
+            state.last_position = pts[-1]
+
+    def _add_gaze(self, gazes, ids):
+        bx = "hit_position_x" if "hit_position_x" in gazes.columns else "hit_point_x"
+        bz = "hit_position_z" if "hit_position_z" in gazes.columns else "hit_point_z"
+        if bx not in gazes.columns or bz not in gazes.columns:
+            return
+
+        gx = pd.to_numeric(gazes[bx], errors="coerce").to_numpy(dtype=float)
+        gz = pd.to_numeric(gazes[bz], errors="coerce").to_numpy(dtype=float)
+        valid = ~np.isnan(gx) & ~np.isnan(gz)
+
+        # Un único within por mapa para todas las sesiones del lote que lo usan
+        by_scenario = {}
+        for idx, rows in self._segments(ids, valid):
+            state = self._state(idx)
+            state.gaze_total += len(rows)
+            by_scenario.setdefault(state.scenario_id or "", []).append((state, rows))
+        for scenario_id, parts in by_scenario.items():
+            ideal = SCENARIO_ASSETS.ideal_path(scenario_id)
+            if ideal is None or ideal.index is None:
+                continue
+            rows = np.concatenate([r for _, r in parts])
+            hits = ideal.index.within(gx[rows], gz[rows], self.gaze_threshold)
+            bounds = np.cumsum([0] + [len(r) for _, r in parts])
+            for (state, _), a, b in zip(parts, bounds[:-1], bounds[1:]):
+                state.gaze_hits += int(hits[a:b].sum())
+
+    # ----------------------------------------------------------------------
+    # Valores actuales
+    # ----------------------------------------------------------------------
+    def _path_efficiency(self, s):
+        ideal = SCENARIO_ASSETS.ideal_path(s.scenario_id or "")
+        if ideal is None or not isinstance(ideal.data, list) or len(ideal.data) < 2 or len(ideal.points) < 2:
+            return None
+        if s.n_moves < 2 or s.n_path_points < 2:
+            return None
+        if s.path_length <= 0:
+            return 0.0
+        return float(min(1.0, ideal.length / s.path_length))
+
+    def _gaze_on_path_ratio(self, s):
+        ideal = SCENARIO_ASSETS.ideal_path(s.scenario_id or "")
+        if ideal is None or not isinstance(ideal.data, list) or len(ideal.data) < 2:
+            return None
+        if s.gaze_total == 0:
+            return 0.0
+        if ideal.index is None:
+            return None
+        return float(s.gaze_hits / s.gaze_total)
+
+    @staticmethod
+    def _mean(acc):
+        return float(acc[0] / acc[1]) if acc[1] > 0 else np.nan
+
+    def raw_metrics(self, key):
+        """Valores brutos actuales de las métricas integradas para la sesión `key`."""
+        s = self.sessions[key]
+        hits, fails = s.roles["action_success"], s.roles["action_fail"]
+        span = _seconds(s.last_ts - s.first_ts) if s.first_ts is not None else np.nan
+
+        efficiency = self._path_efficiency(s)
+        fallback = float(efficiency) if efficiency is not None else 0.0
+        n_blocks, curve_mean, curve_std, first_block, last_block = s.learning_curve()
+
+        reaction = self._mean(s.explicit["reaction_time_ms"]) if s.explicit["reaction_time_ms"][1] \
+            else self._mean(s.reactions)
+        duration = self._mean(s.explicit["duration_ms"]) if s.explicit["duration_ms"][1] \
+            else self._mean(s.durations)
+
+        voluntary = 0.0
+        if s.last_exact_success is not None and s.last_ts is not None:
+            diff = _seconds(s.last_ts - s.last_exact_success)
+            if diff > 2.0:
+                voluntary = diff
+
+        start = s.first.get("start")
+        reached = s.first.get("action_success", s.first.get("task_end"))
+        first_success = _seconds(reached - start) if start is not None and reached is not None else np.nan
+
+        sound = None
+        audio_ts, head_ts = s.first.get("audio_triggered"), s.first.get("head_turn")
+        if s.names["audio_triggered"] and s.names["head_turn"] and audio_ts is not None \
+                and head_ts is not None and head_ts > audio_ts:
+            sound = _seconds(head_ts - audio_ts)
+
+        errors = s.roles["navigation_error"] + fails
+        if errors == 0 and efficiency is not None and efficiency > 0:
+            errors = max(0, int((1.0 - efficiency) * 10))
+
+        return {
+            "hit_ratio": hits / (hits + fails) if s.n_events and hits + fails > 0 else 0.0,
+            "precision": hits / (hits + fails) if hits + fails > 0 else np.nan,
+            "success_rate": s.task_successes / s.task_ends if s.task_ends else np.nan,
+            "learning_curve_mean": float(curve_mean) if n_blocks else fallback,
+            "avg_reaction_time_ms": reaction,
+            "avg_task_duration_ms": duration,
+            "time_per_success_s": span / hits if hits else np.nan,
+            "retries_after_end": s.roles["task_restart"],
+            "voluntary_play_time_s": voluntary,
+            "aid_usage": s.roles["help_event"],
+            "inactivity_time_s": s.inactivity_s,
+            "first_success_time_s": first_success,
+            "sound_localization_time_s": sound,
+            "activity_level_per_min": s.n_timestamps / (span / 60) if span / 60 > 0 else np.nan,
+            "progression": s.task_successes,
+            "success_after_restart": s.restarts_resolved / s.restarts if s.restarts else 0.0,
+            "navigation_errors": errors,
+            "aim_errors": fails,
+            "task_duration_success": duration,
+            "task_duration_fail": duration,
+            "interface_errors": s.names["ui_error"],
+            "learning_stability": 1.0 / (1.0 + curve_std) if n_blocks >= 2 else fallback,
+            "error_reduction_rate": last_block - first_block if n_blocks >= 2 else fallback,
+            "audio_performance_gain": self._audio_gain(s),
+            "path_efficiency": efficiency,
+            "gaze_on_path_ratio": self._gaze_on_path_ratio(s),
+        }
+
+    def _audio_gain(self, s):
+        if not self._audio_column:
+            return 0.0
+        (ends_with, succ_with), (ends_without, succ_without) = s.audio[True], s.audio[False]
+        if ends_with and ends_without and succ_without > 0:
+            score_with, score_without = succ_with / ends_with, succ_without / ends_without
+            return (score_with - score_without) / score_without
+        return 0.0
+
+    @staticmethod
+    def _generic_value(s, target_event, aggregation):
+        """Igual que MetricsCalculator._calculate_generic_metric con los acumuladores de la sesión."""
+        count, n_values, total, low, high = s.generic.get(target_event, [0, 0, 0.0, np.inf, -np.inf])
+        if s.n_events == 0 or count == 0:
+            return 0.0
+        agg_lower = aggregation.lower()
+        if agg_lower == "count":
+            return float(count)
+        if n_values == 0:
+            return 0.0
+        if agg_lower in ("average", "mean"):
+            return float(total / n_values)
+        return {"sum": float(total), "max": float(high), "min": float(low)}.get(agg_lower, 0.0)
+
+    def _row(self, key):
+        """
+        Fila como las de compute_grouped_metrics: claves, métricas brutas, puntuaciones (si hay
+        config) e independent_variable (del índice de sesiones).
+        """
+        s = self.sessions[key]
+        raw = self.raw_metrics(key)
+        entry = dict(zip(SESSION_KEYS, key))
+        entry.update(raw)
+        if self.scorer.metrics_cfg:
+            self._add_scores(entry, s, raw)
+        iv_val = self.session_index.metadata(key[2]).get("independent_variable")
+        entry["independent_variable"] = iv_val if iv_val else "N/A"
+        return entry
+
+    def _add_scores(self, entry, s, raw):
+        """Valores saneados de las métricas de config y puntuaciones de categoría y global."""
+
+        def raw_value_of(metric_name, params):
+            if metric_name in raw:
+                return raw[metric_name]
+            if params.get("target_event") and params.get("aggregation"):
+                return self._generic_value(s, params["target_event"], params["aggregation"])
+            return None
+
+        cat_scores, valid_cats = {}, {}
+        for cat_name in CATEGORIES:
+            cat_result = self.scorer._score_category(cat_name, raw_value_of)
+            cat_scores[cat_name] = cat_result
+            valid_cats[cat_name] = len(cat_result) > 1
+            for metric_key, val_dict in cat_result.items():
+                if metric_key == "score":
+                    continue
+                # Valor ya saneado (NaN -> 0.0); las métricas de config llevan el prefijo de la categoría,
+                # como en compute_grouped_metrics
+                final_key = metric_key
+                if metric_key not in raw and not metric_key.startswith(cat_name):
+                    final_key = f"{cat_name}_{metric_key}"
+                entry[final_key] = val_dict["raw"]
+            entry[f"{cat_name}_score"] = cat_result["score"]
+        entry["global_score"] = self.scorer.compute_global_score(cat_scores, valid_cats)
+
+    def snapshot(self, keys=None):
+        """
+        Métricas actuales por sesión.
+        :param keys: sesiones (user_id, group_id, session_id) a incluir; por defecto todas
+        """
+        keys = self._keys if keys is None else keys
+        return pd.DataFrame([self._row(key) for key in keys])
@@ -13,51 +13,27 @@ los analiza y genera automáticamente:
 import pandas as pd
 import shutil
 from python_analysis.log_parser import LogParser
+from python_analysis.log_cache import LogCache
 from python_analysis.metrics import MetricsCalculator
 from python_analysis.exporter import MetricsExporter
+from python_analysis.raw_metrics_cache import RawMetricsCache
+from python_analysis.session_index import SessionIndex
 from python_visualization.visualize_groups import Visualizer
 from python_visualization.spatial_plotter import SpatialVisualizer
 from python_visualization.pdf_reporter import PDFReport
 from datetime import datetime
 import os
+import copy
 import json
 from pathlib import Path
 
 # ============================================================
-# 1️⃣ Conectar con MongoDB y cargar logs
+# 1️⃣ Conectar con MongoDB y extraer config (Log vs Local override)
 # ============================================================
 
 # Conectando con parámetros del .env (gestión automática en LogParser)
 parser = LogParser()
 print(f"🔗 Conectando a MongoDB → URI: {parser.mongo_uri} | DB: {parser.db_name} | COL: {parser.collection_name}")
-logs = parser.fetch_logs()
-
-# df sin expandir → recuperar config
-df_raw = parser.parse_logs(logs, expand_context=False)
-
-# df expandido → métricas
-df = parser.parse_logs(logs, expand_context=True)
-
-# Buscar cuestionarios (SUS) antes de cerrar conexión
-quest_data = []
-try:
-    quests_col = parser.client[parser.db_name]["questionnaires"]
-    quest_data = list(quests_col.find({}))
-except Exception as e:
-    print(f"⚠️ Warning: Podría no haber cuestionarios. {e}")
-
-parser.close()
-
-if df.empty:
-    print("⚠️  No se encontraron logs en Mongo.")
-    exit()
-
-print(f"✅ {len(df)} documentos cargados desde Mongo.\n")
-
-
-# ============================================================
-# 2️⃣ Extraer config (Log vs Local override)
-# ============================================================
 
 print("⚙️  Leyendo configuración del experimento...\n")
 
@@ -73,67 +49,32 @@ if os.environ.get("FORCE_LOCAL_CONFIG", "false").lower() == "true":
     else:
         print(f"❌  No se encontró la configuración local en {config_path}")
 
-# Fallback/Default: Extract from logs
+# Fallback/Default: Extract from logs (solo se descarga la config más reciente)
 if experiment_config is None:
-    configs = [entry for entry in logs if entry.get("event_type") == "config"]
-    if configs:
-        # Ordenar por timestamp para asegurar que usamos la ÚLTIMA (más reciente)
-        # Asumimos que timestamp es comparable (datetime o string ISO)
-        try:
-            configs.sort(key=lambda x: x.get("timestamp", ""))
-            latest_config_log = configs[-1]
-            experiment_config = latest_config_log.get("event_context")
-            print(f"✅ Configuración cargada desde logs (La más reciente: {latest_config_log.get('timestamp')})")
-        except Exception as e:
-            print(f"⚠️ Error ordenando configs, usando la última encontrada: {e}")
-            experiment_config = configs[-1].get("event_context")
+    latest_config_log = parser.fetch_latest_config()
+    if latest_config_log is not None:
+        experiment_config = latest_config_log.get("event_context")
+        print(f"✅ Configuración cargada desde logs (La más reciente: {latest_config_log.get('timestamp')})")
+
+# ------------------------------------------------------------
+# FILTRADO POR SESSION_NAME (resuelto en Mongo)
+# ------------------------------------------------------------
+# Objetivo: Analizar SOLO las sesiones que coincidan con el session_name del config actual
+# para evitar mezclar experimentos distintos (ej: "Experiment_A" vs "Experiment_B").
+# Fase 1: resolver los session_id a partir de los documentos 'config'/'session_start'.
+# Fase 2: descargar solo los eventos de esas sesiones.
+log_query = {}
+valid_sessions = set()
 
 if experiment_config is not None:
     print("✅ Config cargada correctamente.\n")
 
-    # ------------------------------------------------------------
-    # FILTRADO POR SESSION_NAME
-    # ------------------------------------------------------------
-    # Objetivo: Analizar SOLO las sesiones que coincidan con el session_name del config actual
-    # para evitar mezclar experimentos distintos (ej: "Experiment_A" vs "Experiment_B")
-
     target_session_name = experiment_config.get("session", {}).get("session_name")
 
     if target_session_name:
         print(f"🎯 Target Session Name: '{target_session_name}' (from config)")
 
-        # Estrategia: Buscar en los logs 'config' o 'session_start' qué session_ids tienen este nombre
-        # IMPORTANTE: Usamos df_raw porque tiene la columna 'context' como string JSON.
-        # df (el expandido) NO tiene 'context' porque lo expandió en columnas.
-
-        # 1. Buscar en configs (usando df_raw)
-        matching_configs = []
-        if "context" in df_raw.columns:
-             matching_configs = df_raw[
-                (df_raw["event_type"] == "config") &
-                (df_raw["context"].fillna("").apply(lambda x: target_session_name in str(x)))
-            ]["session_id"].unique()
-
-        # 2. Buscar en session_start (usando df_raw)
-        matching_starts = []
-        if "context" in df_raw.columns:
-            matching_starts = df_raw[
-                (df_raw["event_type"] == "session_start") &
-                (df_raw["context"].fillna("").apply(lambda x: target_session_name in str(x)))
-            ]["session_id"].unique()
-
-        # 3. Fallback: Si df_raw no funciona, buscar en df expandido (columna 'session' si existe)
-        matching_expanded = []
-        if "session" in df.columns: # A veces 'session' se expande como columna si el json lo tenía
-             matching_expanded = df[
-                df["session"].apply(lambda x: isinstance(x, dict) and x.get("session_name") == target_session_name if isinstance(x, dict) else False)
-             ]["session_id"].unique()
-        elif "session_session_name" in df.columns: # Flattened key pattern
-             matching_expanded = df[df["session_session_name"] == target_session_name]["session_id"].unique()
-
-
-        # Unir todos los session_ids válidos
-        valid_sessions = set(matching_configs) | set(matching_starts) | set(matching_expanded)
+        valid_sessions = parser.find_session_ids(target_session_name)
 
         # Si no encontramos nada con esos métodos, intentamos mirar si el propio config actual tiene session_id
         current_config_sid = experiment_config.get("session_id")
@@ -141,10 +82,8 @@ if experiment_config is not None:
             valid_sessions.add(current_config_sid)
 
         if valid_sessions:
-            original_count = df["session_id"].nunique()
-            df = df[df["session_id"].isin(valid_sessions)]
-            filtered_count = df["session_id"].nunique()
-            print(f"🧹 Filtrando logs... Se mantienen {filtered_count} sesiones de {original_count} totales.\n")
+            log_query = LogParser.session_query(valid_sessions)
+            print(f"🧹 Filtrando logs en Mongo... Se descargan solo {len(valid_sessions)} sesiones.\n")
         else:
             print(f"⚠️ No se encontraron sesiones coincidiendo con '{target_session_name}' en los logs. Mostrando todo.\n")
     else:
@@ -154,9 +93,56 @@ else:
     print("⚠️  No existe configuración en los logs y no se forzó local.\n")
 
 
+# ============================================================
+# 2️⃣ Cargar logs del experimento
+# ============================================================
+
+# Lectura por lotes: nunca se materializa la colección completa como lista de dicts.
+# Una sola pasada de parseo genera las tablas (eventos discretos + telemetría densa por
+# tipo de frame).
+batch_size = int(os.getenv("FETCH_BATCH_SIZE", "5000"))
+fetch_workers = int(os.getenv("FETCH_WORKERS", "1"))
+if os.getenv("LOG_CACHE", "false").lower() in ("1", "true", "yes"):
+    # Caché Parquet local: solo se descargan los documentos nuevos o las sesiones modificadas
+    cache = LogCache(parser)
+    cache.sync(valid_sessions or None, batch_size=batch_size)
+    frame_tables = cache.load(valid_sessions or None)
+elif fetch_workers > 1:
+    # Lectura particionada (por sesiones o rangos de _id) con varios hilos
+    frame_tables = parser.parallel_log_tables(workers=fetch_workers, batch_size=batch_size,
+                                              session_ids=valid_sessions or None)
+else:
+    frame_tables = parser.parse_log_table_batches(parser.iter_logs(query=log_query, batch_size=batch_size))
+# df → eventos discretos (métricas); frame_tables → movement_frame / gaze_frame / eye_frame
+df = frame_tables.pop("events")
+
+# Buscar cuestionarios (SUS) antes de cerrar conexión
+quest_data = []
+try:
+    quests_col = parser.client[parser.db_name]["questionnaires"]
+    quest_data = list(quests_col.find({}))
+except Exception as e:
+    print(f"⚠️ Warning: Podría no haber cuestionarios. {e}")
+
+parser.close()
+
+n_frames = sum(len(t) for t in frame_tables.values())
+if df.empty and n_frames == 0:
+    print("⚠️  No se encontraron logs en Mongo.")
+    exit()
+
+print(f"✅ {len(df) + n_frames} documentos cargados desde Mongo "
+      f"({len(df)} eventos + {n_frames} frames de telemetría).\n")
+
 # Eliminar los eventos de configuración web puros para que no cuenten como un participante fantasma
 df = df[df["user_id"] != "WEB_CONFIG"]
 
+# Índice de metadatos por sesión (independent_variable, mapa, área de juego, grupo, config), una
+# sola vez para métricas, mapas espaciales e informe. Se construye con las filas config /
+# session_start de la tabla de eventos: así sirve igual para la caché Parquet, la lectura en
+# paralelo y los volcados
+session_index = SessionIndex.from_events(df)
+
 # ============================================================
 # 3️⃣ Resumen de sesiones y usuarios
 # ============================================================
@@ -181,27 +167,25 @@ print(df[["user_id", "group_id", "session_id"]].drop_duplicates().to_string(inde
 
 print("\n📊 Calculando métricas ponderadas del experimento...\n")
 
-metrics = MetricsCalculator(df, experiment_config=experiment_config)
-raw_results = metrics.compute_all()
+metrics = MetricsCalculator(df, experiment_config=experiment_config, frame_tables=frame_tables,
+                            session_index=session_index)
+
+# RAW_METRICS_CACHE=true: si los datos y la definición de las métricas no cambiaron desde la
+# última ejecución, solo se recalculan las puntuaciones (pesos, rangos, perfiles) desde la caché
+raw_cache = RawMetricsCache() if os.getenv("RAW_METRICS_CACHE", "false").lower() in ("1", "true", "yes") else None
+raw_fingerprint = raw_cache.fingerprint(metrics) if raw_cache else None
+cached_raw = raw_cache.load(raw_fingerprint) if raw_cache else None
+
+if cached_raw is not None:
+    print(f"[RawMetrics] ♻️ Valores brutos en caché ({raw_fingerprint[:12]}): solo se re-puntúa.\n")
+    raw_results = metrics.rescore_all(cached_raw[1])
+else:
+    raw_results = metrics.compute_all()
 
 # ------------------------------------------------------------
 # ADAPTAR RESULTADO a FORMATO PARA EL PDF Y EXPORTER
 # ------------------------------------------------------------
-results_for_export = {}
-
-for categoria, contenido in raw_results["categorias"].items():
-
-    # Subestructura compatible con PDFReporter
-    results_for_export[categoria] = {
-        "score": contenido["score"]
-    }
-
-    for metric_name, metric_data in contenido.items():
-        if isinstance(metric_data, dict):
-            results_for_export[categoria][metric_name] = metric_data["raw"]
-
-# añadir puntuación global
-results_for_export["global_score"] = raw_results["global_score"]
+results_for_export = MetricsExporter.summarize(raw_results)
 
 print(json.dumps(results_for_export, indent=4))
 
@@ -245,7 +229,17 @@ exporter = MetricsExporter(results_for_export, output_dir=results_dir)
 exporter.to_json("results.json")
 exporter.to_csv("results.csv")
 
-grouped_df = metrics.compute_grouped_metrics()
+if cached_raw is not None:
+    grouped_df = metrics.rescore_grouped(cached_raw[0])
+else:
+    # METRICS_WORKERS=N (N > 1): sesiones repartidas en un pool de procesos
+    grouped_df = metrics.compute_grouped_metrics(workers=int(os.getenv("METRICS_WORKERS", "1")))
+    print(metrics.memo_report())
+    if raw_cache:
+        raw_cache.save(raw_fingerprint, metrics, grouped_df, raw_results)
+if raw_cache:
+    # Permite re-puntuar esta carpeta con otra config: python -m python_analysis.raw_metrics_cache --rescore
+    RawMetricsCache.write_manifest(results_dir, raw_fingerprint, experiment_config)
 
 # --- INTEGRATING SUBJECTIVE QUESTIONNAIRES ---
 print("📋 Integrando cuestionarios subjetivos (SUS)...")
@@ -286,6 +280,23 @@ else:
 grouped_path = results_dir / "grouped_metrics.csv"
 grouped_df.to_csv(grouped_path, index=False)
 
+# --- IC bootstrap y pruebas de permutación por variable independiente ---
+# IV_STATS_RESAMPLES (0 = desactivado), IV_STATS_SEED, IV_STATS_WORKERS (hilos)
+statistics_path = results_dir / "iv_statistics.csv"
+iv_resamples = int(os.getenv("IV_STATS_RESAMPLES", "10000"))
+iv_statistics = None
+if iv_resamples > 0 and not grouped_df.empty:
+    iv_statistics = metrics.compute_variable_statistics(
+        grouped_df,
+        n_resamples=iv_resamples,
+        seed=int(os.getenv("IV_STATS_SEED", "0")),
+        workers=int(os.getenv("IV_STATS_WORKERS", "1"))
+    )
+if iv_statistics is not None and not iv_statistics.empty:
+    iv_statistics.to_csv(statistics_path, index=False)
+    print(f"📐 IC bootstrap y p-valores por variable independiente ({iv_resamples} remuestreos): "
+          f"{statistics_path.name}")
+
 # También exportar versión agrupada como JSON
 MetricsExporter.export_multiple(
     [results_for_export],
@@ -315,7 +326,8 @@ if global_json.exists():
 
 if grouped_path.exists():
     grouped_dir = figures_dir / "agrupado"
-    viz_grouped = Visualizer(str(grouped_path), output_dir=grouped_dir)
+    viz_grouped = Visualizer(str(grouped_path), output_dir=grouped_dir,
+                             statistics_file=statistics_path if statistics_path.exists() else None)
     viz_grouped.generate_all()
     generated_figures += len(list(grouped_dir.glob("*.png")))
 
@@ -328,40 +340,8 @@ print(f"📊 Figuras generadas: {generated_figures}\n")
 # ============================================================
 print("🗺️ Generando visualizaciones espaciales (si existen datos de tracking)...")
 
-config_events = df[df["event_name"] == "experiment_config"]
-session_groups = {} # (iv, map_name) -> list of session_ids
-
-if not config_events.empty:
-    for _, row in config_events.iterrows():
-        sid = row["session_id"]
-        
-        iv = "Unknown"
-        m_name = ""
-        
-        # En el df expandido, 'session' suele ser una columna que contiene el diccionario
-        session_dict = row.get("session")
-        if isinstance(session_dict, dict):
-            iv = session_dict.get("independent_variable", "Unknown")
-            m_name = session_dict.get("map_name", "")
-        # Fallback si por alguna razón no está expandido así
-        else:
-            ctx = row.get("event_context", row.get("context", {}))
-            if isinstance(ctx, str):
-                try:
-                    import json
-                    ctx = json.loads(ctx.replace("'", '"').replace("True", "true").replace("False", "false"))
-                except:
-                    pass
-            if isinstance(ctx, dict):
-                session_ctx = ctx.get("session", ctx)
-                iv = session_ctx.get("independent_variable", "Unknown")
-                m_name = session_ctx.get("map_name", "")
-
-        key = (iv, m_name)
-        if key not in session_groups:
-            session_groups[key] = []
-        if sid not in session_groups[key]:
-            session_groups[key].append(sid)
+# (iv, map_name) -> list of session_ids, desde el índice de sesiones
+session_groups = session_index.condition_groups()
 
 if not session_groups:
     # Fallback if no config logs found in df, just run globally
@@ -374,17 +354,13 @@ for (iv, m_name), sids in session_groups.items():
     
     print(f"   -> Generando mapas para {folder_name} ({len(sids)} sesiones)...")
     df_group = df[df["session_id"].isin(sids)]
-    
-    group_config = experiment_config.copy() if isinstance(experiment_config, dict) else {}
-    try:
-        group_config_row = df_group[df_group["event_name"] == "experiment_config"].iloc[0]["event_context"]
-        if isinstance(group_config_row, str):
-            import json
-            group_config_row = json.loads(group_config_row.replace("'", '"').replace("True", "true").replace("False", "false"))
-        if isinstance(group_config_row, dict):
-            group_config = group_config_row
-    except:
-        pass
+
+    # Config del experimento con el objeto 'session' (mapa, área de juego) de la primera sesión del
+    # grupo según el índice de sesiones. Copia profunda: abajo se modifica 'session'
+    group_config = copy.deepcopy(experiment_config) if isinstance(experiment_config, dict) else {}
+    session_config = session_index.metadata(sids[0]).get("config") if len(sids) else None
+    if session_config and isinstance(session_config.get("session"), dict):
+        group_config["session"] = copy.deepcopy(session_config["session"])
         
     # FORCE the correct map_name and independent_variable for this specific session group
     if "session" not in group_config:
@@ -400,7 +376,8 @@ for (iv, m_name), sids in session_groups.items():
         output_dir=figures_dir / "spatial" / folder_name,
         play_area_width=play_area_w,
         play_area_depth=play_area_d,
-        experiment_config=group_config
+        experiment_config=group_config,
+        frame_tables=LogParser.select_sessions(frame_tables, sids)
     )
     spatial_viz.generate_all()
 
@@ -423,7 +400,9 @@ if report_file.exists():
     report = PDFReport(
         results_file=str(report_file),
         figures_dir=figures_dir,  # Pasamos la raíz de figuras
-        output_dir=output_dir     # Pasamos la raíz de output
+        output_dir=output_dir,    # Pasamos la raíz de output
+        session_index=session_index,
+        statistics_file=statistics_path if statistics_path.exists() else None
     )
     report.generate()
 
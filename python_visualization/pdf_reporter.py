@@ -10,8 +10,21 @@ import os
 
 
 class PDFReport:
-    def __init__(self, results_file, figures_dir, output_dir):
+    # Nivel de significación con el que se marcan los p-valores de las pruebas de permutación
+    SIGNIFICANCE = 0.05
+
+    def __init__(self, results_file, figures_dir, output_dir, session_index=None, statistics_file=None):
+        """
+        session_index: SessionIndex opcional (python_analysis.session_index) para añadir la
+                       condición y el mapa de cada sesión en los resultados detallados.
+        statistics_file: CSV opcional de MetricsCalculator.compute_variable_statistics (iv_statistics.csv)
+                         con los IC bootstrap y p-valores por variable independiente.
+        """
         self.results_file = Path(results_file)
+        self.statistics = pd.read_csv(statistics_file) if statistics_file else None
+        # session_id como texto: en el CSV agrupado los ids numéricos se leen como números
+        self.session_metadata = {str(sid): meta for sid, meta in session_index.session_metadata().items()} \
+            if session_index is not None else {}
         self.figures_dir = Path(figures_dir)
         # Usamos directamente el directorio de salida proporcionado
         self.export_dir = Path(output_dir)
@@ -175,8 +188,13 @@ class PDFReport:
                 gid = row.get("group_id", "N/A")
                 sid = row.get("session_id", "N/A")
 
-                elements.append(Paragraph(f"<b>Usuario:</b> {uid} — <b>Grupo:</b> {gid} — <b>Sesión:</b> {sid}",
-                                          styles["Heading3"]))
+                header = f"<b>Usuario:</b> {uid} — <b>Grupo:</b> {gid} — <b>Sesión:</b> {sid}"
+                meta = self.session_metadata.get(str(sid), {})
+                if meta.get("independent_variable"):
+                    header += f" — <b>Condición:</b> {meta['independent_variable']}"
+                if meta.get("map_name"):
+                    header += f" — <b>Mapa:</b> {meta['map_name']}"
+                elements.append(Paragraph(header, styles["Heading3"]))
                 elements.append(Spacer(1, 8))
 
                 # 🔹 Mostrar los scores del usuario (ponderados desde MetricsCalculator)
@@ -320,7 +338,8 @@ class PDFReport:
             self.figures_dir = self.figures_dir / "global"
 
         iv_charts = list(self.figures_dir.glob("Iv_Comparison_*.png"))
-        if iv_charts:
+        has_statistics = self.statistics is not None and not self.statistics.empty
+        if iv_charts or has_statistics:
             elements.append(Paragraph("Análisis de Variables Independientes", styles["Heading1"]))
             elements.append(Spacer(1, 10))
             elements.append(
@@ -334,6 +353,9 @@ class PDFReport:
                 elements.append(Image(str(chart), width=400, height=250))
                 elements.append(Spacer(1, 10))
 
+            if has_statistics:
+                elements.extend(self._statistics_elements(styles))
+
             elements.append(PageBreak())
 
         # ============================================================
@@ -458,3 +480,45 @@ class PDFReport:
         # ============================================================
         doc.build(elements)
         print(f"[PDFReport] ✅ Informe PDF generado en {self.output_file}")
+
+    # ============================================================
+    # 📐 IC bootstrap y pruebas de permutación por variable independiente
+    # ============================================================
+    def _statistics_elements(self, styles):
+        """Tabla métrica x nivel con la media, su IC bootstrap y el p-valor de permutación."""
+        stats = self.statistics[self.statistics["n"] > 0]
+        if stats.empty:
+            return []
+        levels = list(dict.fromkeys(stats["independent_variable"].astype(str)))
+        confidence = stats["confidence"].iloc[0]
+
+        elements = [
+            Paragraph("Intervalos de confianza y pruebas de permutación", styles["Heading2"]),
+            Paragraph(f"Media de cada métrica por nivel con su intervalo de confianza bootstrap del "
+                      f"{confidence:.0%} [mín, máx] y p-valor de una prueba de permutación de las etiquetas "
+                      f"de nivel entre sesiones (* p &lt; {self.SIGNIFICANCE}).", styles["Normal"]),
+            Spacer(1, 8),
+        ]
+        data = [["Métrica"] + levels + ["p"]]
+        for metric, rows in stats.groupby("metric", sort=False):
+            by_level = {str(r["independent_variable"]): r for _, r in rows.iterrows()}
+            row = [metric.replace("_", " ")]
+            for level in levels:
+                r = by_level.get(level)
+                row.append("-" if r is None else f"{r['mean']:.3g} [{r['ci_low']:.3g}, {r['ci_high']:.3g}]")
+            p_value = rows["p_value"].iloc[0]
+            row.append("-" if pd.isna(p_value) else
+                       f"{p_value:.4f}" + (" *" if p_value < self.SIGNIFICANCE else ""))
+            data.append(row)
+
+        table = Table(data, repeatRows=1, hAlign="LEFT")
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, -1), 7),
+            ("ALIGN", (1, 1), (-1, -1), "CENTER"),
+        ]))
+        elements.append(table)
+        elements.append(Spacer(1, 10))
+        return elements
@@ -9,12 +9,17 @@ import numpy as np
 import io
 from PIL import Image
 
+from python_analysis.scenario_assets import SCENARIO_ASSETS
+
 
 class SpatialVisualizer:
-    def __init__(self, df, output_dir, play_area_width=None, play_area_depth=None, experiment_config=None):
+    def __init__(self, df, output_dir, play_area_width=None, play_area_depth=None, experiment_config=None,
+                 frame_tables=None):
         """
         df: DataFrame RAW con eventos (debe tener event_name, timestamp, y columnas de posición expandidas)
         output_dir: ruta donde guardar las imágenes
+        frame_tables: dict opcional {event_name: DataFrame} con la telemetría en tablas densas
+                      (LogParser.parse_log_tables); se usa en lugar de filtrar df.
         """
         self.df = df
         self.output_dir = Path(output_dir)
@@ -22,6 +27,15 @@ class SpatialVisualizer:
         self.play_area_width = play_area_width
         self.play_area_depth = play_area_depth
         self.experiment_config = experiment_config
+        self.frame_tables = frame_tables or {}
+
+    def _frames(self, event_name):
+        """Filas de un evento de telemetría: tabla densa si existe, si no filtrado del df."""
+        table = self.frame_tables.get(event_name)
+        if table is not None and not table.empty:
+            # Igual que en el df mixto: una columna solo "existe" si algún evento la trae
+            return table.dropna(axis=1, how="all")
+        return self.df[self.df["event_name"] == event_name]
 
     def _draw_play_area(self, ax=None, draw_ideal_path=False, draw_labyrinth_mesh=False):
         ax = ax or plt.gca()
@@ -54,84 +68,43 @@ class SpatialVisualizer:
 
         # -2. Dibujar la geometría interna del Labyrinth (Malla del suelo) si existe
         if draw_labyrinth_mesh:
-            # Buscamos primero el fichero con el nombre del escenario (ej: labyrinth_mesh_Laberinto1.json)
-            mesh_file = Path(f"labyrinth_mesh_{scenario_id}.json") if scenario_id else Path("labyrinth_mesh.json")
-            if not mesh_file.exists():
-                mesh_file = Path("labyrinth_mesh.json")  # Fallback al genérico
-
-            if mesh_file.exists():
-                try:
-                    with open(mesh_file, 'r', encoding='utf-8') as f:
-                        mesh_data = json.load(f)
-                    if "vertices" in mesh_data and "indices" in mesh_data:
-                        import matplotlib.collections as mcoll
-                        indices = mesh_data["indices"]
-                        vertices = mesh_data["vertices"]
-                        pts = np.array([[pt["x"], pt["z"]] for pt in vertices if "x" in pt and "z" in pt])
-                        if len(pts) >= 3:
-                            polys = []
-                            for i in range(0, len(indices), 3):
-                                if i + 2 < len(indices):
-                                    polys.append([pts[indices[i]], pts[indices[i + 1]], pts[indices[i + 2]]])
-                            if polys:
-                                # 1. Dibujar el relleno de los triángulos sin bordes internos
-                                collection = mcoll.PolyCollection(polys, facecolors='lightgray', edgecolors='none',
-                                                                  alpha=0.4, zorder=1)
-                                ax.add_collection(collection)
-
-                                # 2. Extraer y dibujar solo los bordes exteriores (boundary edges)
-                                edges = {}
-                                for i in range(0, len(indices), 3):
-                                    if i + 2 < len(indices):
-                                        tri = [indices[i], indices[i + 1], indices[i + 2]]
-                                        for j in range(3):
-                                            # Ordenar índices para que (A,B) y (B,A) sean la misma arista
-                                            edge = tuple(sorted((tri[j], tri[(j + 1) % 3])))
-                                            edges[edge] = edges.get(edge, 0) + 1
-
-                                # Las aristas que aparecen solo una vez son los bordes del mesh
-                                boundary_lines = []
-                                for (v1, v2), count in edges.items():
-                                    if count == 1:
-                                        boundary_lines.append([pts[v1], pts[v2]])
-
-                                if boundary_lines:
-                                    line_collection = mcoll.LineCollection(boundary_lines, colors='black',
-                                                                           linewidths=1.0, zorder=2)
-                                    ax.add_collection(line_collection)
+            # Registro de escenarios: labyrinth_mesh_<mapa>.json (o el genérico), parseado una sola vez
+            try:
+                mesh = SCENARIO_ASSETS.labyrinth_mesh(scenario_id)
+                if mesh is not None:
+                    import matplotlib.collections as mcoll
+                    if len(mesh.polygons):
+                        # 1. Dibujar el relleno de los triángulos sin bordes internos
+                        collection = mcoll.PolyCollection(mesh.polygons, facecolors='lightgray', edgecolors='none',
+                                                          alpha=0.4, zorder=1)
+                        ax.add_collection(collection)
+
+                        # 2. Dibujar solo los bordes exteriores (boundary edges, precalculados en el registro)
+                        if len(mesh.boundary_lines):
+                            line_collection = mcoll.LineCollection(mesh.boundary_lines, colors='black',
+                                                                   linewidths=1.0, zorder=2)
+                            ax.add_collection(line_collection)
 
                     # Dibujar marcadores de inicio y fin si están presentes en el JSON del mapa
-                    if "start_point" in mesh_data:
-                        sp = mesh_data["start_point"]
-                        if "x" in sp and "z" in sp:
-                            ax.scatter(sp["x"], sp["z"], color="blue", marker="o", s=150, label="Start Point", zorder=5,
-                                       edgecolors='white', linewidths=2)
-                    if "end_point" in mesh_data:
-                        ep = mesh_data["end_point"]
-                        if "x" in ep and "z" in ep:
-                            ax.scatter(ep["x"], ep["z"], color="red", marker="*", s=250, label="End Point", zorder=5,
-                                       edgecolors='white', linewidths=2)
-                except Exception as e:
-                    print(f"[SpatialVisualizer] Aviso: No se pudo dibujar la malla {mesh_file.name}: {e}")
+                    if mesh.start_point is not None:
+                        ax.scatter(*mesh.start_point, color="blue", marker="o", s=150, label="Start Point", zorder=5,
+                                   edgecolors='white', linewidths=2)
+                    if mesh.end_point is not None:
+                        ax.scatter(*mesh.end_point, color="red", marker="*", s=250, label="End Point", zorder=5,
+                                   edgecolors='white', linewidths=2)
+            except Exception as e:
+                print(f"[SpatialVisualizer] Aviso: No se pudo dibujar la malla del escenario '{scenario_id}': {e}")
 
         # -1. Dibujar el Labyrinth Ideal Path si existe y si fue solicitado
         if draw_ideal_path:
-            ideal_file = Path(f"ideal_path_{scenario_id}.json") if scenario_id else Path("ideal_path.json")
-            if not ideal_file.exists():
-                ideal_file = Path("ideal_path.json")  # Fallback genérico
-
-            if ideal_file.exists():
-                try:
-                    with open(ideal_file, 'r', encoding='utf-8') as f:
-                        ideal_data = json.load(f)
-                    if isinstance(ideal_data, list) and len(ideal_data) > 1:
-                        ix = [pt["x"] for pt in ideal_data if "x" in pt and "z" in pt]
-                        iz = [pt["z"] for pt in ideal_data if "x" in pt and "z" in pt]
-                        if len(ix) > 1:
-                            ax.plot(ix, iz, color='#39FF14', linewidth=4, alpha=0.9, linestyle='-', label="Ideal Path",
-                                    zorder=3, solid_capstyle='round', solid_joinstyle='round')
-                except Exception as e:
-                    print(f"[SpatialVisualizer] Aviso: No se pudo dibujar el ideal_path.json: {e}")
+            try:
+                ideal = SCENARIO_ASSETS.ideal_path(scenario_id)
+                if ideal is not None and isinstance(ideal.data, list) and len(ideal.data) > 1 and len(ideal.points) > 1:
+                    ax.plot(ideal.points[:, 0], ideal.points[:, 1], color='#39FF14', linewidth=4, alpha=0.9,
+                            linestyle='-', label="Ideal Path", zorder=3, solid_capstyle='round',
+                            solid_joinstyle='round')
+            except Exception as e:
+                print(f"[SpatialVisualizer] Aviso: No se pudo dibujar el ideal_path.json: {e}")
 
         # 0. Intentar usar NavMesh_Boundary (Prioridad 1)
         navmesh_logs = self.df[self.df["event_name"] == "NAVMESH_BOUNDARY"]
@@ -228,7 +201,7 @@ class SpatialVisualizer:
 
     def plot_trajectories(self):
         """Dibuja la ruta recorrida (X vs Z) por cada usuario."""
-        moves = self.df[self.df["event_name"] == "movement_frame"].copy()
+        moves = self._frames("movement_frame").copy()
 
         if "position_x" not in moves.columns or "position_z" not in moves.columns:
             return
@@ -247,7 +220,7 @@ class SpatialVisualizer:
         )
 
         # Marcar inicio y fin (promedio de primeros y últimos puntos para no saturar)
-        last_points = moves.groupby("session_id").last().reset_index()
+        last_points = moves.groupby("session_id", observed=True).last().reset_index()
         sns.scatterplot(data=last_points, x="position_x", y="position_z", color="red", marker="X", s=100, label="End",
                         zorder=5)
 
@@ -264,7 +237,7 @@ class SpatialVisualizer:
 
     def plot_trajectory_gif(self, max_frames=60):
         """Genera un GIF animado de la trayectoria."""
-        moves = self.df[self.df["event_name"] == "movement_frame"].copy()
+        moves = self._frames("movement_frame").copy()
         if "position_x" not in moves.columns or "position_z" not in moves.columns:
             return
 
@@ -315,7 +288,7 @@ class SpatialVisualizer:
 
             # Dibujar punto actual (cabeza de la serptiente)
             # El ultimo punto de cada sesion en current_data
-            heads = current_data.groupby("session_id").last().reset_index()
+            heads = current_data.groupby("session_id", observed=True).last().reset_index()
             sns.scatterplot(
                 data=heads,
                 x="position_x",
@@ -355,7 +328,7 @@ class SpatialVisualizer:
 
     def plot_position_heatmap(self):
         """Mapa de calor de densidad de ocupación del espacio (X vs Z)."""
-        moves = self.df[self.df["event_name"] == "movement_frame"]
+        moves = self._frames("movement_frame")
 
         if "position_x" not in moves.columns or "position_z" not in moves.columns:
             return
@@ -388,7 +361,7 @@ class SpatialVisualizer:
 
     def plot_gaze_heatmap(self):
         """Mapa de calor de la MIRADA (Gaze)."""
-        gazes = self.df[self.df["event_name"] == "gaze_frame"].copy()
+        gazes = self._frames("gaze_frame").copy()
 
         bx = "hit_position_x" if "hit_position_x" in gazes.columns else "hit_point_x"
         bz = "hit_position_z" if "hit_position_z" in gazes.columns else "hit_point_z"
@@ -428,18 +401,11 @@ class SpatialVisualizer:
         if not gaze_config.get("enabled", False):
             return 0.0
 
-        import json
         scenario_id = self.experiment_config.get("session", {}).get("map_name", "")
-        ideal_file = Path(f"ideal_path_{scenario_id}.json") if scenario_id else Path("ideal_path.json")
-        if not ideal_file.exists():
-            ideal_file = Path("ideal_path.json")
-
-        if not ideal_file.exists():
-            return 0.0
-
         try:
-            with open(ideal_file, "r", encoding="utf-8") as f:
-                ideal_data = json.load(f)
+            ideal = SCENARIO_ASSETS.ideal_path(scenario_id)
+            if ideal is None:
+                return 0.0
 
             bx = "hit_position_x" if "hit_position_x" in df_frames.columns else "hit_point_x"
             bz = "hit_position_z" if "hit_position_z" in df_frames.columns else "hit_point_z"
@@ -452,25 +418,9 @@ class SpatialVisualizer:
             gx, gz = gx[valid], gz[valid]
             if len(gx) == 0: return 0.0
 
-            path_pts = np.array([[pt["x"], pt["z"]] for pt in ideal_data if "x" in pt and "z" in pt])
-            if len(path_pts) < 2: return 0.0
-
-            P1 = path_pts[:-1]
-            P2 = path_pts[1:]
-            hits = 0
-
-            for i in range(len(gx)):
-                px, pz = gx[i], gz[i]
-                AB = P2 - P1
-                AP = np.column_stack((np.full(len(P1), px) - P1[:, 0], np.full(len(P1), pz) - P1[:, 1]))
-                ab_sq = np.sum(AB ** 2, axis=1)
-                ap_dot_ab = np.sum(AP * AB, axis=1)
-                t = np.clip(ap_dot_ab / np.maximum(ab_sq, 1e-8), 0.0, 1.0)
-                closest_x = P1[:, 0] + t * AB[:, 0]
-                closest_z = P1[:, 1] + t * AB[:, 1]
-                dists = np.sqrt((px - closest_x) ** 2 + (pz - closest_z) ** 2)
-                if np.min(dists) <= threshold:
-                    hits += 1
+            if ideal.index is None: return 0.0
+
+            hits = ideal.index.count_within(gx, gz, threshold)
             return float(hits * median_delta)
         except:
             return 0.0
@@ -503,7 +453,7 @@ class SpatialVisualizer:
         return df_targets[~mask_trivial & ~mask_cube]
 
     def _plot_targets_base(self, event_name, filename, title, palette):
-        frames = self.df[self.df["event_name"] == event_name].copy()
+        frames = self._frames(event_name).copy()
 
         if "target" not in frames.columns or frames.empty:
             return
@@ -514,7 +464,7 @@ class SpatialVisualizer:
         median_delta = 0.1
         if pd.api.types.is_datetime64_any_dtype(frames["timestamp"]):
             frames_sorted = frames.sort_values("timestamp")
-            diffs = frames_sorted.groupby("session_id")["timestamp"].diff().dt.total_seconds()
+            diffs = frames_sorted.groupby("session_id", observed=True)["timestamp"].diff().dt.total_seconds()
             calc_median = diffs.median()
             if not pd.isna(calc_median) and calc_median > 0:
                 median_delta = calc_median
@@ -551,7 +501,7 @@ class SpatialVisualizer:
         stem   = Path(filename).stem    # ej: "Gaze_Targets_BarChart"
         suffix = Path(filename).suffix  # ej: ".png"
 
-        for user_id, user_frames in frames_filtered.groupby("user_id"):
+        for user_id, user_frames in frames_filtered.groupby("user_id", observed=True):
             tc = user_frames["target"].value_counts().reset_index()
             tc.columns = ["Objeto", "Frames (Frecuencia)"]
             tc["Tiempo Total (s)"] = tc["Frames (Frecuencia)"] * median_delta
@@ -576,7 +526,7 @@ class SpatialVisualizer:
 
     def plot_gaze_heatmap_gif(self, max_frames=60):
         """Genera GIF de la evolución de la mirada."""
-        gazes = self.df[self.df["event_name"] == "gaze_frame"].copy()
+        gazes = self._frames("gaze_frame").copy()
 
         bx = "hit_position_x" if "hit_position_x" in gazes.columns else "hit_point_x"
         bz = "hit_position_z" if "hit_position_z" in gazes.columns else "hit_point_z"
@@ -648,7 +598,7 @@ class SpatialVisualizer:
 
     def plot_pupilometry(self):
         """Gráfico de evolución temporal del diámetro pupilar promedio."""
-        eyes = self.df[self.df["event_name"] == "eye_frame"].copy()
+        eyes = self._frames("eye_frame").copy()
 
         if eyes.empty: return
 
@@ -667,7 +617,7 @@ class SpatialVisualizer:
         if not pd.api.types.is_datetime64_any_dtype(eyes["timestamp"]):
             eyes["timestamp"] = pd.to_datetime(eyes["timestamp"])
 
-        eyes["time_norm"] = eyes.groupby("session_id")["timestamp"].transform(
+        eyes["time_norm"] = eyes.groupby("session_id", observed=True)["timestamp"].transform(
             lambda x: (x - x.min()).dt.total_seconds())
 
         plt.figure(figsize=(12, 6))
@@ -683,7 +633,7 @@ class SpatialVisualizer:
 
     def plot_pupilometry_gif(self, max_frames=60):
         """Genera GIF de la evolución del diámetro pupilar."""
-        eyes = self.df[self.df["event_name"] == "eye_frame"].copy()
+        eyes = self._frames("eye_frame").copy()
 
         if eyes.empty: return
 
@@ -698,7 +648,7 @@ class SpatialVisualizer:
         if not pd.api.types.is_datetime64_any_dtype(eyes["timestamp"]):
             eyes["timestamp"] = pd.to_datetime(eyes["timestamp"])
 
-        eyes["time_norm"] = eyes.groupby("session_id")["timestamp"].transform(
+        eyes["time_norm"] = eyes.groupby("session_id", observed=True)["timestamp"].transform(
             lambda x: (x - x.min()).dt.total_seconds())
         eyes = eyes.sort_values("time_norm")
 
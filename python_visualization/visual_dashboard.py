@@ -54,6 +54,24 @@ def load_results(results_file):
     return pd.DataFrame(), "desconocido"
 
 
+def load_iv_statistics(statistics_file, levels=None):
+    """
+    IC bootstrap y p-valores por variable independiente (iv_statistics.csv de vr_analysis), con los
+    scores en 0-100 como el resto del dashboard. None si no existe el archivo.
+    """
+    statistics_file = Path(statistics_file)
+    if not statistics_file.exists():
+        return None
+    stats = pd.read_csv(statistics_file)
+    stats["independent_variable"] = stats["independent_variable"].astype(str)
+    if levels:
+        stats = stats[stats["independent_variable"].isin(levels)]
+    percent = stats["metric"].isin(["efectividad_score", "eficiencia_score", "satisfaccion_score",
+                                    "presencia_score", "global_score", "total_score"])
+    stats.loc[percent, ["mean", "ci_low", "ci_high"]] *= 100
+    return stats if not stats.empty else None
+
+
 # ============================================================
 # 🔹 Interfaz principal
 # ============================================================
@@ -212,6 +230,20 @@ def main():
             # Melt for charting
             comp_melt = comp_df.melt(id_vars="independent_variable", var_name="Metric", value_name="Score")
 
+            # IC bootstrap y p-valores de vr_analysis (iv_statistics.csv), si se generaron
+            iv_stats = load_iv_statistics(results_dir / "iv_statistics.csv", selected_vars)
+            error_args = {}
+            if iv_stats is not None:
+                comp_melt["independent_variable"] = comp_melt["independent_variable"].astype(str)
+                comp_melt = comp_melt.merge(
+                    iv_stats[["independent_variable", "metric", "ci_low", "ci_high"]],
+                    left_on=["independent_variable", "Metric"], right_on=["independent_variable", "metric"],
+                    how="left"
+                )
+                comp_melt["ci_plus"] = comp_melt["ci_high"] - comp_melt["Score"]
+                comp_melt["ci_minus"] = comp_melt["Score"] - comp_melt["ci_low"]
+                error_args = {"error_y": "ci_plus", "error_y_minus": "ci_minus"}
+
             fig_comp = px.bar(
                 comp_melt,
                 x="independent_variable",
@@ -219,9 +251,26 @@ def main():
                 color="Metric",
                 barmode="group",
                 title="Promedio de Scores por Variable",
-                text_auto=".2f"
+                text_auto=".2f",
+                **error_args
             )
             st.plotly_chart(fig_comp, use_container_width=True)
+
+            if iv_stats is not None:
+                confidence = iv_stats["confidence"].iloc[0]
+                st.subheader(f"📐 IC bootstrap ({confidence:.0%}) y pruebas de permutación")
+                st.caption("Calculados por vr_analysis con todas las sesiones de cada nivel (los filtros "
+                           "de la barra lateral no los recalculan). p: prueba de permutación de las "
+                           "etiquetas de nivel entre sesiones.")
+                # Una fila por métrica: "media [IC mín, IC máx]" por nivel y el p-valor
+                ci_text = iv_stats["mean"].map("{:.3g}".format) + " [" + iv_stats["ci_low"].map("{:.3g}".format) \
+                    + ", " + iv_stats["ci_high"].map("{:.3g}".format) + "]"
+                stats_table = iv_stats.assign(ci=ci_text).pivot(index="metric", columns="independent_variable",
+                                                                values="ci")
+                p_values = iv_stats.groupby("metric", sort=False)["p_value"].first()
+                stats_table = stats_table.loc[p_values.index]
+                stats_table["p"] = p_values
+                st.dataframe(stats_table)
             st.markdown("---")
 
     # ============================================================
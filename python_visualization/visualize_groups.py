@@ -42,10 +42,16 @@ class Visualizer:
         ]
     }
 
-    def __init__(self, input_file, output_dir="figures"):
+    # Scores de 0-1 que se muestran en 0-100
+    PERCENT_SCORES = ["efectividad_score", "eficiencia_score", "satisfaccion_score", "presencia_score",
+                      "global_score", "total_score"]
+
+    def __init__(self, input_file, output_dir="figures", statistics_file=None):
         """
         input_file: archivo JSON o CSV exportado por MetricsExporter
         output_dir: carpeta donde guardar los gráficos
+        statistics_file: CSV opcional de MetricsCalculator.compute_variable_statistics (iv_statistics.csv)
+                         para añadir IC bootstrap y p-valores a la comparación por variable independiente
         """
         self.input_file = Path(input_file)
         self.output_dir = Path(output_dir)
@@ -62,10 +68,12 @@ class Visualizer:
             raise ValueError("Formato de archivo no soportado (usa .json o .csv)")
 
         # Normalizar scores de 0-1 a 0-100 (para que guarden proporción con el SUS score en las gráficas)
-        for col in ["efectividad_score", "eficiencia_score", "satisfaccion_score", "presencia_score", "global_score", "total_score"]:
+        for col in self.PERCENT_SCORES:
             if col in self.df.columns:
                 self.df[col] = pd.to_numeric(self.df[col], errors="coerce") * 100
 
+        self.statistics = pd.read_csv(statistics_file) if statistics_file else None
+
         # --- Detectar modo ---
         self.mode = self._detect_mode()
         print(f"[Visualizer] ✅ Datos cargados desde {input_file}")
@@ -306,8 +314,19 @@ class Visualizer:
                     continue
 
                 plt.figure(figsize=(8, 6))
-                sns.barplot(data=grouped, x=iv_col, y=score, hue=iv_col, palette="viridis", legend=False)
-                plt.title(f"Promedio de {score} por {iv_col}")
+                sns.barplot(data=grouped, x=iv_col, y=score, hue=iv_col, palette="viridis", legend=False,
+                            order=list(grouped[iv_col]))
+                title = f"Promedio de {score} por {iv_col}"
+                stats = self._score_statistics(score, grouped[iv_col])
+                if stats is not None:
+                    # Barras de error: IC bootstrap de la media de cada nivel
+                    plt.errorbar(range(len(stats)), stats["mean"],
+                                 yerr=[stats["mean"] - stats["ci_low"], stats["ci_high"] - stats["mean"]],
+                                 fmt="none", ecolor="black", capsize=6)
+                    p_value = stats["p_value"].iloc[0]
+                    if pd.notna(p_value):
+                        title += f"\n(IC {stats['confidence'].iloc[0]:.0%} bootstrap, permutación p = {p_value:.4f})"
+                plt.title(title)
                 plt.xlabel(iv_col)
                 plt.ylabel("Score Promedio")
                 plt.tight_layout()
@@ -318,6 +337,20 @@ class Visualizer:
 
         print(f"[Visualizer] ✅ Gráficos de comparación por IV generados.")
 
+    def _score_statistics(self, score, levels):
+        """Filas de self.statistics de la métrica en el orden de levels (None si no están todas)."""
+        if self.statistics is None:
+            return None
+        stats = self.statistics[self.statistics["metric"] == score]
+        stats = stats.set_index(stats["independent_variable"].astype(str))
+        keys = [str(level) for level in levels]
+        if stats.empty or not set(keys).issubset(stats.index):
+            return None
+        stats = stats.loc[keys, ["mean", "ci_low", "ci_high", "confidence", "p_value"]].reset_index(drop=True)
+        if score in self.PERCENT_SCORES:
+            stats[["mean", "ci_low", "ci_high"]] *= 100
+        return stats
+
     # ============================================================
     # EJECUCIÓN COMPLETA
     # ============================================================